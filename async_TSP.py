@@ -0,0 +1,198 @@
+from graph import MISSING_EDGE
+from genetic_TSP import Genetic_TSP
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+from time import perf_counter
+import asyncio
+import random
+
+#best path of a solve when it improved: generation and elapsed (seconds
+#since the solve started) are those at which the improvement was reported
+Improvement = namedtuple('Improvement', ['path', 'score', 'generation', 'elapsed'])
+
+def _generations(test_tube:Genetic_TSP, populate_mix:dict|None, criteria:dict):
+    """iter_generations of test_tube, populated inside the worker thread on the first step."""
+    test_tube.populate(populate_mix)
+    yield from test_tube.iter_generations(**criteria)
+
+def _run_slice(generations, slice_end:float, deadline:float|None, duration:float) -> tuple:
+    """
+    Advances generations inside a worker thread until slice_end, or
+    until the next generation would not finish by deadline (estimated
+    by duration, that of the last generation). At least one generation
+    runs unless the deadline is near. Returns whether the solve is over
+    and the duration of its last generation.
+    """
+    while True:
+        started = perf_counter()
+        if deadline is not None and started + duration > deadline:
+            return True, duration
+        try:
+            next(generations)
+        except (StopIteration, ValueError):
+            #ValueError: the population died out, nothing feasible was found
+            return True, duration
+        finished = perf_counter()
+        duration = finished - started
+        if finished >= slice_end:
+            return False, duration
+
+
+class Async_TSP:
+    """
+    Runs Genetic_TSP solves from asyncio code without blocking the event loop.
+
+    Generations run on a pool of max_workers threads shared by all
+    solves. A solve runs in slices of about slice_time seconds, and
+    at most max_workers slices are queued or running at any time, so
+    concurrent solves take turns on the pool in the order they asked
+    and a burst of solves waits in the event loop, where it can be
+    cancelled. Between slices, improved best paths are streamed and
+    cancellation and deadlines are honoured: a cancelled solve stops
+    scheduling slices at once, the one already running finishes within
+    slice_time on its own.
+
+    Generations are mostly pure Python, so threads beyond the first
+    mainly share the GIL; Batch_TSP solves many instances on processes.
+    Every solve draws from its own Random_TSP, seeded in the order of
+    the calls from seed, so with a seed and without time budgets solves
+    are reproducible however they interleave.
+
+    ...
+
+    Attributes
+    ----------
+    _settings: dict
+        keyword arguments of Genetic_TSP shared by all solves
+    _seeds: random.Random
+        source of per-solve seeds
+    _slots: asyncio.Semaphore
+        slices that may be queued or running, created with the first
+        solve since it belongs to its event loop
+
+    Methods
+    -------
+    solve_iter(graph, ...)
+        Async iterator of Improvement of the best path of a solve.
+    solve(graph, ...)
+        Returns the last Improvement of a solve, None if nothing was found.
+    close()
+        Shuts the thread pool down.
+    """
+
+    def __init__(self, max_workers:int=1, slice_time:float=0.05, population_size:int=100,
+                 populate_mix:dict|None=None, seed=None, **settings):
+        if max_workers < 1:
+            raise ValueError('At least one worker is needed.')
+        self._max_workers = max_workers
+        self._slice_time = slice_time
+        self._settings = dict(settings, population_size=population_size)
+        #construction heuristics make a good population fast, which matters
+        #more than usual when a deadline is near
+        if populate_mix is None:
+            populate_mix = {'nearest_neighbour': 1, 'random_insertion': 1}
+        self._populate_mix = populate_mix
+        self._seeds = random.Random(seed)
+        self._executor = None
+        self._slots = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='Async_TSP')
+        return self._executor
+
+    async def _slice(self, generations, deadline:float|None, duration:float) -> tuple:
+        """Runs _run_slice on the pool once a slot is free, see _slots."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_workers)
+        slots = self._slots
+        await slots.acquire()
+        future = self._pool().submit(_run_slice, generations, perf_counter() + self._slice_time, deadline, duration)
+        #the slot is freed when the slice ends, not when its awaiting solve
+        #is cancelled, so cancelled solves never overfill the pool
+        def release(future):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(slots.release)
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def solve_iter(self, graph, starting_position=None, cyclical:bool=False, generations:int|None=None,
+                         time_budget:float|None=None, target_score:float|None=None, stagnation:int|None=None,
+                         populate_mix:dict|None=None):
+        """
+        Solves graph, yielding an Improvement whenever the best path
+        improved. Stopping criteria are those of Genetic_TSP.iter_generations,
+        time_budget counts from the call, time spent waiting for the
+        pool included. Cancelling the consuming task or leaving the
+        iteration stops the solve.
+        """
+        if generations is None and time_budget is None and target_score is None and stagnation is None:
+            raise ValueError('At least one stopping criterion is needed.')
+        start = perf_counter()
+        deadline = start + time_budget if time_budget is not None else None
+        test_tube = Genetic_TSP(graph, starting_position=starting_position, cyclical=cyclical,
+                                seed=self._seeds.getrandbits(64), **self._settings)
+        criteria = {'generations': generations, 'target_score': target_score, 'stagnation': stagnation}
+        steps = _generations(test_tube, populate_mix or self._populate_mix, criteria)
+        best_score = MISSING_EDGE
+        duration = 0.0
+        finished = False
+        while not finished:
+            finished, duration = await self._slice(steps, deadline, duration)
+            best = test_tube._best_ind
+            if best is not None and best.score < best_score:
+                best_score = best.score
+                yield Improvement(test_tube.best_path(), best.score, test_tube._generation, perf_counter() - start)
+
+    async def solve(self, graph, starting_position=None, cyclical:bool=False, generations:int|None=None,
+                    time_budget:float|None=None, target_score:float|None=None, stagnation:int|None=None,
+                    populate_mix:dict|None=None) -> Improvement|None:
+        """Runs solve_iter to the end and returns its last Improvement, None if nothing feasible was found."""
+        last = None
+        async for last in self.solve_iter(graph, starting_position, cyclical, generations, time_budget,
+                                          target_score, stagnation, populate_mix):
+            pass
+        return last
+
+if __name__ == "__main__":
+    from random import randint
+    from graph import Graph
+    def ring_graph(vertices):
+        adj_dict = {}
+        for source in range(vertices):
+            adj_dict[source] = {}
+            for target in range(vertices):
+                if target == (source+1) % vertices:
+                    adj_dict[source][target] = 1
+                elif source != target:
+                    adj_dict[source][target] = randint(2,50)
+        return Graph(graph=adj_dict)
+    async def main():
+        with Async_TSP() as solver:
+            #the event loop keeps ticking while solves share the pool
+            ticks = 0
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            tick_task = asyncio.create_task(ticker())
+            start = perf_counter()
+            results = await asyncio.gather(*(solver.solve(ring_graph(40), 0, True, time_budget=1.0)
+                                             for _ in range(4)))
+            tick_task.cancel()
+            print(f'{len(results)} solves in {perf_counter()-start:.02f} seconds, scores '
+                  f'{[result.score for result in results]}, {ticks} event loop ticks')
+    asyncio.run(main())
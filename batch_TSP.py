@@ -0,0 +1,213 @@
+from graph import Graph, MISSING_EDGE
+from genetic_TSP import Genetic_TSP
+from exact_TSP import held_karp, HELD_KARP_MAX_VERTICES
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from collections import namedtuple
+from itertools import islice
+from time import perf_counter
+import random
+import os
+
+#problem to solve: key identifies it in results, graph is a Graph or any
+#frozen graph, time_budget (seconds) overrides the one of Batch_TSP
+Routing_Instance = namedtuple('Routing_Instance', ['key', 'graph', 'starting_position', 'cyclical', 'time_budget'],
+                              defaults=[None, True, None])
+
+#best path found for an instance, path and score are None and inf when
+#no feasible path was found
+Batch_Result = namedtuple('Batch_Result', ['key', 'path', 'score', 'generations', 'elapsed'])
+
+def _generations(test_tube:Genetic_TSP, populate_mix:dict, criteria:dict):
+    """
+    iter_generations of test_tube, populated on the first step. Deadlines
+    are checked by _solve_chunk, the clock of iter_generations would
+    only start with its first step.
+    """
+    test_tube.populate(populate_mix)
+    yield from test_tube.iter_generations(criteria['generations'], None, criteria['target_score'],
+                                          criteria['stagnation'])
+
+def _solve_chunk(instances:list, settings:dict, populate_mix:dict, criteria:dict, seed:int,
+                 exact_limit:int=0) -> list:
+    """
+    Solves instances inside a worker process. Ones of up to exact_limit
+    vertices are solved with held_karp, the others are interleaved: each
+    instance in turn is populated or runs one generation, until every
+    one of them stops. Time budgets count from the start of the chunk,
+    waiting for other instances included: an instance stops before
+    a generation that would not finish by its deadline (estimated by
+    the length of its previous one), so its result is ready within its
+    budget. Every instance draws from its own Random_TSP, seeded from
+    seed.
+    """
+    seeds = random.Random(seed)
+    start = perf_counter()
+    running = []
+    results = []
+    for instance in instances:
+        if instance.graph.vertices_count <= exact_limit:
+            solution = held_karp(instance.graph, instance.starting_position, instance.cyclical)
+            results.append(Batch_Result(instance.key, solution.path, solution.score, 0, perf_counter() - start))
+            continue
+        test_tube = Genetic_TSP(instance.graph, starting_position=instance.starting_position,
+                                cyclical=instance.cyclical, seed=seeds.getrandbits(64), **settings)
+        budget = instance.time_budget if instance.time_budget is not None else criteria['time_budget']
+        deadline = start + budget if budget is not None else None
+        generations = _generations(test_tube, populate_mix, criteria)
+        #duration of the last step, None before the first one, which always runs
+        running.append((instance, test_tube, generations, deadline, None))
+    while running:
+        still_running = []
+        for instance, test_tube, generations, deadline, duration in running:
+            started = perf_counter()
+            if deadline is not None and duration is not None and started + duration > deadline:
+                results.append(_result(instance, test_tube, started - start))
+                continue
+            try:
+                next(generations)
+            except (StopIteration, ValueError):
+                #ValueError: the population died out, nothing feasible was found
+                results.append(_result(instance, test_tube, perf_counter() - start))
+                continue
+            still_running.append((instance, test_tube, generations, deadline, perf_counter() - started))
+        running = still_running
+    return results
+
+def _result(instance:Routing_Instance, test_tube:Genetic_TSP, elapsed:float) -> Batch_Result:
+    best = test_tube._best_ind
+    if best is None or best.score == MISSING_EDGE:
+        return Batch_Result(instance.key, None, MISSING_EDGE, test_tube._generation, elapsed)
+    return Batch_Result(instance.key, test_tube.best_path(), best.score, test_tube._generation, elapsed)
+
+
+class Batch_TSP:
+    """
+    Solves many small instances on a shared process pool.
+
+    Instances are frozen (so only flat arrays travel between
+    processes, not dictionaries) and sent to the workers in chunks of
+    chunk_size, whose generations are interleaved. Instances of up to
+    exact_limit vertices are solved exactly instead. Every instance stops
+    at its time budget, after generations generations or when its best
+    score didn't improve for stagnation generations. Results come back
+    a chunk at a time, as chunks complete; at most two chunks per worker
+    are in flight, so arbitrarily long streams of instances can be solved.
+
+    ...
+
+    Attributes
+    ----------
+    _settings: dict
+        keyword arguments of Genetic_TSP shared by all instances
+    _criteria: dict
+        stopping criteria of iter_generations
+    _max_workers: int
+        processes of the pool
+    _seeds: random.Random
+        source of per-chunk seeds
+
+    Methods
+    -------
+    solve_iter(instances)
+        Yields Batch_Result of every instance, a chunk at a time.
+    solve(instances)
+        Returns Batch_Result of every instance, in the order of instances.
+    close()
+        Shuts the process pool down.
+    """
+
+    def __init__(self, max_workers:int|None=None, chunk_size:int=8, time_budget:float=1.0,
+                 generations:int|None=None, stagnation:int|None=50, target_score:float|None=None,
+                 population_size:int=50, populate_mix:dict|None=None, exact_limit:int=HELD_KARP_MAX_VERTICES,
+                 seed=None, **settings):
+        if chunk_size < 1:
+            raise ValueError('Chunks have to hold at least one instance.')
+        if time_budget is None and generations is None and stagnation is None and target_score is None:
+            raise ValueError('At least one stopping criterion is needed.')
+        self._max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self._chunk_size = chunk_size
+        self._exact_limit = exact_limit
+        self._criteria = {'time_budget': time_budget, 'generations': generations,
+                          'stagnation': stagnation, 'target_score': target_score}
+        #small instances are best started from construction heuristics
+        if populate_mix is None:
+            populate_mix = {'nearest_neighbour': 1, 'random_insertion': 1}
+        self._settings = dict(settings, population_size=population_size)
+        self._populate_mix = populate_mix
+        self._seeds = random.Random(seed)
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+        return self._executor
+
+    def _chunks(self, instances):
+        instances = iter(instances)
+        while True:
+            chunk = [instance._replace(graph=instance.graph.freeze())
+                     for instance in islice(instances, self._chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+
+    def _submit(self, chunk:list):
+        return self._pool().submit(_solve_chunk, chunk, self._settings, self._populate_mix, self._criteria,
+                                   self._seeds.getrandbits(64), self._exact_limit)
+
+    def solve_iter(self, instances):
+        """
+        Yields Batch_Result of every instance. Results of a chunk come
+        together once all of its instances are solved, chunks in the
+        order they complete.
+        """
+        chunks = self._chunks(instances)
+        limit = 2 * self._max_workers
+        pending = set()
+        for chunk in chunks:
+            pending.add(self._submit(chunk))
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+    def solve(self, instances) -> list:
+        """Returns Batch_Result of every instance, in the order of instances."""
+        instances = list(instances)
+        results = {result.key: result for result in self.solve_iter(instances)}
+        return [results[instance.key] for instance in instances]
+
+if __name__ == "__main__":
+    from random import randint
+    def ring_instance(key, vertices):
+        adj_dict = {}
+        for source in range(vertices):
+            adj_dict[source] = {}
+            for target in range(vertices):
+                if target == (source+1) % vertices:
+                    adj_dict[source][target] = 1
+                elif source != target:
+                    adj_dict[source][target] = randint(2,50)
+        return Routing_Instance(key, Graph(graph=adj_dict), starting_position=0, cyclical=True)
+    instances = [ring_instance(key, randint(10, 60)) for key in range(200)]
+    start = perf_counter()
+    with Batch_TSP(time_budget=0.5, seed=1) as batch:
+        solved = 0
+        for result in batch.solve_iter(instances):
+            solved += 1
+    print(f'{solved} instances solved in {perf_counter()-start:.02f} seconds')
@@ -0,0 +1,340 @@
+"""
+Benchmarks of the Genetic_TSP hot paths.
+
+Every instance is timed stage by stage: populate, cost of a population
+on Graph (one path at a time) and on the frozen graph (in one batch),
+is_feasible, mutate and next_generation. Peak memory of building the
+instance and its population is measured separately, since tracemalloc
+slows everything it traces.
+
+    python benchmark_TSP.py                         run the suite and print it
+    python benchmark_TSP.py --save baseline.json    also store the results
+    python benchmark_TSP.py --compare baseline.json fail on regressions
+    python benchmark_TSP.py --profile               cProfile of next_generation
+"""
+from graph import Graph, FrozenGraph, MISSING_EDGE
+from genetic_TSP import Genetic_TSP, Individual_TSP
+import graph as graph_module
+from array import array
+from collections import defaultdict
+from math import sqrt
+from random import randint, shuffle, random, seed, getstate, setstate
+from time import perf_counter
+import argparse
+import cProfile
+import json
+import pstats
+import sys
+import tracemalloc
+
+def ring_graph(vertices:int=20) -> Graph:
+    """
+    Complete directed graph where the ring 0, 1, ..., 0 costs 1 per edge
+    and every other edge 2 to 50, as in genetic_TSP.py. The best cycle
+    costs vertices.
+    """
+    graph = Graph()
+    for source in range(vertices):
+        for target in range(vertices):
+            if target == (source+1) % vertices:
+                graph.add_edge(source, target, 1)
+            elif source != target:
+                graph.add_edge(source, target, randint(2,50))
+    return graph
+
+def sparse_graph() -> Graph:
+    """
+    Ring graph of 20 vertices with 20 more vertices, each with up to 10
+    edges to vertices before it and up to 5 edges from the ring, as in
+    genetic_TSP.py. Paths have to visit some vertices more than once.
+    """
+    graph = ring_graph(20)
+    for source in range(20, 40):
+        for _ in range(10):
+            graph.add_edge(source, randint(0, source-1), randint(1,50))
+    for source in range(20):
+        for _ in range(5):
+            graph.add_edge(source, randint(20, 39), randint(1,50))
+    return graph
+
+def euclidean_points(vertices:int) -> list:
+    """Returns vertices random points in the unit square."""
+    return [(random(), random()) for _ in range(vertices)]
+
+def euclidean_graph(points:list) -> FrozenGraph:
+    """Complete undirected graph of Euclidean distances, built straight into the matrix."""
+    n = len(points)
+    weights = array('d', [MISSING_EDGE]) * (n*n)
+    for i, (x1, y1) in enumerate(points):
+        for j in range(i+1, n):
+            x2, y2 = points[j]
+            weights[i*n + j] = weights[j*n + i] = sqrt((x1-x2)**2 + (y1-y2)**2)
+    return FrozenGraph(range(n), weights, directed=False)
+
+def snake_tour(points:list) -> list:
+    """
+    Visits points strip by strip, left to right and back, closed back
+    to the first one. A reasonable tour found in linear time.
+    """
+    strips = max(1, int(sqrt(len(points) / 2)))
+    rows = defaultdict(list)
+    for i, (x, y) in enumerate(points):
+        rows[min(int(y * strips), strips-1)].append((x, i))
+    order = []
+    for row in range(strips):
+        row_points = sorted(rows[row], reverse=row % 2 == 1)
+        order.extend(i for _, i in row_points)
+    return order + order[:1]
+
+def knn_graph(points:list, k:int=8) -> Graph:
+    """
+    Undirected graph joining every point to about k nearest points,
+    found in the neighbouring cells of a grid, plus the edges of
+    snake_tour, so the tour is always feasible.
+    """
+    n = len(points)
+    cells = max(1, int(sqrt(n / k)))
+    grid = defaultdict(list)
+    for i, (x, y) in enumerate(points):
+        grid[min(int(x * cells), cells-1), min(int(y * cells), cells-1)].append(i)
+    graph = Graph(directed=False)
+    def distance(i, j):
+        return sqrt((points[i][0]-points[j][0])**2 + (points[i][1]-points[j][1])**2)
+    for (cx, cy), members in grid.items():
+        candidates = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in grid.get((cx+dx, cy+dy), ())]
+        for i in members:
+            for j in sorted(candidates, key=lambda j: distance(i, j))[1:k+1]:
+                graph.add_edge(i, j, distance(i, j))
+    tour = snake_tour(points)
+    for i, j in zip(tour, tour[1:]):
+        if i != j:
+            graph.add_edge(i, j, distance(i, j))
+    return graph
+
+def best_time(function, repeat:int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+def peak_memory(function) -> int:
+    """Peak of memory allocated by function, in bytes."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+#instances: name, function building the graph, population size and either
+#populate mix or None to start from mutated copies of a known tour
+def instances(sizes) -> list:
+    result = [{'name': 'ring_20', 'build': lambda: ring_graph(20), 'population_size': 100,
+               'mix': {'random_walk': 1}},
+              {'name': 'sparse_40', 'build': sparse_graph, 'population_size': 100,
+               'mix': {'nearest_neighbour': 1, 'greedy_edge': 1, 'random_insertion': 1}}]
+    for size in sizes:
+        result.append({'name': f'euclidean_{size}', 'size': size, 'population_size': 100, 'mix': None})
+    return result
+
+#Euclidean instances up to this size are complete graphs, larger ones k-NN graphs
+EUCLIDEAN_DENSE_LIMIT = 2000
+#individuals is_feasible is timed on, per individual
+FEASIBILITY_SAMPLE = 5
+#seconds after which generations stop on large instances
+GENERATIONS_BUDGET = 5.0
+
+def build_instance(instance:dict) -> tuple:
+    """Returns the graph for Genetic_TSP, Graph builder (or None) and a feasible tour (or None)."""
+    if 'build' in instance:
+        graph = instance['build']()
+        return graph.freeze(), graph, None
+    points = euclidean_points(instance['size'])
+    if instance['size'] <= EUCLIDEAN_DENSE_LIMIT:
+        tour = list(range(instance['size'])) + [0]
+        return euclidean_graph(points), None, tour
+    builder = knn_graph(points)
+    tour = snake_tour(points)
+    #tours have to start at the starting position, vertex 0
+    start = tour.index(0)
+    tour = tour[start:-1] + tour[:start] + [0]
+    return builder.freeze(), builder, tour
+
+def initial_population(test_tube:Genetic_TSP, instance:dict, tour:list|None) -> None:
+    if instance['mix'] is not None:
+        test_tube.populate(instance['mix'])
+        return
+    if tour is not None and instance['size'] <= EUCLIDEAN_DENSE_LIMIT:
+        #complete graph, any order of vertices is a tour
+        population = []
+        for _ in range(test_tube._population_size):
+            body = tour[1:-1]
+            shuffle(body)
+            population.append(Individual_TSP([0] + body + [0]))
+        test_tube._population = population
+        return
+    parent = Individual_TSP(list(tour))
+    parent.score = test_tube._problem_map.calculate_cost(parent.genome)
+    population = [parent]
+    safety_check = test_tube._population_size * 1000
+    while len(population) < test_tube._population_size and safety_check > 0:
+        safety_check -= 1
+        child = test_tube.mutate(population[randint(0, len(population)-1)])
+        if child is not None:
+            population.append(child)
+    test_tube._population = population
+
+def bench_instance(instance:dict, repeat:int=3, generations:int=10) -> dict:
+    """
+    Times every stage on one instance, in seconds unless the name says
+    otherwise: stages on the whole population, is_feasible per individual,
+    next_generation per generation. Peak memory is that of building the
+    instance and its population.
+    """
+    #random instances and populations are rebuilt from the same state,
+    #so every repetition does the same work
+    state = getstate()
+    def build():
+        setstate(state)
+        return build_instance(instance)
+    result = {'build_s': best_time(build, repeat)}
+    frozen, builder, tour = build()
+    result['vertices'] = frozen.vertices_count
+    test_tube = Genetic_TSP(frozen, population_size=instance['population_size'], starting_position=0, cyclical=True)
+    state = getstate()
+    solver_state = test_tube._random.getstate()
+    def populate():
+        setstate(state)
+        test_tube._random.setstate(solver_state)
+        initial_population(test_tube, instance, tour)
+    result['populate_s'] = best_time(populate, repeat)
+    population = test_tube._population
+    genomes = [ind.genome for ind in population]
+    result['genome_length'] = sum(map(len, genomes)) / len(genomes)
+
+    if builder is not None:
+        result['calculate_cost_s'] = best_time(lambda: [builder.calculate_costs([genome]) for genome in genomes], repeat)
+    batch = best_time(lambda: frozen.calculate_costs(genomes), repeat)
+    result['calculate_costs_s'] = batch
+    result['evaluations_per_s'] = len(genomes) / batch if batch else float('inf')
+    #is_feasible is timed on a sample, it is slow on long genomes
+    sample = population[:FEASIBILITY_SAMPLE]
+    result['is_feasible_s'] = best_time(lambda: [test_tube.is_feasible(ind) for ind in sample], repeat) / len(sample)
+    test_tube.calculate_fitness()
+    mutations = 1000
+    result['mutate_s'] = best_time(lambda: [test_tube.mutate(population[i % len(population)])
+                                            for i in range(mutations)], repeat)
+    result['mutations_per_s'] = mutations / result['mutate_s']
+
+    test_tube._population = list(population)
+    test_tube.choose_best()
+    start = perf_counter()
+    for stats in test_tube.iter_generations(generations, time_budget=GENERATIONS_BUDGET):
+        pass
+    elapsed = perf_counter() - start
+    result['next_generation_s'] = elapsed / max(1, stats.generation)
+    result['generations_per_s'] = stats.generation / elapsed
+    result['best_score'] = stats.best
+
+    def populated():
+        frozen, builder, tour = build_instance(instance)
+        test_tube = Genetic_TSP(frozen, population_size=instance['population_size'], starting_position=0, cyclical=True)
+        initial_population(test_tube, instance, tour)
+    result['peak_memory_bytes'] = peak_memory(populated)
+    return result
+
+def run_suite(sizes, repeat:int=3, generations:int=10, random_seed:int=0) -> dict:
+    results = {}
+    for instance in instances(sizes):
+        seed(random_seed)
+        results[instance['name']] = bench_instance(instance, repeat, generations)
+    return results
+
+#metrics where lower is better, compared against baselines
+COMPARED = ('_s', '_bytes')
+#differences smaller than this many seconds are noise, never regressions
+NOISE_S = 5e-3
+
+def regressions(results:dict, baseline:dict, threshold:float) -> list:
+    """Returns (instance, metric, baseline, current) of metrics worse than baseline by more than threshold."""
+    found = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            #rates are derived from timings, which are compared already
+            if old is None or not metric.endswith(COMPARED) or metric.endswith('_per_s'):
+                continue
+            if metric.endswith('_s') and value - old < NOISE_S:
+                continue
+            if value > old * (1 + threshold):
+                found.append((name, metric, old, value))
+    return found
+
+def print_results(results:dict) -> None:
+    for name, metrics in results.items():
+        print(f"{name} ({metrics['vertices']} vertices, genomes of {metrics['genome_length']:.0f} genes)")
+        for metric, value in metrics.items():
+            if metric.endswith('_per_s'):
+                print(f"  {metric[:-6].replace('_', ' ') + ' per second':<20} {value:10.01f}")
+            elif metric.endswith('_s'):
+                print(f"  {metric[:-2].replace('_', ' '):<20} {value*1000:10.02f} ms")
+        print(f"  {'peak memory':<20} {metrics['peak_memory_bytes']/2**20:10.02f} MB")
+        print(f"  {'best score':<20} {metrics['best_score']:10.02f}")
+
+def profile(sizes, generations:int=10, random_seed:int=0, top:int=20) -> None:
+    """Prints functions taking the most time during generations on the largest instance."""
+    seed(random_seed)
+    instance = instances(sizes)[-1]
+    frozen, _, tour = build_instance(instance)
+    test_tube = Genetic_TSP(frozen, population_size=instance['population_size'], starting_position=0, cyclical=True)
+    initial_population(test_tube, instance, tour)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(generations):
+        test_tube.next_generation()
+        test_tube.choose_best()
+    profiler.disable()
+    print(f"Profile of {generations} generations on {instance['name']}")
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of Genetic_TSP hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[50, 200, 1000, 10000],
+                        help='vertices of random Euclidean instances')
+    parser.add_argument('--quick', action='store_true', help='only small instances, one repetition')
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs of every stage')
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='JSON', help='write results to a baseline file')
+    parser.add_argument('--compare', metavar='JSON', help='fail if results are worse than this baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown before a regression is reported')
+    parser.add_argument('--profile', action='store_true', help='profile next_generation instead')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sizes = [size for size in args.sizes if size <= 200]
+        args.repeat = 1
+    if args.profile:
+        profile(args.sizes, args.generations, args.seed)
+        return 0
+    results = run_suite(args.sizes, args.repeat, args.generations, args.seed)
+    print_results(results)
+    if graph_module.numpy is None:
+        print('NumPy is not installed, FrozenGraph used its pure Python fallback.')
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        found = regressions(results, baseline, args.threshold)
+        for name, metric, old, new in found:
+            print(f'REGRESSION {name} {metric}: {old:.6g} -> {new:.6g}')
+        if found:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Bounded memo of genome scores and feasibility for Genetic_TSP.
+
+Genomes are keyed by hash(tuple(genome)), a 64-bit hash computed in C.
+Distinct genomes sharing a key would share an entry; with keys of 64 bits
+and a cache of a million entries that's about one chance in 10^7 per run,
+small enough to trade for not storing the genomes themselves.
+"""
+from collections import OrderedDict
+
+SCORE = 0
+FEASIBLE = 1
+
+class Fitness_Cache:
+    """
+    LRU cache of score and feasibility of genomes.
+
+    Each entry holds a score and a feasibility flag, either of which may
+    still be unknown (None). When maxsize entries are stored, adding one
+    more evicts the least recently used.
+
+    ...
+
+    Attributes
+    ----------
+    hits: int
+        lookups which found the value
+    misses: int
+        lookups which didn't
+    evictions: int
+        entries dropped to keep the size within maxsize
+    """
+    __slots__ = ('_entries', '_maxsize', 'hits', 'misses', 'evictions')
+
+    def __init__(self, maxsize:int=100000):
+        if maxsize < 1:
+            raise ValueError('Cache has to hold at least one entry.')
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(genome) -> int:
+        return hash(tuple(genome))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key:int, field:int):
+        entry = self._entries.get(key)
+        if entry is None or entry[field] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[field]
+
+    def _set(self, key:int, field:int, value) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [None, None]
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(key)
+        entry[field] = value
+
+    def score(self, key:int) -> float|None:
+        """Cached score, None if unknown."""
+        return self._get(key, SCORE)
+
+    def feasible(self, key:int) -> bool|None:
+        """Cached feasibility, None if unknown."""
+        return self._get(key, FEASIBLE)
+
+    def store_score(self, key:int, score:float) -> None:
+        self._set(key, SCORE, score)
+
+    def store_feasible(self, key:int, feasible:bool) -> None:
+        self._set(key, FEASIBLE, feasible)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self)}
+
+    def clear(self) -> None:
+        #hits, misses and evictions are totals of the run, they are kept
+        self._entries.clear()
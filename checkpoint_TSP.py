@@ -0,0 +1,151 @@
+"""
+Checkpoints of Genetic_TSP runs.
+
+A checkpoint is a small header followed by raw array dumps: state of
+the Random_TSP of the run, genome of the best individual, the population
+in the form of Population_TSP and the words drawn from the current
+block of the Random_TSP, followed by the state of Adaptive_Control
+when the run has one. Writing one costs little more than
+copying these arrays, so Checkpointer can take one every few seconds,
+writing it on a background thread while the evolution goes on.
+"""
+from collections import namedtuple
+from array import array
+from time import perf_counter
+import threading
+import struct
+import sys
+import os
+
+CHECKPOINT_MAGIC = b'TSPK'
+CHECKPOINT_VERSION = 1
+#magic, version, flags, generation, vertices count, individuals, length of
+#all genomes, length of best genome, rejected candidates, best score, gauss_next
+CHECKPOINT_HEADER = struct.Struct('<4sBBxxqqqqqqdd')
+#flags
+HAS_BEST = 1
+HAS_GAUSS = 2
+BIG_ENDIAN = 4
+#words drawn from the current block of Random_TSP follow the population,
+#without them a resumed run starts a new block
+HAS_DRAWN = 8
+#state of Adaptive_Control follows: number of operators, _stale and
+#restart_due, _uses and _successes as integers, then weights, _quality,
+#survivor_fraction and _best as doubles
+HAS_CONTROL = 16
+#random.getstate() of the Mersenne Twister: 624 words and a position
+RANDOM_STATE_WORDS = 625
+
+#state of a Genetic_TSP run, see Genetic_TSP.checkpoint; population and
+#best are Population_TSP (best empty when there's none), random_state
+#is Random_TSP.getstate(), control_state Adaptive_Control.getstate()
+#or None without adaptive
+Checkpoint = namedtuple('Checkpoint', ['generation', 'vertices_count', 'population', 'best',
+                                       'random_state', 'rejected', 'control_state'], defaults=[None])
+
+def write_checkpoint(path:str, checkpoint:Checkpoint) -> None:
+    """Writes checkpoint to path, replacing the previous one only once it is complete."""
+    (version, words, gauss_next), drawn = checkpoint.random_state
+    population, best = checkpoint.population, checkpoint.best
+    flags = (HAS_BEST if len(best) else 0) | (HAS_GAUSS if gauss_next is not None else 0) | HAS_DRAWN
+    blocks = [array('I', words), best.ids, population.ids, population.offsets, population.scores,
+              array('q', [drawn])]
+    if checkpoint.control_state is not None:
+        flags |= HAS_CONTROL
+        weights, quality, uses, successes, survivor_fraction, restart_due, best_score, stale = checkpoint.control_state
+        blocks.append(array('q', [len(weights), stale, restart_due, *uses, *successes]))
+        blocks.append(array('d', [*weights, *quality, survivor_fraction, best_score]))
+    flags |= BIG_ENDIAN if sys.byteorder == 'big' else 0
+    header = CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, flags, checkpoint.generation,
+                                    checkpoint.vertices_count, len(population), len(population.ids),
+                                    len(best.ids), checkpoint.rejected,
+                                    best.scores[0] if len(best) else 0.0,
+                                    gauss_next if gauss_next is not None else 0.0)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(header)
+        for data in blocks:
+            file.write(memoryview(data).cast('B'))
+    os.replace(temporary, path)
+
+def read_checkpoint(path:str) -> Checkpoint:
+    #imported here, genetic_TSP imports this module
+    from genetic_TSP import Population_TSP
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < CHECKPOINT_HEADER.size:
+        raise ValueError(f'{path} is not a checkpoint.')
+    (magic, version, flags, generation, vertices_count, individuals, ids_length, best_length, rejected,
+     best_score, gauss_next) = CHECKPOINT_HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError(f'{path} is not a checkpoint.')
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f'Unsupported checkpoint version {version}.')
+    swapped = bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big')
+    position = CHECKPOINT_HEADER.size
+    def block(typecode:str, length:int) -> array:
+        nonlocal position
+        data_block = array(typecode)
+        end = position + length*data_block.itemsize
+        if end > len(data):
+            raise ValueError(f'{path} is truncated.')
+        data_block.frombytes(data[position:end])
+        if swapped:
+            data_block.byteswap()
+        position = end
+        return data_block
+    words, best_ids, ids, offsets, scores = (block(typecode, length) for typecode, length in
+                                             (('I', RANDOM_STATE_WORDS), ('i', best_length), ('i', ids_length),
+                                              ('q', individuals+1), ('d', individuals)))
+    drawn = block('q', 1)[0] if flags & HAS_DRAWN else 0
+    control_state = None
+    if flags & HAS_CONTROL:
+        operators, stale, restart_due = block('q', 3)
+        counts = block('q', 2*operators)
+        doubles = block('d', 2*operators + 2)
+        control_state = (tuple(doubles[:operators]), tuple(doubles[operators:2*operators]),
+                         tuple(counts[:operators]), tuple(counts[operators:]), doubles[-2], bool(restart_due),
+                         doubles[-1], stale)
+    best = Population_TSP()
+    if flags & HAS_BEST:
+        best = Population_TSP(best_ids, array('q', [0, best_length]), array('d', [best_score]))
+    random_state = ((3, tuple(words), gauss_next if flags & HAS_GAUSS else None), drawn)
+    return Checkpoint(generation, vertices_count, Population_TSP(ids, offsets, scores), best,
+                      random_state, rejected, control_state)
+
+class Checkpointer:
+    """
+    Writes checkpoints to path on a background thread, at most one every
+    interval seconds. A checkpoint taken while the previous one is still
+    being written waits for it, so they are written in order.
+
+    ...
+
+    Attributes
+    ----------
+    _last: float
+        perf_counter() of the last checkpoint
+    _thread: threading.Thread
+        thread writing the last checkpoint, None before the first one
+    """
+
+    def __init__(self, path:str, interval:float=5.0):
+        self._path = path
+        self._interval = interval
+        self._last = perf_counter()
+        self._thread = None
+
+    def due(self) -> bool:
+        return perf_counter() - self._last >= self._interval
+
+    def save(self, checkpoint:Checkpoint) -> None:
+        self.wait()
+        self._last = perf_counter()
+        self._thread = threading.Thread(target=write_checkpoint, args=(self._path, checkpoint), daemon=True)
+        self._thread.start()
+
+    def wait(self) -> None:
+        """Waits until the last checkpoint is written."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,240 @@
+"""
+Construction heuristics for the initial population of Genetic_TSP.
+
+Every heuristic builds an order of visits first and turns it into
+a genome with repair: pairs of consecutive vertices without an edge
+are joined by the shortest path between them. Heuristics return None
+when some vertex cannot be reached. Random choices are drawn from
+rng, a random.Random or the random module. What only depends on the
+graph (candidate neighbours, edges sorted by weight) is computed by
+prepare once for many calls.
+"""
+from graph import Graph, MISSING_EDGE, shortest_path, nearest_path
+from heapq import heappush, heappop, nsmallest
+from operator import itemgetter
+import random
+
+#neighbours of every vertex nearest_neighbour and random_insertion look at first
+NEAREST_CANDIDATES = 10
+
+def repair(graph:Graph, order:list, cyclical:bool=False) -> list|None:
+    """
+    Returns order with every missing edge replaced by the shortest path,
+    closed back to its first vertex if cyclical. None if a vertex
+    cannot be reached from the previous one.
+    """
+    if not order:
+        return None
+    if cyclical and len(order) > 1:
+        order = order + [order[0]]
+    genome = [order[0]]
+    for target in order[1:]:
+        if graph.edge_weight(genome[-1], target) < MISSING_EDGE:
+            genome.append(target)
+        else:
+            path = shortest_path(graph, genome[-1], target)
+            if path is None:
+                return None
+            genome.extend(path[1:])
+    return genome
+
+def _first_vertex(graph:Graph, starting_position, rng):
+    return starting_position if starting_position is not None else rng.choice(graph.vertices_list)
+
+def nearest_neighbour(graph:Graph, starting_position=None, cyclical=False, randomness:float=0.1,
+                      rng=random, candidates:dict|None=None) -> list|None:
+    """
+    Goes to the nearest unvisited neighbour, with probability randomness
+    to the second nearest one. When all neighbours were visited, goes
+    to the nearest unvisited vertex along the shortest path. Neighbours
+    are looked up in candidates, graph.nearest_neighbours(NEAREST_CANDIDATES)
+    unless given, and among all of them only when fewer than two of
+    the candidates are unvisited.
+    """
+    if candidates is None:
+        candidates = graph.nearest_neighbours(NEAREST_CANDIDATES)
+    vertex = _first_vertex(graph, starting_position, rng)
+    genome = [vertex]
+    unvisited = set(graph.vertices_list)
+    unvisited.discard(vertex)
+    while unvisited:
+        nearest = [target for target in candidates[vertex] if target in unvisited][:2]
+        if len(nearest) < 2:
+            nearest = [target for _, _, target in
+                       nsmallest(2, ((graph.edge_weight(vertex, target), i, target)
+                                     for i, target in enumerate(graph.connected_to(vertex)) if target in unvisited))]
+        if nearest:
+            pick = 1 if len(nearest) > 1 and rng.random() < randomness else 0
+            vertex = nearest[pick]
+            genome.append(vertex)
+            unvisited.discard(vertex)
+        else:
+            path = nearest_path(graph, vertex, unvisited)
+            if path is None:
+                return None
+            vertex = path[-1]
+            genome.extend(path[1:])
+            unvisited.difference_update(path)
+    return repair(graph, genome, cyclical)
+
+def sorted_edges(graph:Graph) -> list:
+    """Returns (weight, source, target) of every edge of graph, cheapest first."""
+    edges = [(graph.edge_weight(source, target), source, target)
+             for source in graph.vertices_list for target in graph.connected_to(source) if source != target]
+    #sorted by weight alone, labels don't have to be comparable
+    edges.sort(key=itemgetter(0))
+    return edges
+
+def _noisy_order(edges:list, noise:float, rng):
+    """
+    Yields (source, target) of edges, as returned by sorted_edges, in
+    order of their weights scaled by random noise. A scaled weight is
+    never below the weight, so edges wait in a heap only until an edge
+    weighing more than the cheapest of them comes.
+    """
+    heap = []
+    for i, (weight, source, target) in enumerate(edges):
+        while heap and heap[0][0] <= weight:
+            yield heappop(heap)[2:]
+        heappush(heap, (weight * (1 + noise*rng.random()), i, source, target))
+    while heap:
+        yield heappop(heap)[2:]
+
+def greedy_edge(graph:Graph, starting_position=None, cyclical=False, noise:float=0.1, rng=random,
+                edges:list|None=None) -> list|None:
+    """
+    Takes edges from the cheapest (weights scaled by random noise),
+    skipping ones that would give a vertex second outgoing or incoming
+    edge or close a cycle. Resulting fragments are chained starting
+    from the fragment of starting_position, each to the nearest head
+    of a fragment. edges are sorted_edges(graph), computed unless given.
+    """
+    vertices = graph.vertices_list
+    if edges is None:
+        edges = sorted_edges(graph)
+    successor = {}
+    has_predecessor = set()
+    #nothing can lead into the starting position, it has to open the path
+    if starting_position is not None:
+        has_predecessor.add(starting_position)
+    #union-find over fragments
+    parent = {vertex: vertex for vertex in vertices}
+    def find(vertex):
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+    #a single fragment has len(vertices) - 1 edges, no more can be taken
+    joins = len(vertices) - 1
+    for source, target in _noisy_order(edges, noise, rng):
+        if len(successor) == joins:
+            break
+        if source in successor or target in has_predecessor:
+            continue
+        root_source, root_target = find(source), find(target)
+        if root_source == root_target:
+            continue
+        parent[root_source] = root_target
+        successor[source] = target
+        has_predecessor.add(target)
+
+    heads = [vertex for vertex in vertices if vertex not in has_predecessor or vertex == starting_position]
+    rng.shuffle(heads)
+    fragments = {}
+    for head in heads:
+        fragment = [head]
+        while fragment[-1] in successor:
+            fragment.append(successor[fragment[-1]])
+        fragments[head] = fragment
+    head = _first_vertex(graph, starting_position, rng)
+    if head not in fragments:
+        head = heads[0]
+    genome = list(fragments.pop(head))
+    while fragments:
+        path = nearest_path(graph, genome[-1], fragments)
+        if path is None:
+            return None
+        genome.extend(fragments.pop(path[-1]))
+    return repair(graph, genome, cyclical)
+
+def random_insertion(graph:Graph, starting_position=None, cyclical=False, rng=random,
+                     candidates:dict|None=None) -> list|None:
+    """
+    Inserts vertices in random order, each where it adds the least
+    cost between its new neighbours. Only places next to candidates
+    of the vertex, graph.nearest_neighbours(NEAREST_CANDIDATES) unless
+    given, are tried; all places only when none of the candidates
+    is in the path yet or they would all need a missing edge. Missing
+    edges count as infinitely expensive, so they are only used when
+    there's no other choice and are repaired afterwards.
+    """
+    if candidates is None:
+        candidates = graph.nearest_neighbours(NEAREST_CANDIDATES)
+    first = _first_vertex(graph, starting_position, rng)
+    others = [other for other in graph.vertices_list if other != first]
+    rng.shuffle(others)
+    #the path as a linked list, None follows the last vertex and precedes the first
+    following, preceding = {first: None}, {first: None}
+    last = first
+    weight = graph.edge_weight
+    def insertion_cost(previous, vertex):
+        after = following[previous]
+        #inserting at the end of cyclical path replaces the closing edge
+        if after is None and cyclical and len(following) > 1:
+            after = first
+        if after is None:
+            return weight(previous, vertex)
+        cost = weight(previous, vertex) + weight(vertex, after) - weight(previous, after)
+        #nan when neither the old nor the new edges exist
+        return cost if cost == cost else MISSING_EDGE
+    for vertex in others:
+        #vertices to insert after, nothing goes before the first one;
+        #before the first of cyclical path is the end of it
+        places = {}
+        for candidate in candidates[vertex]:
+            if candidate in following:
+                places[candidate] = None
+                previous = preceding[candidate]
+                if previous is not None:
+                    places[previous] = None
+                elif cyclical:
+                    places[last] = None
+        best_cost, best_place = MISSING_EDGE, None
+        for place in places:
+            cost = insertion_cost(place, vertex)
+            if cost < best_cost:
+                best_cost, best_place = cost, place
+        if best_place is None:
+            best_cost, best_place = insertion_cost(last, vertex), last
+            place = first
+            while place is not last:
+                cost = insertion_cost(place, vertex)
+                if cost < best_cost:
+                    best_cost, best_place = cost, place
+                place = following[place]
+        after = following[best_place]
+        following[best_place], following[vertex] = vertex, after
+        preceding[vertex] = best_place
+        if after is None:
+            last = vertex
+        else:
+            preceding[after] = vertex
+    order = [first]
+    while following[order[-1]] is not None:
+        order.append(following[order[-1]])
+    return repair(graph, order, cyclical)
+
+STRATEGIES = {'nearest_neighbour': nearest_neighbour,
+              'greedy_edge': greedy_edge,
+              'random_insertion': random_insertion}
+
+def prepare(name:str, graph:Graph) -> dict:
+    """
+    Returns keyword arguments of STRATEGIES[name] that only depend on
+    graph, computed once for all individuals a strategy makes.
+    """
+    if name in ('nearest_neighbour', 'random_insertion'):
+        return {'candidates': graph.nearest_neighbours(NEAREST_CANDIDATES)}
+    if name == 'greedy_edge':
+        return {'edges': sorted_edges(graph)}
+    return {}
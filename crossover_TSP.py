@@ -0,0 +1,93 @@
+"""
+Recombination operators for Genetic_TSP.
+
+Operators take two parent sequences holding the same genes (labels
+or integer ids) and return a child holding the same genes as well.
+order_crossover also accepts genes visited more than once; the other
+operators need permutations, every gene present once. Random choices
+are drawn from rng, a random.Random or the random module.
+"""
+from collections import Counter
+import random
+
+def _cut_points(length:int, rng) -> tuple:
+    start, end = sorted(rng.sample(range(length+1), 2))
+    return start, end
+
+def order_crossover(parent1:list, parent2:list, rng=random) -> list:
+    """
+    OX: child keeps a slice of parent1 in place, the remaining genes
+    follow in the order they appear in parent2, starting after the slice.
+    """
+    length = len(parent1)
+    if length < 2:
+        return list(parent1)
+    start, end = _cut_points(length, rng)
+    segment = parent1[start:end]
+    #genes of the segment, each skipped once when walking parent2
+    skipped = Counter(segment)
+    rest = []
+    for gene in parent2[end:] + parent2[:end]:
+        if skipped[gene] > 0:
+            skipped[gene] -= 1
+        else:
+            rest.append(gene)
+    return rest[length-end:] + segment + rest[:length-end]
+
+def partially_mapped_crossover(parent1:list, parent2:list, rng=random) -> list:
+    """
+    PMX: child keeps a slice of parent1 in place, genes of parent2 in
+    that slice move to the positions given by the mapping between the
+    parents, everything else is copied from parent2.
+    """
+    length = len(parent1)
+    if length < 2:
+        return list(parent1)
+    start, end = _cut_points(length, rng)
+    child = [None] * length
+    child[start:end] = parent1[start:end]
+    segment = set(parent1[start:end])
+    position = {gene: i for i, gene in enumerate(parent2)}
+    for i in range(start, end):
+        gene = parent2[i]
+        if gene in segment:
+            continue
+        pos = i
+        while start <= pos < end:
+            pos = position[parent1[pos]]
+        child[pos] = gene
+    for i in range(length):
+        if child[i] is None:
+            child[i] = parent2[i]
+    return child
+
+def edge_recombination(parent1:list, parent2:list, rng=random) -> list:
+    """
+    ERX: child starts with the first gene of parent1 and goes on to
+    the neighbour (in either parent) with the fewest neighbours left,
+    so it is made mostly of edges present in the parents.
+    """
+    if len(parent1) < 2:
+        return list(parent1)
+    neighbours = {gene: set() for gene in parent1}
+    for parent in (parent1, parent2):
+        for previous, following in zip(parent, parent[1:]):
+            neighbours[previous].add(following)
+            neighbours[following].add(previous)
+    gene = parent1[0]
+    child = [gene]
+    while len(child) < len(parent1):
+        candidates = neighbours.pop(gene)
+        for neighbour in candidates:
+            neighbours[neighbour].discard(gene)
+        if candidates:
+            #random number breaks ties, genes don't have to be comparable
+            gene = min(candidates, key=lambda candidate: (len(neighbours[candidate]), rng.random()))
+        else:
+            gene = rng.choice(list(neighbours))
+        child.append(gene)
+    return child
+
+OPERATORS = {'ox': order_crossover,
+             'pmx': partially_mapped_crossover,
+             'erx': edge_recombination}
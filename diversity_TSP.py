@@ -0,0 +1,309 @@
+"""
+Diversity of a Genetic_TSP population and control driven by it.
+
+Population_Diversity keeps a histogram of edges used by the population
+and a count of distinct genomes. Both follow the population as it
+breeds: a child made by mutation differs from its parent by a few
+edges, so it is counted from the parent and those edges instead of
+from its whole genome.
+
+Adaptive_Control turns these counts into settings of the next
+generation: weights of mutation operators, share of survivors and,
+when the population collapsed onto one basin for long enough, a
+restart.
+"""
+from collections import Counter, defaultdict
+from random import Random
+import random
+from math import log
+from operator import mul
+
+#fingerprints are sums of hashes of edges modulo 2**64
+FINGERPRINT_MASK = (1 << 64) - 1
+#seed of random numbers of vertices hashes of edges are made of
+FINGERPRINT_SEED = 0
+#mutation operators of Genetic_TSP.mutate, in the order of Adaptive_Control.weights
+OPERATORS = ('delete', 'insert', 'swap', 'reverse', 'move')
+DELETE, INSERT, SWAP, REVERSE, MOVE = range(len(OPERATORS))
+#weights before anything is learned, close to the fixed probabilities of mutate
+INITIAL_WEIGHTS = (0.1, 0.1, 0.6, 0.1, 0.1)
+#no operator is ever dropped completely
+MIN_WEIGHT = 0.02
+#how fast success rates of operators follow the last generation
+LEARNING_RATE = 0.3
+#share of the population surviving when diversity is on target and far below it
+MIN_SURVIVORS = 0.1
+MAX_SURVIVORS = 0.25
+
+def _mirrored(edges:list) -> list:
+    return edges + [(target, source) for source, target in edges]
+
+class Population_Diversity:
+    """
+    Edge histogram and genome fingerprints of a population.
+
+    The fingerprint of a genome is the sum of hashes of its edges, so
+    a mutation changes it by the hashes of edges it removes and adds.
+    The hash of edge (a, b) is the product of random 64-bit numbers of
+    a as a source and b as a target; unlike hashes of tuples, sums of
+    these don't collide for genomes differing by a few edges.
+    Genomes made of the same edges share a fingerprint: rotations of
+    a cycle count as one genome, so do both directions of a path in
+    undirected graphs. There every edge is counted in both directions,
+    so reversing a part of a genome changes nothing.
+
+    A generation is counted between start and finish: children made by
+    mutation are passed to inherit with the edges the mutation changed,
+    other individuals to add. Edges of every parent are counted once
+    for all of its children by finish.
+
+    ...
+
+    Attributes
+    ----------
+    edges: Counter
+        {edge: uses of the edge by the whole population}, may hold
+        edges used 0 times
+    genomes: Counter
+        {fingerprint: individuals with that fingerprint}
+    population: list
+        population list counted, compared by identity with the one of
+        Genetic_TSP to tell if the counts are up to date
+    _sources, _targets: dict
+        {vertex: random number} hashes of edges are made of
+    _edge_diversity: float
+        edge_diversity of the counts, None until it is computed
+    _parents: dict
+        {id(parent): [parent, children]} of the generation being counted
+    _added, _removed: list
+        edges added and removed by mutations of the generation being counted
+    """
+
+    def __init__(self, vertices, directed:bool=True):
+        self._directed = directed
+        rng = Random(FINGERPRINT_SEED)
+        self._sources = {vertex: rng.getrandbits(64) for vertex in vertices}
+        self._targets = {vertex: rng.getrandbits(64) for vertex in vertices}
+        self.population = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.edges = Counter()
+        self.genomes = Counter()
+        self._edge_diversity = None
+        self._parents = {}
+        self._added = []
+        self._removed = []
+
+    def _genome_keys(self, genome) -> list:
+        keys = list(zip(genome, genome[1:]))
+        if not self._directed:
+            keys += zip(genome[1:], genome)
+        return keys
+
+    def _hash(self, sources, targets) -> int:
+        """Sum of hashes of edges from sources to targets."""
+        return sum(map(mul, map(self._sources.__getitem__, sources), map(self._targets.__getitem__, targets)))
+
+    def fingerprint(self, genome) -> int:
+        fingerprint = self._hash(genome, genome[1:])
+        if not self._directed:
+            fingerprint += self._hash(genome[1:], genome)
+        return fingerprint & FINGERPRINT_MASK
+
+    def _edges_hash(self, edges:list) -> int:
+        return self._hash(*zip(*edges)) if edges else 0
+
+    def _count(self, ind, add:bool=True) -> None:
+        keys = self._genome_keys(ind.genome)
+        if ind.fingerprint is None:
+            ind.fingerprint = self.fingerprint(ind.genome)
+        if add:
+            self.edges.update(keys)
+            self.genomes[ind.fingerprint] += 1
+        else:
+            self.edges.subtract(keys)
+            self.genomes[ind.fingerprint] -= 1
+            if not self.genomes[ind.fingerprint]:
+                del self.genomes[ind.fingerprint]
+        self._edge_diversity = None
+
+    def rebuild(self, population:list) -> None:
+        """Counts population from scratch."""
+        self._reset()
+        self.population = population
+        for ind in population:
+            self._count(ind)
+
+    def start(self, population:list) -> None:
+        """Starts counting a new generation, population is the list it is bred into."""
+        self._reset()
+        self.population = population
+
+    def add(self, ind) -> None:
+        self._count(ind)
+
+    def inherit(self, parent, child, removed:list, added:list) -> None:
+        """Counts child, a copy of parent with edges removed replaced by added."""
+        if parent.fingerprint is None:
+            parent.fingerprint = self.fingerprint(parent.genome)
+        if not self._directed:
+            removed, added = _mirrored(removed), _mirrored(added)
+        child.fingerprint = (parent.fingerprint + self._edges_hash(added) - self._edges_hash(removed)) & FINGERPRINT_MASK
+        self.genomes[child.fingerprint] += 1
+        entry = self._parents.get(id(parent))
+        if entry is None:
+            self._parents[id(parent)] = [parent, 1]
+        else:
+            entry[1] += 1
+        self._added += added
+        self._removed += removed
+
+    def finish(self) -> None:
+        """Counts edges of children passed to inherit since start."""
+        #parents with the same number of children are counted together,
+        #they mostly share edges
+        groups = defaultdict(Counter)
+        for parent, children in self._parents.values():
+            groups[children].update(self._genome_keys(parent.genome))
+        edges = self.edges
+        for children, counts in groups.items():
+            edges.update({edge: uses * children for edge, uses in counts.items()} if children > 1 else counts)
+        edges.update(self._added)
+        edges.subtract(Counter(self._removed))
+        self._parents = {}
+        self._added = []
+        self._removed = []
+        self._edge_diversity = None
+
+    def discard(self, individuals, population:list) -> None:
+        """Uncounts individuals dropped from the population, population is the list left."""
+        for ind in individuals:
+            self._count(ind, add=False)
+        self.population = population
+
+    def distinct(self) -> int:
+        """Number of distinct genomes."""
+        return len(self.genomes)
+
+    def edge_diversity(self) -> float:
+        """
+        Entropy of the edge histogram scaled to [0, 1]: 0 when every
+        individual uses the same edges, 1 when no two share an edge.
+        """
+        if self._edge_diversity is None:
+            counts = [count for count in self.edges.values() if count > 0]
+            individuals, uses = len(self.population), sum(counts)
+            if individuals < 2 or uses <= 0:
+                self._edge_diversity = 0.0
+            else:
+                entropy = log(uses) - sum(map(mul, counts, map(log, counts))) / uses
+                #entropy of identical genomes is log of their length, of disjoint ones log(uses);
+                #edges of undirected graphs, counted twice, shift both by log(2)
+                self._edge_diversity = min(1.0, max(0.0, (entropy - log(uses / individuals)) / log(individuals)))
+        return self._edge_diversity
+
+class Adaptive_Control:
+    """
+    Settings of Genetic_TSP generations adapted to the population.
+
+    Mutation operators are drawn by weights following their success
+    rate, the share of children better than their parent, in recent
+    generations. While edge_diversity of the population is below
+    diversity_target, the weights are evened out towards drawing every
+    operator alike and more of the population survives, the more so
+    the further below target it is. A restart is due when diversity is
+    below target and the best score of the population didn't improve
+    for restart_stagnation generations.
+
+    ...
+
+    Attributes
+    ----------
+    weights: list
+        weight of every one of OPERATORS
+    survivor_fraction: float
+        share of the population breeding the next generation
+    restart_due: bool
+        whether the next generation should start over
+    _quality: list
+        moving average of success rates of OPERATORS
+    _uses, _successes: list
+        mutations using every operator in the current generation and
+        those of them which improved on the parent
+    _best: float
+        best score of the population since the last restart
+    _stale: int
+        generations since _best improved
+    _rng: random.Random
+        generator operators are drawn with, or the random module
+    """
+
+    def __init__(self, diversity_target:float=0.1, restart_stagnation:int|None=None, rng=random):
+        self._target = diversity_target
+        self._rng = rng
+        self._restart_stagnation = restart_stagnation
+        self.weights = list(INITIAL_WEIGHTS)
+        self._quality = list(INITIAL_WEIGHTS)
+        self.survivor_fraction = MIN_SURVIVORS
+        self.restart_due = False
+        self._uses = [0] * len(OPERATORS)
+        self._successes = [0] * len(OPERATORS)
+        self._best = float('+inf')
+        self._stale = 0
+
+    def draw(self) -> list:
+        """Indices of OPERATORS a mutation is made of."""
+        operator = self._rng.choices(range(len(OPERATORS)), self.weights)[0]
+        self._uses[operator] += 1
+        return [operator]
+
+    def credit(self, operators:list) -> None:
+        """Records operators which made a child better than its parent."""
+        for operator in operators:
+            self._successes[operator] += 1
+
+    def update(self, diversity:float, best_score:float) -> None:
+        """
+        Adapts settings to the ranked generation, diversity is its
+        edge_diversity and best_score the score of its best individual.
+        """
+        for i, uses in enumerate(self._uses):
+            if uses:
+                self._quality[i] += LEARNING_RATE * (self._successes[i] / uses - self._quality[i])
+        self._uses = [0] * len(OPERATORS)
+        self._successes = [0] * len(OPERATORS)
+        shortfall = max(0.0, 1 - diversity / self._target) if self._target > 0 else 0.0
+        floor = MIN_WEIGHT + (1 / len(OPERATORS) - MIN_WEIGHT) * shortfall
+        total = sum(self._quality)
+        if total > 0:
+            share = 1 - len(OPERATORS) * floor
+            self.weights = [floor + share * quality / total for quality in self._quality]
+        self.survivor_fraction = MIN_SURVIVORS + (MAX_SURVIVORS - MIN_SURVIVORS) * shortfall
+        if best_score < self._best:
+            self._best = best_score
+            self._stale = 0
+        else:
+            self._stale += 1
+        self.restart_due = (self._restart_stagnation is not None and diversity < self._target
+                            and self._stale >= self._restart_stagnation)
+
+    def getstate(self) -> tuple:
+        """
+        Learned settings and statistics: weights, _quality, _uses,
+        _successes, survivor_fraction, restart_due, _best and _stale.
+        """
+        return (tuple(self.weights), tuple(self._quality), tuple(self._uses), tuple(self._successes),
+                self.survivor_fraction, self.restart_due, self._best, self._stale)
+
+    def setstate(self, state:tuple) -> None:
+        """Restores getstate() of a control with the same settings."""
+        weights, quality, uses, successes, self.survivor_fraction, restart_due, self._best, self._stale = state
+        self.weights, self._quality = list(weights), list(quality)
+        self._uses, self._successes = list(uses), list(successes)
+        self.restart_due = bool(restart_due)
+
+    def restarted(self) -> None:
+        self._best = float('+inf')
+        self._stale = 0
+        self.restart_due = False
@@ -0,0 +1,265 @@
+"""
+Exact solvers for small instances.
+
+Genetic_TSP looks for the cheapest walk visiting every vertex, with
+vertices visited again when the graph requires it. On the metric
+closure of the graph that walk is the cheapest Hamiltonian path (or
+cycle), which is what held_karp and branch_and_bound find; the path is
+expanded back into edges of the graph. solve_TSP picks held_karp or
+branch_and_bound below their size limits and Genetic_TSP above them, or
+when branch_and_bound runs out of time.
+"""
+from graph import Graph, MISSING_EDGE
+import graph as graph_module
+from genetic_TSP import Genetic_TSP
+from collections import namedtuple
+from array import array
+from time import perf_counter
+
+#optimal is False when path is only the best one found, e.g. by Genetic_TSP
+#or by branch_and_bound out of time; path is None when there's no feasible one
+Solution = namedtuple('Solution', ['path', 'score', 'optimal'])
+
+#vertices up to which held_karp is used by solve_TSP, its table holds
+#2**n * n floats; pure Python manages a lot fewer of them than NumPy
+HELD_KARP_MAX_VERTICES = 14
+HELD_KARP_MAX_VERTICES_NUMPY = 20
+#vertices up to which branch_and_bound is used by solve_TSP, its running
+#time varies a lot between instances of the same size
+BRANCH_AND_BOUND_MAX_VERTICES = 25
+#seconds branch_and_bound gets from solve_TSP without a time_budget,
+#instances it can't prove optimal by then go to Genetic_TSP
+BRANCH_AND_BOUND_TIME_BUDGET = 2.0
+
+def _problem(graph:Graph, starting_position, cyclical:bool) -> tuple:
+    """Returns closure of graph, its weight matrix and id of the first vertex (None for any)."""
+    closure = graph.metric_closure()
+    start = None
+    if starting_position is not None:
+        start = closure.encode([starting_position])[0]
+    elif cyclical:
+        #every vertex is on the cycle, it may as well start at the first one
+        start = 0
+    return closure, closure._weights, start
+
+def _solution(closure, ids:list, score:float, optimal:bool=True) -> Solution:
+    if score == MISSING_EDGE:
+        return Solution(None, MISSING_EDGE, optimal)
+    return Solution(closure.expand_path(closure.decode(ids)), score, optimal)
+
+def _trivial(closure, cyclical:bool) -> Solution|None:
+    #a single vertex is a path (and a cycle) of its own
+    if closure.vertices_count == 1:
+        return Solution(list(closure.vertices_list), 0.0, True)
+    return None
+
+def held_karp_limit() -> int:
+    """Vertices up to which held_karp is practical here."""
+    return HELD_KARP_MAX_VERTICES_NUMPY if graph_module.numpy is not None else HELD_KARP_MAX_VERTICES
+
+def held_karp(graph:Graph, starting_position=None, cyclical=False) -> Solution:
+    """
+    Bitmask dynamic program over subsets of visited vertices:
+    cost[mask][j] is the cheapest path visiting vertices of mask and
+    ending at j. Takes time of 2**n * n**2 and memory of 2**n * n.
+    """
+    closure, weights, start = _problem(graph, starting_position, cyclical)
+    trivial = _trivial(closure, cyclical)
+    if trivial is not None:
+        return trivial
+    n = closure.vertices_count
+    if graph_module.numpy is not None:
+        cost = _held_karp_numpy(weights, n, start)
+    else:
+        cost = _held_karp_python(weights, n, start)
+    full = (1 << n) - 1
+    if cyclical:
+        ends = [cost[full*n + j] + weights[j*n + start] for j in range(n)]
+    else:
+        ends = [cost[full*n + j] for j in range(n)]
+    last = min(range(n), key=ends.__getitem__)
+    score = ends[last]
+    if score == MISSING_EDGE:
+        return Solution(None, MISSING_EDGE, True)
+    #walking the table back, the previous vertex is the one the cost came from
+    ids = [last]
+    mask = full
+    while mask & (mask - 1):
+        previous_mask = mask ^ (1 << last)
+        last = min((j for j in range(n) if previous_mask >> j & 1),
+                   key=lambda j: cost[previous_mask*n + j] + weights[j*n + last])
+        ids.append(last)
+        mask = previous_mask
+    ids.reverse()
+    if cyclical:
+        ids.append(start)
+    return _solution(closure, ids, score)
+
+def _held_karp_python(weights, n:int, start) -> array:
+    cost = array('d', [MISSING_EDGE]) * ((1 << n) * n)
+    for j in range(n) if start is None else (start,):
+        cost[(1 << j)*n + j] = 0.0
+    for mask in range(1, 1 << n):
+        if start is not None and not mask >> start & 1:
+            continue
+        base = mask * n
+        for j in range(n):
+            path_cost = cost[base + j]
+            if path_cost == MISSING_EDGE:
+                continue
+            row = j * n
+            for k in range(n):
+                if mask >> k & 1:
+                    continue
+                candidate = path_cost + weights[row + k]
+                position = (mask | 1 << k)*n + k
+                if candidate < cost[position]:
+                    cost[position] = candidate
+    return cost
+
+def _held_karp_numpy(weights, n:int, start):
+    numpy = graph_module.numpy
+    matrix = numpy.frombuffer(weights, dtype=numpy.float64).reshape(n, n)
+    cost = numpy.full((1 << n, n), MISSING_EDGE)
+    for j in range(n) if start is None else (start,):
+        cost[1 << j, j] = 0.0
+    masks = numpy.arange(1 << n)
+    sizes = numpy.zeros(1 << n, dtype=numpy.int64)
+    for j in range(n):
+        sizes += (masks >> j) & 1
+    if start is not None:
+        masks = masks[(masks >> start) & 1 == 1]
+        sizes = sizes[masks]
+    #a path over size vertices extends one over size-1 of them, so subsets
+    #are filled in order of size, all of one size and one last vertex at once
+    for size in range(2, n+1):
+        layer = masks[sizes == size]
+        for k in range(n):
+            if k == start:
+                continue
+            ending = layer[(layer >> k) & 1 == 1]
+            cost[ending, k] = (cost[ending ^ (1 << k)] + matrix[:, k]).min(axis=1)
+    return memoryview(cost.reshape(-1))
+
+def _spanning_tree_weight(vertices:list, rows:list) -> float:
+    """Weight of the minimum spanning tree of vertices, edges weighing as the cheaper direction (Prim)."""
+    distance = {vertex: min(rows[vertices[0]][vertex], rows[vertex][vertices[0]]) for vertex in vertices[1:]}
+    total = 0.0
+    while distance:
+        vertex = min(distance, key=distance.__getitem__)
+        total += distance.pop(vertex)
+        row = rows[vertex]
+        for other in distance:
+            weight = min(row[other], rows[other][vertex])
+            if weight < distance[other]:
+                distance[other] = weight
+    return total
+
+def branch_and_bound(graph:Graph, starting_position=None, cyclical=False,
+                     time_budget:float|None=None) -> Solution:
+    """
+    Depth-first search of paths, nearest vertices first. The rest of
+    a path spans its last vertex and the unvisited ones, so it costs at
+    least their minimum spanning tree (plus the cheapest way back to the
+    start of a cycle); paths whose cost with that bound is no better
+    than the best path found are pruned. Once time_budget seconds passed
+    (and some path was found) the best path found is returned with
+    optimal False.
+    """
+    closure, weights, start = _problem(graph, starting_position, cyclical)
+    trivial = _trivial(closure, cyclical)
+    if trivial is not None:
+        return trivial
+    n = closure.vertices_count
+    rows = [weights[i*n:(i+1)*n] for i in range(n)]
+    #targets of every vertex, nearest first, without missing edges
+    nearest = [sorted((j for j in range(n) if rows[i][j] < MISSING_EDGE), key=rows[i].__getitem__)
+               for i in range(n)]
+    best = [MISSING_EDGE, None]
+    deadline = perf_counter() + time_budget if time_budget is not None else None
+    timed_out = [False]
+    unvisited = set(range(n))
+    path = []
+
+    def search(vertex:int, path_cost:float) -> None:
+        if not unvisited:
+            if cyclical:
+                path_cost += rows[vertex][start]
+            if path_cost < best[0]:
+                best[0], best[1] = path_cost, list(path)
+            return
+        bound = path_cost + _spanning_tree_weight([vertex, *unvisited], rows)
+        if cyclical:
+            bound += min(rows[other][start] for other in unvisited)
+        if bound >= best[0]:
+            return
+        if deadline is not None and best[1] is not None and perf_counter() > deadline:
+            timed_out[0] = True
+            return
+        for target in nearest[vertex]:
+            if target not in unvisited or timed_out[0]:
+                continue
+            unvisited.discard(target)
+            path.append(target)
+            search(target, path_cost + rows[vertex][target])
+            path.pop()
+            unvisited.add(target)
+
+    for first in range(n) if start is None else (start,):
+        unvisited.discard(first)
+        path.append(first)
+        search(first, 0.0)
+        path.pop()
+        unvisited.add(first)
+    optimal = not timed_out[0]
+    if best[1] is None:
+        return Solution(None, MISSING_EDGE, optimal)
+    ids = best[1] + [start] if cyclical else best[1]
+    return _solution(closure, ids, best[0], optimal)
+
+def solve_TSP(graph:Graph, starting_position=None, cyclical=False, generations:int|None=None,
+              time_budget:float|None=None, stagnation:int|None=100, populate_mix:dict|None=None,
+              **settings) -> Solution:
+    """
+    Solves instances up to held_karp_limit() vertices with held_karp,
+    up to BRANCH_AND_BOUND_MAX_VERTICES with branch_and_bound (which
+    returns the best path found when time_budget runs out) and larger
+    ones with Genetic_TSP. Without a time_budget branch_and_bound gets
+    BRANCH_AND_BOUND_TIME_BUDGET seconds, and when it runs out of them
+    Genetic_TSP solves the instance too; the better path is returned.
+    settings are keyword arguments of Genetic_TSP, it starts from
+    populate_mix and stops after generations, time_budget or stagnation.
+    """
+    n = graph.vertices_count
+    if n <= held_karp_limit():
+        return held_karp(graph, starting_position, cyclical)
+    if generations is None and time_budget is None and stagnation is None:
+        raise ValueError('At least one stopping criterion is needed.')
+    bounded = None
+    if n <= BRANCH_AND_BOUND_MAX_VERTICES:
+        if time_budget is not None:
+            return branch_and_bound(graph, starting_position, cyclical, time_budget)
+        bounded = branch_and_bound(graph, starting_position, cyclical, BRANCH_AND_BOUND_TIME_BUDGET)
+        if bounded.optimal:
+            return bounded
+    test_tube = Genetic_TSP(graph, starting_position=starting_position, cyclical=cyclical, **settings)
+    test_tube.populate(populate_mix)
+    best = test_tube.solve(generations, time_budget, stagnation=stagnation)
+    if best is None or best.score == MISSING_EDGE:
+        return bounded or Solution(None, MISSING_EDGE, False)
+    if bounded is not None and bounded.score <= best.score:
+        return bounded
+    return Solution(test_tube.best_path(), best.score, False)
+
+if __name__ == "__main__":
+    from random import uniform, seed
+    from time import perf_counter
+    seed(1)
+    for n in (8, 12, 16, 20, 30):
+        points = [(uniform(0, 100), uniform(0, 100)) for _ in range(n)]
+        adj_dict = {i: {j: ((points[i][0]-points[j][0])**2 + (points[i][1]-points[j][1])**2)**0.5
+                        for j in range(n) if j != i} for i in range(n)}
+        graph = Graph(graph=adj_dict)
+        start = perf_counter()
+        solution = solve_TSP(graph, starting_position=0, cyclical=True, time_budget=2.0)
+        print(f'n={n}: score={solution.score:.2f} optimal={solution.optimal} in {perf_counter()-start:.02f} seconds')
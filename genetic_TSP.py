@@ -1,9 +1,21 @@
-from graph import Graph
-from functools import total_ordering
-from random import sample, randint, choice
-from copy import deepcopy
+from graph import Graph, MISSING_EDGE
+from collections import Counter, namedtuple, defaultdict
+from time import perf_counter
+import construction_TSP
+import crossover_TSP
+from local_search_TSP import Local_Search
+from cache_TSP import Fitness_Cache
+from telemetry_TSP import NOT_TRAVERSABLE, MISSING_VERTEX, WRONG_START, NOT_CYCLICAL, IMMUTABLE
+from checkpoint_TSP import Checkpoint, Checkpointer, write_checkpoint, read_checkpoint
+from diversity_TSP import Population_Diversity, Adaptive_Control, DELETE, INSERT, SWAP, REVERSE, MOVE
+from random_TSP import Random_TSP
+import random as random_module
+from contextlib import nullcontext
+from array import array
 
 class Individual_TSP:
+    #fingerprint is set by Population_Diversity, visits by Genetic_TSP._visits
+    __slots__ = ('genome', 'score', 'fingerprint', 'visits')
 
     def __init__(self, genome, starting_position=None, cyclical=False):
         if starting_position and genome[0] != starting_position:
@@ -14,91 +26,549 @@ class Individual_TSP:
         if cyclical and self.genome[0] != self.genome[-1]:
             self.genome.append(self.genome[0])
         self.score = float('+inf')
+        self.fingerprint = None
+        self.visits = None
+
+class Population_TSP:
+    """
+    A compact form of a list of Individual_TSP.
+
+    Genomes are stored as vertex ids (positions in graph.vertices_list)
+    concatenated into one array, with a parallel array of scores.
+    Individual i has genome ids[offsets[i]:offsets[i+1]] and score
+    scores[i]. Converts losslessly to and from a list of Individual_TSP.
+
+    ...
+
+    Attributes
+    ----------
+    ids: array('i')
+        genomes of all individuals, one after another
+    offsets: array('q')
+        len(self)+1 positions in ids where genomes start
+    scores: array('d')
+        score of every individual
+    """
+    __slots__ = ('ids', 'offsets', 'scores')
+
+    def __init__(self, ids=None, offsets=None, scores=None):
+        self.ids = array('i') if ids is None else ids
+        self.offsets = array('q', [0]) if offsets is None else offsets
+        self.scores = array('d') if scores is None else scores
+        if len(self.offsets) != len(self.scores) + 1:
+            raise ValueError('There has to be one more offset than scores.')
+
+    @classmethod
+    def from_individuals(cls, individuals, graph:Graph) -> 'Population_TSP':
+        index = {vertex: i for i, vertex in enumerate(graph.vertices_list)}
+        population = cls()
+        for individual in individuals:
+            population.ids.extend(map(index.__getitem__, individual.genome))
+            population.offsets.append(len(population.ids))
+            population.scores.append(individual.score)
+        return population
+
+    def to_individuals(self, graph:Graph, starting_position=None, cyclical=False) -> list:
+        vertices = graph.vertices_list
+        individuals = []
+        for i in range(len(self)):
+            individual = Individual_TSP([vertices[gene] for gene in self.genome_ids(i)], starting_position, cyclical)
+            individual.score = self.scores[i]
+            individuals.append(individual)
+        return individuals
+
+    def genome_ids(self, i:int) -> memoryview:
+        """Vertex ids of individual i, without copying."""
+        return memoryview(self.ids)[self.offsets[i]:self.offsets[i+1]]
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __getitem__(self, key:slice) -> 'Population_TSP':
+        """Returns a population of a contiguous slice of individuals."""
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError('Only contiguous slices of population are supported.')
+        stop = max(start, stop)
+        first = self.offsets[start]
+        return Population_TSP(self.ids[first:self.offsets[stop]],
+                              array('q', [offset - first for offset in self.offsets[start:stop+1]]),
+                              self.scores[start:stop])
+
+    def __add__(self, other:'Population_TSP') -> 'Population_TSP':
+        last = self.offsets[-1]
+        return Population_TSP(self.ids + other.ids,
+                              self.offsets + array('q', [offset + last for offset in other.offsets[1:]]),
+                              self.scores + other.scores)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Population_TSP):
+            return NotImplemented
+        return (self.ids, self.offsets, self.scores) == (other.ids, other.offsets, other.scores)
+
+def _delete(genome:list, pos:int) -> None:
+    del genome[pos]
+
+def _insert(genome:list, pos:int, gene) -> None:
+    genome.insert(pos, gene)
+
+def _swap(genome:list, pos1:int, pos2:int) -> None:
+    genome[pos1], genome[pos2] = genome[pos2], genome[pos1]
+
+def _reverse(genome:list, pos1:int, pos2:int) -> None:
+    genome[pos1:pos2] = genome[pos1:pos2][::-1]
+
+def _move(genome:list, pos1:int, pos2:int, pos3:int) -> None:
+    moved = genome[pos1:pos2]
+    del genome[pos1:pos2]
+    genome[pos3:pos3] = moved
+
+_NO_TIMER = nullcontext()
+
+#progress report yielded by Genetic_TSP.iter_generations after every generation:
+#best and mean score of feasible individuals, diversity as the share of distinct
+#genomes in the population, seconds since the run started, edge_diversity
+#as in Population_Diversity.edge_diversity (None unless adaptive)
+Generation_Stats = namedtuple('Generation_Stats',
+                              ['generation', 'best', 'mean', 'diversity', 'elapsed', 'rejected',
+                               'edge_diversity'])
 
 class Genetic_TSP:
 
-    def __init__(self, graph: Graph, population_size:int=100, starting_position=None, cyclical=False):
+    def __init__(self, graph: Graph, population_size:int=100, starting_position=None, cyclical=False,
+                 crossover_rate:float=0.0, crossover:str='ox', tournament_size:int=3,
+                 local_search:int=0, local_search_moves:int|None=10000, local_search_time:float|None=None,
+                 neighbour_count:int=8, fitness_cache:int=0, telemetry=None,
+                 checkpoint_path:str|None=None, checkpoint_interval:float=5.0,
+                 adaptive:bool=False, diversity_target:float=0.1, restart_stagnation:int|None=None,
+                 seed=None):
+        #Graph or FrozenGraph, the latter evaluates whole population in one pass
         self._problem_map = graph
         self._population_size = population_size
         self._population = None
         self._generation = 0
+        #Random_TSP every random number of the run comes from: seed is an
+        #int, a Random_TSP to draw from or None to seed one from the random
+        #module, so random.seed still makes runs reproducible
+        if isinstance(seed, Random_TSP):
+            self._random = seed
+        else:
+            self._random = Random_TSP(random_module.getrandbits(64) if seed is None else seed)
         self._min_genome_length = graph.vertices_count
-        #list of lists for when nodes in graph have to be visited multiple times
-        #first position is empty
-        self._genome_pool = [graph.vertices_list * i for i in range(0,11)]
+        #vertices every genome has to visit, as a list to draw from, a set
+        #for random walks and ids for visit counts, see _visits; genomes
+        #visit a vertex at most about 10 times
+        self._vertices = list(graph.vertices_list)
+        self._vertex_set = set(self._vertices)
+        self._vertex_ids = {vertex: i for i, vertex in enumerate(self._vertices)}
+        self._max_genome_length = len(self._vertices) * 10
         #unless value is None it will start from this position
         self._starting_position = starting_position
         #if True the path will be ending in the same place as it started
         self._cyclical = cyclical
         self._best_ind = None
+        #population list as last evaluated and sorted by choose_best, so
+        #a generation isn't ranked twice; any other list is unranked
+        self._ranked_population = None
+        #mutations and crossovers rejected in the last generation, see mutate
+        self._rejected_candidates = 0
+        #share of children made by crossbreed instead of mutate
+        self._crossover_rate = crossover_rate
+        #name of operator in crossover_TSP.OPERATORS
+        if crossover not in crossover_TSP.OPERATORS:
+            raise ValueError(f'Unknown crossover {crossover}.')
+        self._crossover = crossover
+        self._tournament_size = tournament_size
+        #memetic stage: number of the best individuals improved with 2-opt
+        #and Or-opt every generation, within a budget of moves and seconds
+        self._local_search_elite = local_search
+        self._local_search = None
+        if local_search > 0:
+            self._local_search = Local_Search(self, neighbour_count, local_search_moves, local_search_time)
+        #bounded memo of scores and feasibility of genomes, fitness_cache is
+        #its size; with the cache on, duplicate genomes are dropped from
+        #the population before it is ranked
+        self._fitness_cache = Fitness_Cache(fitness_cache) if fitness_cache > 0 else None
+        #telemetry_TSP.Telemetry collecting counters and phase timers, or None
+        self._telemetry = telemetry
+        #cache hits and misses already reported to telemetry
+        self._cache_seen = (0, 0)
+        #version of the graph scores are up to date with, None for graphs
+        #which cannot change; see sync_graph
+        self._graph_version = getattr(graph, 'version', None)
+        #population list indexed by _edge_index and the index
+        self._indexed_population = None
+        self._edge_index_cache = None
+        #with checkpoint_path, state is written there in the background at
+        #most every checkpoint_interval seconds, see checkpoint
+        self._checkpointer = None
+        if checkpoint_path is not None:
+            self._checkpointer = Checkpointer(checkpoint_path, checkpoint_interval)
+        #with adaptive, mutation operators, survivors and restarts follow
+        #diversity of the population, see Adaptive_Control; the edge histogram
+        #and distinct genomes are counted as generations are bred, see
+        #_counted_diversity
+        self._control = None
+        self._diversity = None
+        if adaptive:
+            self._control = Adaptive_Control(diversity_target, restart_stagnation, self._random)
+            self._diversity = Population_Diversity(graph.vertices_list, graph._directed)
+        #mix of the last populate, used again by restarts
+        self._populate_mix = None
 
     def remove_unfeasible(self) -> None:
         # removes from population paths that cannot be traversed
         self._population = [individual for individual in self._population if self._problem_map.is_path_traversable(individual.genome)]
 
-    def calculate_fitness(self) -> None:
+    def calculate_fitness(self, only_unscored:bool=False) -> None:
+        #paths that cannot be traversed get score of float('+inf')
+        #only_unscored skips individuals which already have a finite score,
+        #e.g. ones scored by mutate
+        population = self._population
+        if only_unscored:
+            population = [individual for individual in population if individual.score == float('+inf')]
+        cache = self._fitness_cache
+        if cache is not None:
+            keys = [cache.key(individual.genome) for individual in population]
+            unknown = []
+            for individual, key in zip(population, keys):
+                score = cache.score(key)
+                if score is None:
+                    unknown.append((individual, key))
+                else:
+                    individual.score = score
+            population = [individual for individual, _ in unknown]
+        scores = self._problem_map.calculate_costs([individual.genome for individual in population])
+        for individual, score in zip(population, scores):
+            individual.score = score
+        if self._telemetry is not None:
+            self._telemetry.count('evaluations', len(population))
+        if cache is not None:
+            for (_, key), score in zip(unknown, scores):
+                cache.store_score(key, score)
+
+    def deduplicate(self) -> None:
+        """
+        Drops individuals repeating a genome already in the population.
+        With the fitness cache on, known scores are recorded and
+        unscored individuals get their score from the cache.
+        """
+        cache = self._fitness_cache
+        key = Fitness_Cache.key if cache is None else cache.key
+        seen = set()
+        unique = []
+        duplicates = []
         for individual in self._population:
-            individual.score = self._problem_map.calculate_cost(individual.genome)
+            genome_key = key(individual.genome)
+            if genome_key in seen:
+                duplicates.append(individual)
+                continue
+            seen.add(genome_key)
+            unique.append(individual)
+            if cache is not None:
+                if individual.score < MISSING_EDGE:
+                    cache.store_score(genome_key, individual.score)
+                else:
+                    score = cache.score(genome_key)
+                    if score is not None:
+                        individual.score = score
+        if self._diversity is not None and self._diversity.population is self._population:
+            self._diversity.discard(duplicates, unique)
+        self._population = unique
 
     def sort_by_fitness(self) -> None:
         self._population.sort(key=lambda individual: individual.score)
 
     def is_feasible(self, ind:Individual_TSP) -> bool:
+        cache = self._fitness_cache
+        if cache is None:
+            return self._check_feasible(ind)
+        key = cache.key(ind.genome)
+        feasible = cache.feasible(key)
+        if feasible is None:
+            feasible = self._check_feasible(ind)
+            cache.store_feasible(key, feasible)
+        return feasible
+
+    def _check_feasible(self, ind:Individual_TSP) -> bool:
+        return self._infeasibility(ind) is None
+
+    def _infeasibility(self, ind:Individual_TSP) -> str|None:
+        """Reason why ind is not feasible, one of telemetry_TSP reasons, None if it is."""
         if self._cyclical and ind.genome[0] != ind.genome[-1]:
-            return False
+            return NOT_CYCLICAL
         if self._starting_position is not None and ind.genome[0] != self._starting_position:
-            return False
+            return WRONG_START
         if not self._problem_map.is_path_traversable(ind.genome):
-            return False
-        else:
-            for gene in self._genome_pool[1]:
-                if gene not in ind.genome:
-                    return False
-        return True
-
-#    def populate(self) -> None:
-#        self._population = []
-#        genome_boundries = (len(self._genome_pool[1]), len(self._genome_pool[10]))
-#        safety_check = self._population_size * 1000
-#        while len(self._population) < self._population_size and safety_check > 0:
-#            safety_check -= 1
-#            multiplier = randint(1,10)
-#            genome_length = randint(genome_boundries[0], len(self._genome_pool[multiplier]))
-#            ind = Individual_TSP(sample(self._genome_pool[multiplier], genome_length), self._starting_position, self._cyclical)
-#            if self.is_feasible(ind):
-#                self._population.append(ind)
-
-    def populate(self) -> None:
-        self._population = []
-        safety_check = self._population_size * 1000
-        while len(self._population) < self._population_size and safety_check > 0:
+            return NOT_TRAVERSABLE
+        if self._visits(ind)[1]:
+            return MISSING_VERTEX
+        return None
+
+    def _visits(self, ind:Individual_TSP) -> tuple:
+        """
+        Returns ind.visits: array('i') of visits of every vertex id in
+        the genome and the number of vertices it doesn't visit. Counted
+        once, mutations update the counts of their children; the array
+        may be shared between individuals, so it is never changed in place.
+        """
+        if ind.visits is None:
+            counts = array('i', bytes(4 * len(self._vertices)))
+            ids = self._vertex_ids
+            for gene in ind.genome:
+                counts[ids[gene]] += 1
+            ind.visits = counts, counts.count(0)
+        return ind.visits
+
+    def _visit_changed(self, visits:tuple, gene, change:int) -> tuple:
+        """visits of _visits with change added to the count of gene, in a copy of the array."""
+        counts, missing = visits
+        counts = counts[:]
+        i = self._vertex_ids[gene]
+        before = counts[i]
+        counts[i] = before + change
+        return counts, missing + (before == 0) - (counts[i] == 0)
+
+    def _reject(self, reason:str) -> None:
+        """Counts a rejected candidate."""
+        self._rejected_candidates += 1
+        if self._telemetry is not None:
+            self._telemetry.reject(reason)
+
+    def _timer(self, phase:str):
+        """Telemetry timer of phase, does nothing without telemetry."""
+        if self._telemetry is None:
+            return _NO_TIMER
+        return self._telemetry.timer(phase)
+
+    def _record_telemetry(self) -> None:
+        """Closes telemetry record of the current generation."""
+        telemetry = self._telemetry
+        cache = self._fitness_cache
+        if cache is not None:
+            hits, misses = self._cache_seen
+            telemetry.count('cache_hits', cache.hits - hits)
+            telemetry.count('cache_misses', cache.misses - misses)
+            self._cache_seen = (cache.hits, cache.misses)
+        telemetry.record(self._generation)
+
+    def populate(self, mix:dict|None=None) -> None:
+        """
+        Creates a population of feasible individuals.
+
+        mix maps names of strategies to their share of the population:
+        'random_walk' (the default) or any of construction_TSP.STRATEGIES,
+        e.g. {'nearest_neighbour': 1, 'greedy_edge': 1, 'random_insertion': 2}.
+        """
+        if mix is None:
+            mix = {'random_walk': 1}
+        self._populate_mix = mix
+        with self._timer('populate'):
+            self._population = self._spawn(mix, self._population_size)
+        if self._telemetry is not None:
+            self._telemetry.count('children', len(self._population))
+            self._record_telemetry()
+
+    def _spawn(self, mix:dict, count:int) -> list:
+        """Up to count new feasible individuals made by strategies of mix, see populate."""
+        strategies = [self._random_walk if name == 'random_walk' else self._construction(name) for name in mix]
+        weights = list(mix.values())
+        individuals = []
+        telemetry = self._telemetry
+        safety_check = count * 1000
+        while len(individuals) < count and safety_check > 0:
             safety_check -= 1
-            genome = []
-            if self._starting_position:
-                genome.append(self._starting_position)
-            else:
-                genome.append(choice(self._genome_pool[1]))
-            #checks if all nodes of the graph will be visited
-            while not(all(gene in genome for gene in self._genome_pool[1])) and len(genome) < len(self._genome_pool[1]*10):
-                #connected nodes
-                viable_genes = self._problem_map.connected_to(genome[-1])
-                if not viable_genes:
-                    break
-                genome.append(choice(viable_genes))
+            if telemetry is not None:
+                telemetry.count('candidates')
+            genome = self._random.choices(strategies, weights)[0]()
+            if genome is None:
+                #heuristics give up when a vertex cannot be reached
+                if telemetry is not None:
+                    telemetry.reject(MISSING_VERTEX)
+                continue
             ind = Individual_TSP(genome, self._starting_position, self._cyclical)
             if self.is_feasible(ind):
-                self._population.append(ind)
-                
+                individuals.append(ind)
+            elif telemetry is not None:
+                telemetry.reject(self._infeasibility(ind))
+        if telemetry is not None and safety_check == 0:
+            telemetry.count('safety_exhausted')
+        return individuals
+
+    def _construction(self, name:str):
+        heuristic = construction_TSP.STRATEGIES[name]
+        #shared by every individual of a populate
+        shared = construction_TSP.prepare(name, self._problem_map)
+        return lambda: heuristic(self._problem_map, self._starting_position, self._cyclical, rng=self._random,
+                                 **shared)
+
+    def _random_walk(self) -> list:
+        genome = []
+        if self._starting_position:
+            genome.append(self._starting_position)
+        else:
+            genome.append(self._random.choice(self._vertices))
+        #vertices visited so far, the walk goes on until it covers all of them
+        visited = {genome[0]}
+        missing = len(self._vertex_set) - (genome[0] in self._vertex_set)
+        while missing and len(genome) < self._max_genome_length:
+            #connected nodes
+            viable_genes = self._problem_map.connected_to(genome[-1])
+            if not viable_genes:
+                break
+            gene = self._random.choice(viable_genes)
+            genome.append(gene)
+            if gene not in visited:
+                visited.add(gene)
+                missing -= 1
+        return genome
+
+    def compact(self) -> Population_TSP:
+        """Returns the population in its compact form."""
+        return Population_TSP.from_individuals(self._population, self._problem_map)
+
+    def load_population(self, population:Population_TSP) -> None:
+        """Replaces the population with one in compact form."""
+        self._population = population.to_individuals(self._problem_map, self._starting_position, self._cyclical)
+
+    def checkpoint(self) -> Checkpoint:
+        """
+        Snapshot of the state of the run: population, best individual,
+        generation, state of the Random_TSP of the run and, with adaptive
+        on, of Adaptive_Control. A run continued from it with
+        load_checkpoint is identical to one never interrupted, except for
+        the fitness cache which starts empty.
+        """
+        best = [self._best_ind] if self._best_ind is not None else []
+        control_state = self._control.getstate() if self._control is not None else None
+        return Checkpoint(self._generation, self._problem_map.vertices_count, self.compact(),
+                          Population_TSP.from_individuals(best, self._problem_map),
+                          self._random.getstate(), self._rejected_candidates, control_state)
+
+    def save_checkpoint(self, path:str) -> None:
+        """Writes checkpoint() to path, waiting for background checkpoints first."""
+        if self._checkpointer is not None:
+            self._checkpointer.wait()
+        write_checkpoint(path, self.checkpoint())
+
+    def load_checkpoint(self, path:str) -> None:
+        """Continues a run from a checkpoint of one on the same graph and settings."""
+        checkpoint = read_checkpoint(path)
+        if checkpoint.vertices_count != self._problem_map.vertices_count:
+            raise ValueError(f'Checkpoint of a graph with {checkpoint.vertices_count} vertices, '
+                             f'not {self._problem_map.vertices_count}.')
+        self.load_population(checkpoint.population)
+        self._ranked_population = None
+        best = checkpoint.best.to_individuals(self._problem_map, self._starting_position, self._cyclical)
+        self._best_ind = best[0] if best else None
+        self._generation = checkpoint.generation
+        self._rejected_candidates = checkpoint.rejected
+        self._random.setstate(checkpoint.random_state)
+        if self._control is not None and checkpoint.control_state is not None:
+            self._control.setstate(checkpoint.control_state)
+
+    def _edge_index(self) -> dict:
+        """
+        Inverted index of the population, {(source, target): individuals
+        with that edge}, an individual listed once per use of the edge.
+        """
+        if self._indexed_population is not self._population:
+            index = defaultdict(list)
+            for ind in self._population:
+                genome = ind.genome
+                for edge in zip(genome, genome[1:]):
+                    index[edge].append(ind)
+            self._edge_index_cache = index
+            self._indexed_population = self._population
+        return self._edge_index_cache
+
+    def sync_graph(self) -> None:
+        """
+        Catches up with edges of the graph changed since the last sync.
+        Individuals using changed edges are found through _edge_index:
+        their scores change by the difference of weights, ones using
+        a removed edge are dropped. The fitness cache is cleared. Called
+        by choose_best, so a running evolution adapts to changes made
+        between generations.
+        """
+        graph = self._problem_map
+        if graph.vertices_count != self._min_genome_length:
+            raise ValueError('Vertices of the graph changed, the population has to be created anew.')
+        changes = graph.changes_since(self._graph_version)
+        self._graph_version = graph.version
+        if changes is not None and not changes:
+            return
+        if self._fitness_cache is not None:
+            self._fitness_cache.clear()
+        if self._local_search is not None:
+            self._local_search.update_neighbours(graph.vertices_list if changes is None
+                                                 else {source for source, _ in changes})
+        if self._population:
+            if changes is None:
+                #the log doesn't reach back far enough, everyone is scored anew
+                affected = self._population
+                for ind, score in zip(affected, graph.calculate_costs([ind.genome for ind in affected])):
+                    ind.score = score
+            else:
+                affected = []
+                index = self._edge_index()
+                for edge, weight in changes.items():
+                    users = index.get(edge)
+                    if not users:
+                        continue
+                    #individuals only use existing edges, so weight is not MISSING_EDGE;
+                    #unscored ones stay unscored
+                    difference = graph.edge_weight(*edge) - weight
+                    for ind in users:
+                        ind.score += difference
+                    affected.extend(users)
+            #removed edges leave their users with MISSING_EDGE
+            dropped = {id(ind) for ind in affected
+                       if ind.score == MISSING_EDGE and not graph.is_path_traversable(ind.genome)}
+            if dropped:
+                population = [ind for ind in self._population if id(ind) not in dropped]
+                if self._diversity is not None and self._diversity.population is self._population:
+                    self._diversity.discard([ind for ind in self._population if id(ind) in dropped], population)
+                self._population = population
+            if affected:
+                self._ranked_population = None
+            if self._telemetry is not None:
+                self._telemetry.count('rescored', len({id(ind) for ind in affected}))
+                for _ in dropped:
+                    self._telemetry.reject(NOT_TRAVERSABLE)
+        if self._best_ind is not None:
+            score = graph.calculate_costs([self._best_ind.genome])[0]
+            if score < MISSING_EDGE:
+                self._best_ind.score = score
+            else:
+                self._best_ind = None
 
     def choose_best(self) -> None:
-        self.calculate_fitness()
-        self._population.sort(key=lambda ind: ind.score)
+        if self._graph_version is not None and self._graph_version != self._problem_map.version:
+            self.sync_graph()
+        if self._ranked_population is not self._population:
+            with self._timer('evaluate'):
+                if self._fitness_cache is not None:
+                    self.deduplicate()
+                self.calculate_fitness(only_unscored=True)
+            with self._timer('sort'):
+                self._population.sort(key=lambda ind: ind.score)
+            self._ranked_population = self._population
         if self._population:
             if self._best_ind is None:
                 self._best_ind = self._population[0]
             elif self._best_ind.score > self._population[0].score:
                 self._best_ind = self._population[0]
 
+    def best_path(self) -> list|None:
+        """
+        Returns genome of _best_ind as a path of the original graph,
+        which differs from the genome when solving on ClosureGraph.
+        """
+        if self._best_ind is None:
+            return None
+        return self._problem_map.expand_path(self._best_ind.genome)
+
     def next_generation(self) -> None:
         self._generation += 1
         #calculating fitness and sorting
@@ -106,49 +576,483 @@ class Genetic_TSP:
         #culling population
         if len(self._population) == 0:
             raise ValueError('Population is 0. No solution was found, next generation cannot be generated.')
-        if self._population_size < 11:
-            fraction = 1
-        fraction = self._population_size//10
-        surviving_population = self._population[:fraction]
+        ranked_population = self._population
+        control = self._control
+        restart = False
+        if control is None:
+            surviving_population = ranked_population[:max(1, self._population_size//10)]
+            children = 10
+        else:
+            control.update(self._counted_diversity().edge_diversity(), ranked_population[0].score)
+            restart = control.restart_due
+            surviving_population = self._distinct_survivors(
+                max(1, round(self._population_size * control.survivor_fraction)))
+            children = -(-self._population_size // len(surviving_population))
+        if self._local_search is not None and not restart:
+            with self._timer('local_search'):
+                self.improve_elite(surviving_population)
         self._population = []
+        self._ranked_population = None
+        self._rejected_candidates = 0
+        diversity = self._diversity
+        if diversity is not None:
+            diversity.start(self._population)
+        telemetry = self._telemetry
+        with self._timer('breed'):
+            if restart:
+                self._restart()
+            else:
+                self._breed(surviving_population, ranked_population, children)
+            if diversity is not None:
+                diversity.finish()
+        if telemetry is not None:
+            if not restart:
+                telemetry.count('candidates', len(self._population) + self._rejected_candidates)
+            telemetry.count('children', len(self._population))
+            if self._local_search is not None:
+                telemetry.count('local_search_moves', self._local_search.evaluated_moves)
+                telemetry.count('local_search_improvements', self._local_search.improving_moves)
+            self._record_telemetry()
+        if self._checkpointer is not None and self._checkpointer.due():
+            with self._timer('checkpoint'):
+                self._checkpointer.save(self.checkpoint())
+
+    def _breed(self, surviving_population:list, ranked_population:list, children:int) -> None:
+        """Adds children of every survivor to the population, counting them in _diversity if it's on."""
+        diversity = self._diversity
+        telemetry = self._telemetry
         for ind in surviving_population:
+            #mutate and crossbreed only return feasible individuals, the limit
+            #guards against individuals which cannot be changed at all
             safety_check = 10000
             count = 0
-            while True and safety_check > 0:
-                new_ind = self.mutate(ind)
-                if self.is_feasible(new_ind):
+            while count < children and safety_check > 0:
+                if self._crossover_rate and self._random.random() < self._crossover_rate:
+                    new_ind = self.crossbreed([ind, self.tournament(ranked_population)])
+                    if new_ind is not None and diversity is not None:
+                        diversity.add(new_ind)
+                else:
+                    new_ind, removed, added = self._mutate(ind)
+                    if new_ind is not None and diversity is not None:
+                        diversity.inherit(ind, new_ind, removed, added)
+                if new_ind is not None:
                     self._population.append(new_ind)
                     count += 1
-                    if count == 10:
-                        break
                 safety_check -= 1
+            if telemetry is not None and safety_check == 0:
+                telemetry.count('safety_exhausted')
+
+    def _counted_diversity(self) -> Population_Diversity:
+        """
+        _diversity with counts of the current population. Generations
+        bred by next_generation are counted as they are made, any other
+        population list is counted from scratch.
+        """
+        if self._diversity.population is not self._population:
+            self._diversity.rebuild(self._population)
+        return self._diversity
+
+    def _distinct_survivors(self, count:int) -> list:
+        """Up to count best individuals of the ranked population, no two with the same genome."""
+        survivors = []
+        seen = set()
+        for ind in self._population:
+            if ind.fingerprint not in seen:
+                seen.add(ind.fingerprint)
+                survivors.append(ind)
+                if len(survivors) == count:
+                    break
+        return survivors
+
+    def _restart(self) -> None:
+        """
+        Fills the new population with individuals made like by the last
+        populate. Nothing of the old population is kept, so it doesn't
+        pull the new one back into its basin; _best_ind stays.
+        """
+        for ind in self._spawn(self._populate_mix or {'random_walk': 1}, self._population_size):
+            self._population.append(ind)
+            self._diversity.add(ind)
+        self._control.restarted()
+        if self._telemetry is not None:
+            self._telemetry.count('restarts')
+
+    def stats(self, elapsed:float=0.0) -> Generation_Stats:
+        """Statistics of the current population, which has to be ranked by choose_best."""
+        scores = [ind.score for ind in self._population if ind.score < MISSING_EDGE]
+        edge_diversity = None
+        if self._diversity is not None:
+            diversity = self._counted_diversity()
+            distinct = diversity.distinct()
+            edge_diversity = diversity.edge_diversity()
+        else:
+            distinct = len({tuple(ind.genome) for ind in self._population})
+        return Generation_Stats(generation=self._generation,
+                                best=self._best_ind.score if self._best_ind is not None else MISSING_EDGE,
+                                mean=sum(scores) / len(scores) if scores else MISSING_EDGE,
+                                diversity=distinct / len(self._population) if self._population else 0.0,
+                                elapsed=elapsed,
+                                rejected=self._rejected_candidates,
+                                edge_diversity=edge_diversity)
+
+    def iter_generations(self, generations:int|None=None, time_budget:float|None=None,
+                         target_score:float|None=None, stagnation:int|None=None):
+        """
+        Evolves the population, yielding Generation_Stats after every
+        generation, starting with the initial population (populated if
+        there is none yet). _best_ind is the best solution so far at
+        every step, so the caller may stop iterating at any time.
+
+        Stops after generations new generations, when the best score
+        reaches target_score, when it didn't improve for stagnation
+        generations or before a generation that would not finish within
+        time_budget seconds (estimated by the length of the previous one).
+        """
+        start = perf_counter()
+        if self._population is None:
+            self.populate()
+        self.choose_best()
+        stats = self.stats(perf_counter() - start)
+        yield stats
+        best_score = stats.best
+        stale = 0
+        last_duration = stats.elapsed
+        done = 0
+        while generations is None or done < generations:
+            if target_score is not None and best_score <= target_score:
+                return
+            if stagnation is not None and stale >= stagnation:
+                return
+            if time_budget is not None and stats.elapsed + last_duration > time_budget:
+                return
+            self.next_generation()
+            self.choose_best()
+            done += 1
+            elapsed = perf_counter() - start
+            last_duration = elapsed - stats.elapsed
+            stats = self.stats(elapsed)
+            yield stats
+            if stats.best < best_score:
+                best_score = stats.best
+                stale = 0
+            else:
+                stale += 1
+
+    def solve(self, generations:int|None=None, time_budget:float|None=None, target_score:float|None=None,
+              stagnation:int|None=None, callback=None) -> Individual_TSP|None:
+        """
+        Runs iter_generations to the end and returns the best individual.
+        callback is called with Generation_Stats of every generation,
+        returning True from it stops the run.
+        """
+        if generations is None and time_budget is None and target_score is None and stagnation is None:
+            raise ValueError('At least one stopping criterion is needed.')
+        for stats in self.iter_generations(generations, time_budget, target_score, stagnation):
+            if callback is not None and callback(stats):
+                break
+        return self._best_ind
+
+    def improve_elite(self, population:list) -> None:
+        """Memetic stage, local search on the best individuals of population sorted by fitness."""
+        self._local_search.start_generation()
+        for ind in population[:self._local_search_elite]:
+            if ind.score < MISSING_EDGE and self._local_search.improve(ind):
+                ind.fingerprint = None
+                if ind.score < self._best_ind.score:
+                    self._best_ind = ind
+
+    def _mutable_range(self, genome:list) -> tuple:
+        """First position and one past the last position of genes that can be mutated."""
+        first = 1 if self._starting_position is not None or self._cyclical else 0
+        last = len(genome) - 1 if self._cyclical else len(genome)
+        return first, last
+
+    def mutate(self, individual) -> Individual_TSP|None:
+        """
+        Returns a mutated copy of individual, scored from the parent
+        score and the change of cost.
+
+        Mutations never touch the starting position or the closing
+        gene of cyclical paths and never delete the last visit of
+        a vertex. Edges a mutation would add are checked before
+        the genome is copied; if any is missing the candidate is
+        rejected, counted in _rejected_candidates and None is returned.
+        So a feasible individual only ever has feasible children.
 
-    def mutate(self, individual) -> Individual_TSP:
-        new_ind = Individual_TSP(deepcopy(individual.genome), self._starting_position, self._cyclical)
-        if randint(0,100) <= 10:
-            del new_ind.genome[randint(0,len(new_ind.genome)-1)]
-        elif randint(0,100) <= 10:
-            new_ind.genome.insert(randint(0,len(new_ind.genome)), new_ind.genome[randint(0, len(new_ind.genome)-1)])
+        With adaptive on, a single operator is drawn by the weights of
+        Adaptive_Control instead of fixed probabilities.
+        """
+        return self._mutate(individual)[0]
 
-        pos1 = randint(0, len(new_ind.genome)-1)
-        pos2 = randint(0, len(new_ind.genome)-1)
+    def _mutate(self, individual) -> tuple:
+        """mutate returning (child, edges removed, edges added), (None, None, None) when rejected."""
+        genome = individual.genome
+        first, last = self._mutable_range(genome)
+        if last - first < 1:
+            self._reject(IMMUTABLE)
+            return None, None, None
+        control = self._control
+        if control is None:
+            moves = []
+            randint = self._random.randint
+            if randint(0,100) <= 10:
+                moves.append(DELETE)
+            elif randint(0,100) <= 10:
+                moves.append(INSERT)
+            moves.append(None)
+        else:
+            moves = control.draw()
+
+        delta = 0.0
+        all_removed, all_added = [], []
+        #permutations keep the counts, the child shares them
+        visits = self._visits(individual)
+        for operator in moves:
+            if operator == DELETE:
+                move = self._draw_deletion(genome, visits[0])
+            elif operator == INSERT:
+                move = self._draw_insertion(genome)
+            else:
+                move = self._draw_permutation(genome, operator)
+            if move is None:
+                #only deletions of the last visit of a vertex and insertions
+                #after a vertex without edges cannot be drawn
+                self._reject(MISSING_VERTEX if operator == DELETE else NOT_TRAVERSABLE)
+                return None, None, None
+            apply, args, (removed, added) = move
+            added_weight = self._edges_weight(added)
+            if added_weight == MISSING_EDGE:
+                self._reject(NOT_TRAVERSABLE)
+                return None, None, None
+            if genome is individual.genome:
+                genome = genome[:]
+            if operator == DELETE:
+                visits = self._visit_changed(visits, genome[args[0]], -1)
+            elif operator == INSERT:
+                visits = self._visit_changed(visits, args[1], 1)
+            apply(genome, *args)
+            delta += added_weight - self._edges_weight(removed)
+            all_removed += removed
+            all_added += added
+        if genome is individual.genome:
+            genome = genome[:]
+        new_ind = Individual_TSP(genome, self._starting_position, self._cyclical)
+        new_ind.visits = visits
+        #unknown (inf) parent score leaves child unscored,
+        #calculate_fitness will evaluate it
+        new_ind.score = individual.score + delta if individual.score < MISSING_EDGE else MISSING_EDGE
+        if control is not None and new_ind.score < individual.score:
+            control.credit(moves)
+        return new_ind, all_removed, all_added
+
+    def _draw_deletion(self, genome:list, counts:array):
+        """counts are visits of every vertex id in genome, see _visits."""
+        first, last = self._mutable_range(genome)
+        if len(genome) < 2:
+            return None
+        pos = self._random.randint(first, last-1)
+        #deleting the only visit of a vertex is never feasible
+        if counts[self._vertex_ids[genome[pos]]] < 2:
+            return None
+        return _delete, (pos,), self._delete_edges(genome, pos)
+
+    def _draw_insertion(self, genome:list):
+        first, last = self._mutable_range(genome)
+        pos = self._random.randint(first, last)
+        if pos > 0:
+            #only genes reachable from the previous one
+            viable_genes = self._problem_map.connected_to(genome[pos-1])
+            if not viable_genes:
+                return None
+            gene = self._random.choice(viable_genes)
+        else:
+            gene = self._random.choice(genome)
+        return _insert, (pos, gene), self._insert_edges(genome, pos, gene)
+
+    def _draw_permutation(self, genome:list, operator:int|None=None):
+        """Draws a swap, a reversal or a move of a slice, operator is one of them or None for any."""
+        first, last = self._mutable_range(genome)
+        randint = self._random.randint
+        pos1 = randint(first, last-1)
+        pos2 = randint(first, last-1)
         if pos1 > pos2:
             pos1, pos2 = pos2, pos1
-        if randint(0,100) <= 90:
-            new_ind.genome[pos1], new_ind.genome[pos2] = new_ind.genome[pos2], new_ind.genome[pos1]
-        elif randint(0,100) < 50:
-            new_ind.genome[pos1:pos2] = new_ind.genome[pos2-1:pos1-1:-1]
+        if operator is None:
+            operator = SWAP if randint(0,100) <= 90 else REVERSE if randint(0,100) < 50 else MOVE
+        if operator == SWAP:
+            return _swap, (pos1, pos2), self._swap_edges(genome, pos1, pos2)
+        elif operator == REVERSE:
+            return _reverse, (pos1, pos2+1), self._reverse_edges(genome, pos1, pos2+1)
         else:
-            moved = new_ind.genome[pos1:pos2]
-            del new_ind.genome[pos1:pos2]
-            pos3 = randint(0, len(new_ind.genome)-1)
-            new_ind.genome[pos3:pos3] = moved
-        return new_ind
+            #where the slice goes among genes that are left, before the closing gene
+            rest_last = last - (pos2+1-pos1)
+            pos3 = randint(first, rest_last) if rest_last >= first else pos1
+            return _move, (pos1, pos2+1, pos3), self._move_edges(genome, pos1, pos2+1, pos3)
+
+    def _edges_weight(self, edges) -> float:
+        """Sum of weights of (source, target) pairs."""
+        return sum(self._problem_map.edge_weight(source, target) for source, target in edges)
+
+    def _delta(self, removed, added) -> float:
+        return self._edges_weight(added) - self._edges_weight(removed)
+
+    #each operator has a method listing edges it removes and adds, computed
+    #before the genome is changed, and a function changing the genome
+
+    def delete_gene(self, genome:list, pos:int) -> float:
+        """Deletes gene at pos. Returns change of the path cost."""
+        edges = self._delete_edges(genome, pos)
+        _delete(genome, pos)
+        return self._delta(*edges)
+
+    def _delete_edges(self, genome:list, pos:int) -> tuple:
+        removed, added = [], []
+        if pos > 0:
+            removed.append((genome[pos-1], genome[pos]))
+        if pos < len(genome)-1:
+            removed.append((genome[pos], genome[pos+1]))
+        if 0 < pos < len(genome)-1:
+            added.append((genome[pos-1], genome[pos+1]))
+        return removed, added
+
+    def insert_gene(self, genome:list, pos:int, gene) -> float:
+        """Inserts gene before pos. Returns change of the path cost."""
+        edges = self._insert_edges(genome, pos, gene)
+        _insert(genome, pos, gene)
+        return self._delta(*edges)
+
+    def _insert_edges(self, genome:list, pos:int, gene) -> tuple:
+        removed, added = [], []
+        if 0 < pos < len(genome):
+            removed.append((genome[pos-1], genome[pos]))
+        if pos > 0:
+            added.append((genome[pos-1], gene))
+        if pos < len(genome):
+            added.append((gene, genome[pos]))
+        return removed, added
+
+    def swap_genes(self, genome:list, pos1:int, pos2:int) -> float:
+        """Swaps genes at pos1 and pos2. Returns change of the path cost."""
+        edges = self._swap_edges(genome, pos1, pos2)
+        _swap(genome, pos1, pos2)
+        return self._delta(*edges)
+
+    def _swap_edges(self, genome:list, pos1:int, pos2:int) -> tuple:
+        if pos1 == pos2 or genome[pos1] == genome[pos2]:
+            return [], []
+        def gene(i):
+            return genome[pos2] if i == pos1 else genome[pos1] if i == pos2 else genome[i]
+        #indices of edges leading from genome[i] to genome[i+1]
+        edges = sorted({i for i in (pos1-1, pos1, pos2-1, pos2) if 0 <= i < len(genome)-1})
+        removed = [(genome[i], genome[i+1]) for i in edges]
+        added = [(gene(i), gene(i+1)) for i in edges]
+        return removed, added
+
+    def reverse_slice(self, genome:list, pos1:int, pos2:int) -> float:
+        """Reverses genome[pos1:pos2]. Returns change of the path cost."""
+        edges = self._reverse_edges(genome, pos1, pos2)
+        _reverse(genome, pos1, pos2)
+        return self._delta(*edges)
+
+    def _reverse_edges(self, genome:list, pos1:int, pos2:int) -> tuple:
+        removed, added = [], []
+        if pos2 - pos1 < 2:
+            return removed, added
+        if pos1 > 0:
+            removed.append((genome[pos1-1], genome[pos1]))
+            added.append((genome[pos1-1], genome[pos2-1]))
+        if pos2 < len(genome):
+            removed.append((genome[pos2-1], genome[pos2]))
+            added.append((genome[pos1], genome[pos2]))
+        #in undirected graph edges inside of the slice cost the same both ways
+        if self._problem_map._directed:
+            for i in range(pos1, pos2-1):
+                removed.append((genome[i], genome[i+1]))
+                added.append((genome[i+1], genome[i]))
+        return removed, added
+
+    def move_slice(self, genome:list, pos1:int, pos2:int, pos3:int) -> float:
+        """
+        Moves genome[pos1:pos2] so it starts at pos3 of what's left
+        of the genome after cutting the slice out. Returns change of
+        the path cost.
+        """
+        edges = self._move_edges(genome, pos1, pos2, pos3)
+        _move(genome, pos1, pos2, pos3)
+        return self._delta(*edges)
+
+    def _move_edges(self, genome:list, pos1:int, pos2:int, pos3:int) -> tuple:
+        removed, added = [], []
+        if pos1 == pos2 or pos3 == pos1:
+            return removed, added
+        def rest(i):
+            #gene at position i of the genome with the slice cut out
+            return genome[i] if i < pos1 else genome[i + pos2 - pos1]
+        rest_length = len(genome) - (pos2 - pos1)
+        if pos1 > 0:
+            removed.append((genome[pos1-1], genome[pos1]))
+        if pos2 < len(genome):
+            removed.append((genome[pos2-1], genome[pos2]))
+        if 0 < pos1 < rest_length:
+            added.append((rest(pos1-1), rest(pos1)))
+        #rest(pos3-1) and rest(pos3) are neighbours in genome as well
+        if 0 < pos3 < rest_length:
+            removed.append((rest(pos3-1), rest(pos3)))
+        if pos3 > 0:
+            added.append((rest(pos3-1), genome[pos1]))
+        if pos3 < rest_length:
+            added.append((genome[pos2-1], rest(pos3)))
+        return removed, added
+
+    def tournament(self, population:list) -> Individual_TSP:
+        """Returns the fittest of _tournament_size random individuals of population sorted by fitness."""
+        randint = self._random.randint
+        return population[min(randint(0, len(population)-1) for _ in range(self._tournament_size))]
+
+    def crossbreed(self, individuals:list) -> Individual_TSP|None:
+        """
+        Returns a child of two individuals, made by the _crossover
+        operator from the parts of genomes mutations can change, so
+        the starting position and the closing gene are kept.
 
-    def crossbreed(self, individuals:list):
-        pass
+        Returns None (and counts a rejected candidate) when parents
+        don't visit the same vertices the same number of times or
+        when the child would lead through a missing edge.
+        """
+        genome1, genome2 = individuals[0].genome, individuals[1].genome
+        if self._cyclical and self._starting_position is None and genome1[0] != genome2[0]:
+            #cyclical path can start anywhere along the cycle
+            if genome1[0] not in genome2:
+                self._reject(MISSING_VERTEX)
+                return None
+            start = genome2.index(genome1[0])
+            genome2 = genome2[start:-1] + genome2[:start] + [genome1[0]]
+        first, last = self._mutable_range(genome1)
+        body1, body2 = genome1[first:last], genome2[first:self._mutable_range(genome2)[1]]
+        if Counter(body1) != Counter(body2):
+            self._reject(MISSING_VERTEX)
+            return None
+        operator = crossover_TSP.OPERATORS[self._crossover]
+        if len(set(body1)) != len(body1):
+            operator = crossover_TSP.order_crossover
+        genome = genome1[:first] + operator(body1, body2, self._random) + genome1[last:]
+        score = None
+        if self._fitness_cache is not None:
+            key = self._fitness_cache.key(genome)
+            score = self._fitness_cache.score(key)
+        if score is None:
+            score = self._edges_weight(zip(genome, genome[1:]))
+            if self._fitness_cache is not None:
+                self._fitness_cache.store_score(key, score)
+        if score == MISSING_EDGE:
+            self._reject(NOT_TRAVERSABLE)
+            return None
+        child = Individual_TSP(genome, self._starting_position, self._cyclical)
+        child.score = score
+        return child
 
 if __name__ == "__main__":
+    from random import randint
     adj_dict = {'A':{'B':1, 'D':2},
                 'B':{},
                 'C':{'D':1},
@@ -257,9 +1161,7 @@ if __name__ == "__main__":
     print(f'score={test_tube._best_ind.score}')
     print()
     best = test_tube._best_ind
-    while test_tube._generation < 1 and test_tube._best_ind.score > 20:
-        test_tube.next_generation()
-        test_tube.choose_best()
+    for stats in test_tube.iter_generations(generations=1, target_score=20):
         new_best = test_tube._best_ind
         if new_best is not best:
             best = new_best
@@ -271,7 +1173,6 @@ if __name__ == "__main__":
             new_start_time = time()
     print(f'It toook {time()-start} seconds')
 
-    from time import sleep
     print('*********************'.center(80))
     print('NEW GAME'.center(80))
     for key in range(20,40):
@@ -294,9 +1195,7 @@ if __name__ == "__main__":
     print()
     best = test_tube._best_ind
     from collections import Counter
-    while test_tube._generation < 10000000 and test_tube._best_ind.score > 20:
-        test_tube.next_generation()
-        test_tube.choose_best()
+    for stats in test_tube.iter_generations(generations=10000000, target_score=20):
         new_best = test_tube._best_ind
         if new_best is not best:
             best = new_best
@@ -1,4 +1,48 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Sequence
+from bisect import bisect_left
+from array import array
+from itertools import accumulate, chain
+from heapq import heappush, heappop
+from hashlib import sha256
+import os
+import sys
+import json
+import mmap
+import struct
+
+try:
+    import numpy
+except ImportError:
+    #NumPy is optional, FrozenGraph falls back to pure Python without it
+    numpy = None
+
+#weight stored in FrozenGraph for a pair of vertices without an edge
+MISSING_EDGE = float('inf')
+
+#binary graph file, see FrozenGraph.save_binary: magic, version, layout,
+#flags, number of vertices and size of the JSON label table in bytes
+BINARY_MAGIC = b'TSPG'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sBBBxQQ')
+#layouts of the weights block
+DENSE = 0
+CSR = 1
+#flags
+DIRECTED = 1
+BIG_ENDIAN = 2
+
+def _aligned(offset:int) -> int:
+    #blocks start at multiples of 8 bytes, so they can be cast to doubles
+    return (offset + 7) // 8 * 8
+
+#Graph.freeze picks CSRGraph for graphs of at least this many vertices
+#where fewer than 1/SPARSE_DENSITY of pairs of vertices have an edge
+SPARSE_MIN_VERTICES = 1000
+SPARSE_DENSITY = 10
+
+#changes of edges Graph remembers for changes_since
+CHANGE_LOG_SIZE = 100000
 
 class Graph:
     """
@@ -18,6 +62,13 @@ class Graph:
         is 5
     _directed: bool
         a flag denoting if graph is directed or not (default True)
+    _changes: deque
+        (version, source, target, previous weight) of the last
+        CHANGE_LOG_SIZE changes of edges, both directions of edges of
+        undirected graphs
+    version: int
+        number of changes of edges, incremented by add_edge and
+        remove_edge
     vertices_count: int
         a number of vertices in the graph
     vertices_list: list
@@ -28,6 +79,10 @@ class Graph:
     add_edge(source, target, weight=1)
         Adds an edge from source to target of value weight, represented
         as a dictionary inside a dictionary; adjacency[source][target]
+    remove_edge(source, target)
+        Removes the edge from source to target.
+    changes_since(version)
+        Returns edges changed after version with their weights at version.
     calculate_cost(path)
         Returns a sum of edges weights between vertices in path.
         path = ['A','B','C'] returns sum of edges from 'A' to 'B' and
@@ -35,8 +90,23 @@ class Graph:
     is_path_traversable(path)
         Returns True if there're edges between every element of
         the path and the next element. Returns False otherwise.
+    calculate_costs(paths)
+        Returns costs of many paths at once, MISSING_EDGE for paths
+        that cannot be traversed.
+    edge_weight(source, target)
+        Returns weight of edge from source to target, MISSING_EDGE
+        if there's no such edge.
+    nearest_neighbours(k)
+        Returns candidate lists: k closest targets of every vertex.
+    freeze(sparse=None)
+        Returns a FrozenGraph or CSRGraph, a compact index-backed copy
+        of the graph.
+    metric_closure(cache_dir=None)
+        Returns a ClosureGraph, complete graph of shortest paths.
+    save_binary(path)
+        Writes the graph in the binary format of FrozenGraph.open_binary.
     """
-        
+
     def __init__(self, graph=None, directed:bool=True):
         self._adjacency_dict = defaultdict(dict)
         if graph is not None:
@@ -46,8 +116,13 @@ class Graph:
                     if self._adjacency_dict.get(target_vertex, None) is None:
                         self._adjacency_dict[target_vertex] = {}
         self._directed = directed
+        self.version = 0
+        self._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        #versions up to this one may be missing from _changes
+        self._forgotten = 0
 
     def add_edge(self, source: str, target: str, weight:int|float=1) -> None:
+        self._log_change(source, target)
         self._adjacency_dict[source].update({target: weight})
         if not self._directed:
             self._adjacency_dict[target].update({source: weight})
@@ -55,6 +130,43 @@ class Graph:
             if self._adjacency_dict.get(target) is None:
                 self._adjacency_dict[target]
 
+    def remove_edge(self, source, target) -> None:
+        #both directions are checked before anything changes
+        if target not in self._adjacency_dict.get(source, ()):
+            raise KeyError(f"There's no edge from {source} to {target}")
+        if not self._directed and source not in self._adjacency_dict.get(target, ()):
+            raise KeyError(f"There's no edge from {target} to {source}")
+        self._log_change(source, target)
+        del self._adjacency_dict[source][target]
+        if not self._directed:
+            del self._adjacency_dict[target][source]
+
+    def _log_change(self, source, target) -> None:
+        #called before the change, to remember weights it replaces
+        self.version += 1
+        edges = [(source, target)] if self._directed else [(source, target), (target, source)]
+        for edge in edges:
+            if len(self._changes) == self._changes.maxlen:
+                self._forgotten = self._changes[0][0]
+            self._changes.append((self.version, *edge, self.edge_weight(*edge)))
+
+    def changes_since(self, version:int) -> dict|None:
+        """
+        Returns {(source, target): weight at version} of edges added,
+        removed or reweighted after version (MISSING_EDGE for edges
+        which didn't exist), None if the change log doesn't reach that
+        far back.
+        """
+        if version < self._forgotten:
+            return None
+        changes = {}
+        for change_version, source, target, weight in reversed(self._changes):
+            if change_version <= version:
+                break
+            #the earliest change after version replaced the weight at version
+            changes[(source, target)] = weight
+        return changes
+
     def calculate_cost(self, path: list) -> float:
         i = 0
         cost = 0.0
@@ -66,6 +178,21 @@ class Graph:
             i += 1
         return cost
 
+    def edge_weight(self, source, target) -> float:
+        targets = self._adjacency_dict.get(source)
+        if targets is None:
+            return MISSING_EDGE
+        return targets.get(target, MISSING_EDGE)
+
+    def calculate_costs(self, paths) -> array:
+        costs = array('d')
+        for path in paths:
+            try:
+                costs.append(self.calculate_cost(path))
+            except KeyError:
+                costs.append(MISSING_EDGE)
+        return costs
+
     def is_path_traversable(self, path: list) -> bool:
         if len(path) == 0:
             raise ValueError('The path cannot be empty.')
@@ -91,6 +218,11 @@ class Graph:
         """Returns list of vertices connected by edge from source, if none returns empty list."""
         return list(self._adjacency_dict[source])
 
+    def nearest_neighbours(self, k:int) -> dict:
+        """Returns dictionary of up to k vertices closest to every vertex, by outgoing edge weight."""
+        return {source: [target for target, _ in sorted(targets.items(), key=lambda edge: edge[1])[:k]]
+                for source, targets in self._adjacency_dict.items()}
+
     @property
     def vertices_count(self):
         """The number of vertices in the graph.""" 
@@ -101,6 +233,670 @@ class Graph:
         """The list of names for vertices."""
         return list(self._adjacency_dict)
 
+    def freeze(self, sparse:bool|None=None) -> 'FrozenGraph':
+        """
+        Returns a compact, index-backed copy of the graph: CSRGraph if
+        sparse, FrozenGraph otherwise. By default large graphs with few
+        edges get CSRGraph, see SPARSE_MIN_VERTICES and SPARSE_DENSITY.
+        """
+        if sparse is None:
+            n = self.vertices_count
+            edges = sum(map(len, self._adjacency_dict.values()))
+            sparse = n >= SPARSE_MIN_VERTICES and edges * SPARSE_DENSITY < n * n
+        if sparse:
+            return CSRGraph.from_graph(self)
+        return FrozenGraph.from_graph(self)
+
+    def save_binary(self, path:str) -> None:
+        """See FrozenGraph.save_binary."""
+        self.freeze().save_binary(path)
+
+    def metric_closure(self, cache_dir=None, method:str='dijkstra') -> 'ClosureGraph':
+        """See FrozenGraph.metric_closure."""
+        return self.freeze().metric_closure(cache_dir, method)
+
+    def expand_path(self, path:list) -> list:
+        """Returns path in terms of edges of the graph, it already is."""
+        return list(path)
+
+
+class FrozenGraph:
+    """
+    A read-only, index-backed form of Graph.
+
+    Vertex labels are mapped to integer ids (their position in
+    vertices_list) and edge weights are stored in one contiguous,
+    row-major matrix of floats. A pair of vertices without an edge
+    holds MISSING_EDGE. FrozenGraph answers the same queries as Graph,
+    so it can be used anywhere a Graph is only read from; Graph stays
+    the builder.
+
+    ...
+
+    Attributes
+    ----------
+    _labels: list
+        vertex labels, _labels[i] is the label of vertex with id i
+    _index: dict
+        reverse of _labels, _index['A'] is the id of vertex 'A'
+    _weights: array('d')
+        vertices_count**2 weights, _weights[i*vertices_count + j] is
+        the weight of edge from vertex i to vertex j
+    _directed: bool
+        a flag denoting if graph is directed or not (default True)
+
+    Methods
+    -------
+    from_graph(graph)
+        Builds a FrozenGraph from a Graph.
+    encode(path) / decode(ids)
+        Translates a path of labels to an array of ids and back.
+    calculate_cost(path), is_path_traversable(path), connected_to(source)
+        Same as in Graph.
+    calculate_cost_ids(ids)
+        Returns a sum of edges weights along a path of ids,
+        MISSING_EDGE if any edge doesn't exist.
+    calculate_costs(paths)
+        Same as in Graph, but evaluates all paths in a single pass
+        over one flat array of ids.
+    edge_weight(source, target)
+        Same as in Graph.
+    graph_hash()
+        Returns a hex digest identifying labels, weights and direction.
+    metric_closure(cache_dir=None, method='dijkstra')
+        Returns a ClosureGraph, cached on disk in cache_dir.
+    save_binary(path) / open_binary(path)
+        Writes the graph to a binary file / maps one into memory.
+    """
+
+    def __init__(self, labels, weights, directed:bool=True):
+        self._labels = list(labels)
+        self._index = {label: i for i, label in enumerate(self._labels)}
+        if len(weights) != len(self._labels)**2:
+            raise ValueError(f'Expected {len(self._labels)**2} weights, got {len(weights)}.')
+        self._weights = weights
+        self._directed = directed
+        #lazily built lists of labels, see connected_to and nearest_neighbours
+        self._connected = {}
+        self._nearest = {}
+        #binary file the weights are mapped from, see open_binary
+        self._path = None
+
+    @classmethod
+    def from_graph(cls, graph:Graph) -> 'FrozenGraph':
+        labels = graph.vertices_list
+        index = {label: i for i, label in enumerate(labels)}
+        n = len(labels)
+        weights = array('d', [MISSING_EDGE]) * (n*n)
+        for source, targets in graph._adjacency_dict.items():
+            row = index[source] * n
+            for target, weight in targets.items():
+                weights[row + index[target]] = weight
+        return cls(labels, weights, graph._directed)
+
+    def freeze(self) -> 'FrozenGraph':
+        """The graph is already frozen, returns itself."""
+        return self
+
+    def save_binary(self, path:str) -> None:
+        """
+        Writes the graph to path: a header, vertex labels as a JSON list
+        and the weights block, each starting at a multiple of 8 bytes.
+        Labels have to be JSON scalars, e.g. strings or integers.
+        """
+        self._write_binary(path, DENSE, [self._weights])
+
+    @classmethod
+    def open_binary(cls, path:str) -> 'FrozenGraph':
+        """
+        Opens a file written by save_binary, as a FrozenGraph or
+        a CSRGraph depending on the layout it was saved in. Weights
+        aren't copied: they are read straight from the file mapped into
+        memory, so processes opening the same file share its pages.
+        Pickling such a graph only pickles the path, workers of
+        a process pool reopen the file.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, layout, flags, n, labels_size = BINARY_HEADER.unpack_from(mapped)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION or layout not in (DENSE, CSR):
+            raise ValueError(f'{path} is not a binary graph file of version {BINARY_VERSION}.')
+        start = BINARY_HEADER.size
+        labels = json.loads(mapped[start:start + labels_size])
+        start = _aligned(start + labels_size)
+        view = memoryview(mapped)
+        #written on a machine of the other byte order, blocks have to be copied
+        swapped = bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big')
+        def block(typecode:str, count:int):
+            nonlocal start
+            size = array(typecode).itemsize * count
+            data = view[start:start + size].cast(typecode)
+            start = _aligned(start + size)
+            if swapped:
+                data = array(typecode, data)
+                data.byteswap()
+            return data
+        directed = bool(flags & DIRECTED)
+        if layout == DENSE:
+            graph = FrozenGraph(labels, block('d', n*n), directed)
+        else:
+            offsets = block('q', n+1)
+            targets = block('i', offsets[n])
+            weights = block('d', offsets[n])
+            graph = CSRGraph(labels, offsets, targets, weights, directed)
+        graph._path = os.path.abspath(path)
+        return graph
+
+    def _write_binary(self, path:str, layout:int, blocks) -> None:
+        #anything else wouldn't survive the JSON round trip, e.g. tuples come back as lists
+        for label in self._labels:
+            if label is not None and type(label) not in (str, int, float, bool):
+                raise TypeError(f'Vertex label {label!r} of type {type(label).__name__} cannot be saved, '
+                                'labels of binary files have to be str, int, float, bool or None.')
+        labels = json.dumps(self._labels).encode()
+        flags = (DIRECTED if self._directed else 0) | (BIG_ENDIAN if sys.byteorder == 'big' else 0)
+        header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, layout, flags, len(self._labels), len(labels))
+        with open(path, 'wb') as file:
+            file.write(header)
+            file.write(labels)
+            for data in blocks:
+                file.write(bytes(_aligned(file.tell()) - file.tell()))
+                file.write(memoryview(data).cast('B'))
+
+    def __reduce_ex__(self, protocol):
+        if self._path is not None:
+            return FrozenGraph.open_binary, (self._path,)
+        return super().__reduce_ex__(protocol)
+
+    def expand_path(self, path:list) -> list:
+        """Returns path in terms of edges of the graph, it already is."""
+        return list(path)
+
+    def graph_hash(self) -> str:
+        digest = sha256(repr((self._labels, self._directed)).encode())
+        digest.update(memoryview(self._weights).cast('B'))
+        return digest.hexdigest()
+
+    def metric_closure(self, cache_dir=None, method:str='dijkstra') -> 'ClosureGraph':
+        """
+        Returns the metric closure of the graph: a ClosureGraph where edge
+        from A to B weights as much as the cheapest path from A to B.
+
+        method is 'dijkstra' (from every source, best for sparse graphs)
+        or 'floyd_warshall' (on the dense matrix, requires NumPy).
+        With cache_dir the closure is stored in and read from
+        cache_dir/<graph_hash()>.closure, a file of the wrong size (e.g.
+        left by an older version) is built again.
+        """
+        path = None
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, f'{self.graph_hash()}.closure')
+            if os.path.exists(path):
+                try:
+                    return ClosureGraph.load(path, self._labels, self._directed)
+                except ValueError:
+                    pass
+        if method == 'dijkstra':
+            distances, predecessors = self._closure_dijkstra()
+        elif method == 'floyd_warshall':
+            distances, predecessors = self._closure_floyd_warshall()
+        else:
+            raise ValueError(f'Unknown method {method}.')
+        closure = ClosureGraph(self._labels, distances, predecessors, self._directed)
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            closure.save(path)
+        return closure
+
+    def _closure_dijkstra(self) -> tuple:
+        n = len(self._labels)
+        neighbours = self._neighbour_lists()
+        distances = array('d', [MISSING_EDGE]) * (n*n)
+        predecessors = array('i', [-1]) * (n*n)
+        for source in range(n):
+            row = source * n
+            done = [False] * n
+            heap = [(0.0, source)]
+            distances[row + source] = 0.0
+            while heap:
+                distance, vertex = heappop(heap)
+                if done[vertex]:
+                    continue
+                done[vertex] = True
+                for target, weight in neighbours[vertex]:
+                    if distance + weight < distances[row + target]:
+                        distances[row + target] = distance + weight
+                        predecessors[row + target] = vertex
+                        heappush(heap, (distance + weight, target))
+        return distances, predecessors
+
+    def _neighbour_lists(self) -> list:
+        """(target, weight) pairs of edges leaving every vertex, by id."""
+        n = len(self._labels)
+        weights = self._weights
+        return [[(j, weights[i*n + j]) for j in range(n) if weights[i*n + j] != MISSING_EDGE] for i in range(n)]
+
+    def _weight_matrix(self):
+        """Writable n by n NumPy copy of the weights."""
+        n = len(self._labels)
+        return numpy.frombuffer(self._weights, dtype=numpy.float64).reshape(n, n).copy()
+
+    def _closure_floyd_warshall(self) -> tuple:
+        if numpy is None:
+            raise ImportError('Floyd-Warshall closure requires NumPy.')
+        n = len(self._labels)
+        distances = self._weight_matrix()
+        numpy.fill_diagonal(distances, 0.0)
+        #predecessors[i, j] is the vertex before j on the path from i to j
+        predecessors = numpy.where(distances < MISSING_EDGE, numpy.arange(n)[:, None], -1).astype(numpy.int32)
+        numpy.fill_diagonal(predecessors, -1)
+        for k in range(n):
+            through_k = distances[:, k, None] + distances[None, k, :]
+            shorter = through_k < distances
+            distances = numpy.where(shorter, through_k, distances)
+            predecessors = numpy.where(shorter, predecessors[k][None, :], predecessors)
+        return array('d', distances.tobytes()), array('i', predecessors.tobytes())
+
+    def encode(self, path:list) -> array:
+        """Returns an array of vertex ids for a path of labels."""
+        index = self._index
+        return array('i', [index[vertex] for vertex in path])
+
+    def decode(self, ids) -> list:
+        """Returns a list of labels for a sequence of vertex ids."""
+        labels = self._labels
+        return [labels[i] for i in ids]
+
+    def calculate_cost_ids(self, ids) -> float:
+        n = len(self._labels)
+        weights = self._weights
+        return sum([weights[ids[i]*n + ids[i+1]] for i in range(len(ids)-1)])
+
+    def calculate_cost(self, path: list) -> float:
+        try:
+            ids = self.encode(path)
+        except KeyError as e:
+            raise KeyError(f"There's no vertex {e.args[0]}")
+        cost = self.calculate_cost_ids(ids)
+        if cost == MISSING_EDGE:
+            for i, weight in enumerate(self._path_weights(ids)):
+                if weight == MISSING_EDGE:
+                    raise KeyError(f"There's no edge from {path[i]} to {path[i+1]}")
+        return float(cost)
+
+    def edge_weight(self, source, target) -> float:
+        i = self._index.get(source)
+        j = self._index.get(target)
+        if i is None or j is None:
+            return MISSING_EDGE
+        return self._weights[i*len(self._labels) + j]
+
+    def calculate_costs(self, paths) -> array:
+        paths = list(paths)
+        lengths = list(map(len, paths))
+        #paths are concatenated into one sequence of ids, path i spans
+        #ids[ends[i]-lengths[i]:ends[i]]; ids[k] to ids[k+1] is edge k
+        ends = list(accumulate(lengths))
+        ids = map(self._index.__getitem__, chain.from_iterable(paths))
+        if numpy is not None:
+            return self._calculate_costs_numpy(ids, lengths, ends)
+        ids = list(ids)
+        edge_weights = self._path_weights(ids)
+        #last edge of every path leads into the next path and isn't summed
+        return array('d', [sum(edge_weights[end-length:end-1]) if length > 1 else 0.0 for length, end in zip(lengths, ends)])
+
+    def _path_weights(self, ids) -> list:
+        """Weights of edges between consecutive ids."""
+        n = len(self._labels)
+        return list(map(self._weights.__getitem__, [a*n + b for a, b in zip(ids, ids[1:])]))
+
+    def _path_weights_numpy(self, ids):
+        n = len(self._labels)
+        return numpy.frombuffer(self._weights, dtype=numpy.float64)[ids[:-1]*n + ids[1:]]
+
+    def _calculate_costs_numpy(self, ids, lengths, ends) -> array:
+        costs = numpy.zeros(len(lengths))
+        total = ends[-1] if ends else 0
+        if total > 1:
+            ids = numpy.fromiter(ids, dtype=numpy.intp, count=total)
+            edge_weights = self._path_weights_numpy(ids)
+            lengths = numpy.array(lengths, dtype=numpy.intp)
+            ends = numpy.array(ends, dtype=numpy.intp)
+            #edges leading from the last vertex of a path into the next path
+            edge_weights[ends[(ends > 0) & (ends < total)] - 1] = 0.0
+            summed = lengths > 1
+            costs[summed] = numpy.add.reduceat(edge_weights, (ends - lengths)[summed])
+        return array('d', costs.tobytes())
+
+    def is_path_traversable(self, path: list) -> bool:
+        if len(path) == 0:
+            raise ValueError('The path cannot be empty.')
+        try:
+            ids = self.encode(path)
+        except KeyError:
+            return False
+        return self.calculate_cost_ids(ids) != MISSING_EDGE
+
+    def connected_to(self, source):
+        """Returns list of vertices connected by edge from source, if none returns empty list."""
+        connected = self._connected.get(source)
+        if connected is None:
+            n = len(self._labels)
+            row = self._index[source] * n
+            weights = self._weights
+            connected = [self._labels[j] for j in range(n) if weights[row + j] != MISSING_EDGE]
+            self._connected[source] = connected
+        return list(connected)
+
+    def nearest_neighbours(self, k:int) -> dict:
+        """Same as in Graph, computed once for each k."""
+        nearest = self._nearest.get(k)
+        if nearest is None:
+            weight = self.edge_weight
+            nearest = {source: sorted(self.connected_to(source), key=lambda target: weight(source, target))[:k]
+                       for source in self._labels}
+            self._nearest[k] = nearest
+        return nearest
+
+    @property
+    def vertices_count(self):
+        """The number of vertices in the graph."""
+        return len(self._labels)
+
+    @property
+    def vertices_list(self):
+        """The list of names for vertices."""
+        return list(self._labels)
+
+class ClosureGraph(FrozenGraph):
+    """
+    Metric closure of a graph, see FrozenGraph.metric_closure.
+
+    Weight of edge from A to B is the cost of the cheapest path from
+    A to B in the original graph, MISSING_EDGE if there's none. There
+    are no edges from a vertex to itself. Paths found on the closure
+    are expanded back into paths of the original graph with
+    expand_path.
+
+    ...
+
+    Attributes
+    ----------
+    _predecessors: array('i')
+        _predecessors[i*vertices_count + j] is the vertex before j on
+        the cheapest path from i to j, -1 if j cannot be reached
+    """
+
+    def __init__(self, labels, distances, predecessors, directed:bool=True):
+        n = len(labels)
+        weights = array('d', distances)
+        for i in range(n):
+            weights[i*n + i] = MISSING_EDGE
+        super().__init__(labels, weights, directed)
+        if len(predecessors) != n*n:
+            raise ValueError(f'Expected {n*n} predecessors, got {len(predecessors)}.')
+        self._predecessors = predecessors
+
+    def expand_path(self, path:list) -> list:
+        """Returns path with every edge replaced by the cheapest path of the original graph."""
+        if not path:
+            return []
+        n = len(self._labels)
+        ids = self.encode(path)
+        expanded = [ids[0]]
+        for source, target in zip(ids, ids[1:]):
+            if self._weights[source*n + target] == MISSING_EDGE:
+                raise KeyError(f"There's no path from {self._labels[source]} to {self._labels[target]}")
+            segment = []
+            while target != source:
+                segment.append(target)
+                target = self._predecessors[source*n + target]
+            expanded.extend(reversed(segment))
+        return self.decode(expanded)
+
+    def save(self, path:str) -> None:
+        """Writes weights and predecessors to path, replaced at once so readers never see half of it."""
+        #one temporary file per process, several may build the same closure
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            self._weights.tofile(file)
+            self._predecessors.tofile(file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path:str, labels, directed:bool=True) -> 'ClosureGraph':
+        """Reads a closure of labels written by save, ValueError if the file has the wrong size."""
+        n = len(labels)
+        distances, predecessors = array('d'), array('i')
+        size = n*n * (distances.itemsize + predecessors.itemsize)
+        if os.path.getsize(path) != size:
+            raise ValueError(f'{path} is not a closure of {n} vertices, it should have {size} bytes.')
+        with open(path, 'rb') as file:
+            distances.fromfile(file, n*n)
+            predecessors.fromfile(file, n*n)
+        return cls(labels, distances, predecessors, directed)
+
+class NeighbourView(Sequence):
+    """
+    Read-only sequence of labels of vertices connected to a vertex
+    of CSRGraph, reading their ids straight from the graph's arrays.
+    """
+    __slots__ = ('_labels', '_targets')
+
+    def __init__(self, labels:list, targets:memoryview):
+        self._labels = labels
+        self._targets = targets
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._labels[j] for j in self._targets[key]]
+        return self._labels[self._targets[key]]
+
+    def __iter__(self):
+        return map(self._labels.__getitem__, self._targets)
+
+    def __repr__(self) -> str:
+        return f'NeighbourView({list(self)})'
+
+class CSRGraph(FrozenGraph):
+    """
+    FrozenGraph stored as compressed sparse rows, for large graphs
+    with few edges.
+
+    Edges leaving vertex i are at positions offsets[i] to offsets[i+1]
+    of targets (ids of target vertices, ascending) and weights. Memory
+    grows with the number of edges instead of vertices_count**2;
+    an edge is found by binary search among the targets of its source.
+    connected_to returns a view of targets instead of a new list.
+
+    ...
+
+    Attributes
+    ----------
+    _offsets: array('q')
+        vertices_count+1 positions in _targets where rows start
+    _targets: array('i')
+        target ids of all edges, row after row
+    _weights: array('d')
+        weights of all edges, parallel to _targets
+    """
+
+    def __init__(self, labels, offsets, targets, weights, directed:bool=True):
+        self._labels = list(labels)
+        self._index = {label: i for i, label in enumerate(self._labels)}
+        if len(offsets) != len(self._labels) + 1:
+            raise ValueError(f'Expected {len(self._labels)+1} offsets, got {len(offsets)}.')
+        if len(targets) != offsets[-1] or len(weights) != offsets[-1]:
+            raise ValueError(f'Expected {offsets[-1]} targets and weights.')
+        self._offsets = offsets
+        self._targets = targets
+        self._weights = weights
+        self._targets_view = memoryview(targets)
+        #when labels are the ids themselves connected_to hands out
+        #slices of _targets as they are
+        self._ids_as_labels = all(type(label) is int and label == i for i, label in enumerate(self._labels))
+        self._directed = directed
+        self._nearest = {}
+        self._path = None
+        #sorted source*vertices_count + target keys of edges, built for NumPy lookups
+        self._keys = None
+
+    @classmethod
+    def from_graph(cls, graph:Graph) -> 'CSRGraph':
+        labels = graph.vertices_list
+        index = {label: i for i, label in enumerate(labels)}
+        offsets, targets, weights = array('q', [0]), array('i'), array('d')
+        for source in labels:
+            row = sorted((index[target], weight) for target, weight in graph._adjacency_dict[source].items())
+            targets.extend([target for target, _ in row])
+            weights.extend([weight for _, weight in row])
+            offsets.append(len(targets))
+        return cls(labels, offsets, targets, weights, graph._directed)
+
+    def __reduce_ex__(self, protocol):
+        if self._path is not None:
+            return FrozenGraph.open_binary, (self._path,)
+        #memoryview of targets cannot be pickled, arrays are rebuilt instead
+        return CSRGraph, (self._labels, self._offsets, self._targets, self._weights, self._directed)
+
+    def save_binary(self, path:str) -> None:
+        """Same as in FrozenGraph, with offsets, targets and weights blocks."""
+        self._write_binary(path, CSR, [self._offsets, self._targets, self._weights])
+
+    def graph_hash(self) -> str:
+        digest = sha256(repr((self._labels, self._directed, 'csr')).encode())
+        for data in (self._offsets, self._targets, self._weights):
+            digest.update(memoryview(data).cast('B'))
+        return digest.hexdigest()
+
+    def _weight_ids(self, i:int, j:int) -> float:
+        lo, hi = self._offsets[i], self._offsets[i+1]
+        k = bisect_left(self._targets, j, lo, hi)
+        if k < hi and self._targets[k] == j:
+            return self._weights[k]
+        return MISSING_EDGE
+
+    def edge_weight(self, source, target) -> float:
+        i = self._index.get(source)
+        j = self._index.get(target)
+        if i is None or j is None:
+            return MISSING_EDGE
+        return self._weight_ids(i, j)
+
+    def calculate_cost_ids(self, ids) -> float:
+        return sum(self._path_weights(ids))
+
+    def _path_weights(self, ids) -> list:
+        return list(map(self._weight_ids, ids, ids[1:]))
+
+    def _path_weights_numpy(self, ids):
+        n = len(self._labels)
+        if self._keys is None:
+            offsets = numpy.frombuffer(self._offsets, dtype=numpy.int64)
+            rows = numpy.repeat(numpy.arange(n, dtype=numpy.int64), numpy.diff(offsets))
+            self._keys = rows * n + numpy.frombuffer(self._targets, dtype=numpy.int32)
+        edge_keys = ids[:-1].astype(numpy.int64) * n + ids[1:]
+        if len(self._keys) == 0:
+            return numpy.full(len(edge_keys), MISSING_EDGE)
+        positions = numpy.minimum(numpy.searchsorted(self._keys, edge_keys), len(self._keys) - 1)
+        found = self._keys[positions] == edge_keys
+        return numpy.where(found, numpy.frombuffer(self._weights, dtype=numpy.float64)[positions], MISSING_EDGE)
+
+    def connected_to(self, source) -> NeighbourView|memoryview:
+        """
+        Returns labels of vertices connected by edge from source, as
+        a read-only view: NeighbourView, or a memoryview of ids if
+        labels are 0 to vertices_count-1.
+        """
+        i = self._index[source]
+        targets = self._targets_view[self._offsets[i]:self._offsets[i+1]]
+        if self._ids_as_labels:
+            return targets
+        return NeighbourView(self._labels, targets)
+
+    def _neighbour_lists(self) -> list:
+        offsets, targets, weights = self._offsets, self._targets, self._weights
+        return [[(targets[k], weights[k]) for k in range(offsets[i], offsets[i+1])]
+                for i in range(len(self._labels))]
+
+    def _weight_matrix(self):
+        n = len(self._labels)
+        matrix = numpy.full((n, n), MISSING_EDGE)
+        offsets = numpy.frombuffer(self._offsets, dtype=numpy.int64)
+        rows = numpy.repeat(numpy.arange(n), numpy.diff(offsets))
+        matrix[rows, numpy.frombuffer(self._targets, dtype=numpy.int32)] = numpy.frombuffer(self._weights, dtype=numpy.float64)
+        return matrix
+
+def shortest_paths(graph, source) -> tuple:
+    """
+    Dijkstra's algorithm, works with Graph and FrozenGraph.
+
+    Returns a dictionary of distances from source to every reachable
+    vertex and a dictionary of predecessors on the shortest paths
+    (predecessor of source is None).
+    """
+    distances = {source: 0.0}
+    predecessors = {source: None}
+    #counter breaks ties, vertex labels don't have to be comparable
+    heap = [(0.0, 0, source)]
+    counter = 1
+    while heap:
+        distance, _, vertex = heappop(heap)
+        if distance > distances[vertex]:
+            continue
+        for target in graph.connected_to(vertex):
+            new_distance = distance + graph.edge_weight(vertex, target)
+            if new_distance < distances.get(target, MISSING_EDGE):
+                distances[target] = new_distance
+                predecessors[target] = vertex
+                heappush(heap, (new_distance, counter, target))
+                counter += 1
+    return distances, predecessors
+
+def path_to(predecessors:dict, target) -> list:
+    """Returns path from the source of shortest_paths to target."""
+    path = []
+    while target is not None:
+        path.append(target)
+        target = predecessors[target]
+    return path[::-1]
+
+def shortest_path(graph, source, target) -> list|None:
+    """Returns the cheapest path from source to target, None if target cannot be reached."""
+    distances, predecessors = shortest_paths(graph, source)
+    if target not in distances:
+        return None
+    return path_to(predecessors, target)
+
+def nearest_path(graph, source, targets) -> list|None:
+    """
+    Returns the cheapest path from source to the nearest vertex of
+    targets other than source, None if none can be reached. Dijkstra's
+    algorithm stopped at the first vertex of targets it settles, so
+    only vertices nearer than that one are searched.
+    """
+    distances = {source: 0.0}
+    predecessors = {source: None}
+    heap = [(0.0, 0, source)]
+    counter = 1
+    while heap:
+        distance, _, vertex = heappop(heap)
+        if distance > distances[vertex]:
+            continue
+        if vertex in targets and vertex != source:
+            return path_to(predecessors, vertex)
+        for target in graph.connected_to(vertex):
+            new_distance = distance + graph.edge_weight(vertex, target)
+            if new_distance < distances.get(target, MISSING_EDGE):
+                distances[target] = new_distance
+                predecessors[target] = vertex
+                heappush(heap, (new_distance, counter, target))
+                counter += 1
+    return None
+
 if __name__ == "__main__":
     tr_map = Graph()
     tr_map.add_edge('A','B',2)
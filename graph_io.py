@@ -0,0 +1,163 @@
+"""
+Importers of graphs from other formats.
+
+read_tsplib reads TSPLIB .tsp and .atsp files into a FrozenGraph,
+writing weights straight into its matrix. read_edge_list reads
+a CSV list of edges into a Graph. Either can be written once with
+save_binary and opened with FrozenGraph.open_binary afterwards.
+"""
+from graph import Graph, FrozenGraph, MISSING_EDGE
+from array import array
+from math import sqrt, ceil, cos, acos
+import csv
+
+def _nint(x:float) -> int:
+    return int(x + 0.5)
+
+def _euc_2d(a, b) -> float:
+    return _nint(sqrt((a[0]-b[0])**2 + (a[1]-b[1])**2))
+
+def _euc_3d(a, b) -> float:
+    return _nint(sqrt((a[0]-b[0])**2 + (a[1]-b[1])**2 + (a[2]-b[2])**2))
+
+def _ceil_2d(a, b) -> float:
+    return ceil(sqrt((a[0]-b[0])**2 + (a[1]-b[1])**2))
+
+def _man_2d(a, b) -> float:
+    return _nint(abs(a[0]-b[0]) + abs(a[1]-b[1]))
+
+def _max_2d(a, b) -> float:
+    return max(_nint(abs(a[0]-b[0])), _nint(abs(a[1]-b[1])))
+
+def _att(a, b) -> float:
+    r = sqrt(((a[0]-b[0])**2 + (a[1]-b[1])**2) / 10.0)
+    t = _nint(r)
+    return t + 1 if t < r else t
+
+def _geo_radians(x:float) -> float:
+    #TSPLIB coordinates are DDD.MM, degrees and minutes
+    degrees = int(x)
+    return 3.141592 * (degrees + 5.0 * (x - degrees) / 3.0) / 180.0
+
+def _geo(a, b) -> float:
+    latitude1, longitude1 = map(_geo_radians, a)
+    latitude2, longitude2 = map(_geo_radians, b)
+    q1 = cos(longitude1 - longitude2)
+    q2 = cos(latitude1 - latitude2)
+    q3 = cos(latitude1 + latitude2)
+    return int(6378.388 * acos(0.5*((1.0+q1)*q2 - (1.0-q1)*q3)) + 1.0)
+
+DISTANCES = {'EUC_2D': _euc_2d,
+             'EUC_3D': _euc_3d,
+             'CEIL_2D': _ceil_2d,
+             'MAN_2D': _man_2d,
+             'MAX_2D': _max_2d,
+             'ATT': _att,
+             'GEO': _geo}
+
+def _explicit_cells(edge_weight_format:str, n:int):
+    """(row, column) of consecutive numbers of EDGE_WEIGHT_SECTION."""
+    #column-wise formats of symmetric matrices list the same numbers as
+    #row-wise formats of the other triangle
+    edge_weight_format = {'UPPER_COL': 'LOWER_ROW', 'LOWER_COL': 'UPPER_ROW',
+                          'UPPER_DIAG_COL': 'LOWER_DIAG_ROW',
+                          'LOWER_DIAG_COL': 'UPPER_DIAG_ROW'}.get(edge_weight_format, edge_weight_format)
+    if edge_weight_format == 'FULL_MATRIX':
+        return ((i, j) for i in range(n) for j in range(n))
+    if edge_weight_format == 'UPPER_ROW':
+        return ((i, j) for i in range(n) for j in range(i+1, n))
+    if edge_weight_format == 'UPPER_DIAG_ROW':
+        return ((i, j) for i in range(n) for j in range(i, n))
+    if edge_weight_format == 'LOWER_ROW':
+        return ((i, j) for i in range(n) for j in range(i))
+    if edge_weight_format == 'LOWER_DIAG_ROW':
+        return ((i, j) for i in range(n) for j in range(i+1))
+    raise ValueError(f'Unsupported EDGE_WEIGHT_FORMAT {edge_weight_format}.')
+
+def _parse_tsplib(lines) -> tuple:
+    """Returns specification {keyword: value} and sections {name: list of numbers}."""
+    specification = {}
+    sections = {}
+    numbers = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0].isalpha():
+            keyword, _, value = line.partition(':')
+            keyword = keyword.strip().upper()
+            if keyword == 'EOF':
+                break
+            if keyword.endswith('_SECTION'):
+                numbers = sections[keyword] = []
+            else:
+                specification[keyword] = value.strip()
+                numbers = None
+        elif numbers is not None:
+            numbers.extend(line.split())
+    return specification, sections
+
+def read_tsplib(path:str) -> FrozenGraph:
+    """
+    Reads a TSPLIB file of TYPE TSP (undirected graph) or ATSP
+    (directed graph). Vertices are labelled 1 to DIMENSION, weights
+    are either EXPLICIT or computed from NODE_COORD_SECTION with
+    EDGE_WEIGHT_TYPE of DISTANCES. There are no edges from
+    a vertex to itself.
+    """
+    with open(path) as file:
+        specification, sections = _parse_tsplib(file)
+    problem_type = specification.get('TYPE', 'TSP').split()[0]
+    if problem_type not in ('TSP', 'ATSP'):
+        raise ValueError(f'Unsupported TYPE {problem_type}.')
+    directed = problem_type == 'ATSP'
+    n = int(specification['DIMENSION'])
+    weights = array('d', [MISSING_EDGE]) * (n*n)
+    edge_weight_type = specification.get('EDGE_WEIGHT_TYPE', 'EXPLICIT')
+    if edge_weight_type == 'EXPLICIT':
+        numbers = sections['EDGE_WEIGHT_SECTION']
+        cells = list(_explicit_cells(specification.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'), n))
+        if len(numbers) < len(cells):
+            raise ValueError(f'Expected {len(cells)} weights, got {len(numbers)}.')
+        for (i, j), weight in zip(cells, numbers):
+            weights[i*n + j] = float(weight)
+            if not directed:
+                weights[j*n + i] = float(weight)
+    elif edge_weight_type in DISTANCES:
+        distance = DISTANCES[edge_weight_type]
+        dimensions = 3 if edge_weight_type == 'EUC_3D' else 2
+        numbers = sections['NODE_COORD_SECTION']
+        #every node is its number followed by coordinates
+        coordinates = [tuple(map(float, numbers[k+1:k+1+dimensions]))
+                       for k in range(0, n*(dimensions+1), dimensions+1)]
+        for i in range(n):
+            for j in range(i+1, n):
+                weights[i*n + j] = weights[j*n + i] = distance(coordinates[i], coordinates[j])
+    else:
+        raise ValueError(f'Unsupported EDGE_WEIGHT_TYPE {edge_weight_type}.')
+    for i in range(n):
+        weights[i*n + i] = MISSING_EDGE
+    return FrozenGraph(range(1, n+1), weights, directed)
+
+def read_edge_list(path:str, directed:bool=True, label=str, delimiter:str=',') -> Graph:
+    """
+    Reads a CSV file with rows of source, target and optionally weight
+    (1 when left out). A first row whose weight isn't a number is taken
+    for a header and skipped. label converts labels, e.g. int.
+    """
+    graph = Graph(directed=directed)
+    with open(path, newline='') as file:
+        for row_number, row in enumerate(csv.reader(file, delimiter=delimiter)):
+            if not row:
+                continue
+            if len(row) < 2:
+                raise ValueError(f'Row {row_number+1} has no target.')
+            weight = row[2].strip() if len(row) > 2 else '1'
+            try:
+                weight = float(weight)
+            except ValueError:
+                if row_number == 0:
+                    continue
+                raise
+            graph.add_edge(label(row[0].strip()), label(row[1].strip()), weight)
+    return graph
@@ -0,0 +1,233 @@
+"""
+Graphs of points, built without touching every pair of them.
+
+from_points turns coordinates into a PointGraph: a complete graph whose
+weights are Euclidean or great-circle (haversine) distances, computed
+when asked for. Only candidate edges, joining every point to its
+k nearest points, are stored. They are found through a grid over the
+points, so building the graph takes time and memory of about n*k
+instead of n**2.
+"""
+from graph import CSRGraph, ClosureGraph, MISSING_EDGE
+import graph as graph_module
+from array import array
+from collections import defaultdict
+from itertools import product
+from heapq import nsmallest
+from hashlib import sha256
+from math import sqrt, asin, sin, cos, radians, prod
+
+#mean radius of the Earth, haversine distances are in kilometres
+EARTH_RADIUS = 6371.0088
+METRICS = ('euclidean', 'haversine')
+#rows of distances computed at once by _block_nearest with NumPy
+BLOCK_ROWS = 256
+
+def _embed(points, metric:str) -> list:
+    """
+    Returns columns of coordinates in which the Euclidean distance is
+    the distance of metric, or grows with it.
+    """
+    if metric == 'euclidean':
+        return [array('d', column) for column in zip(*points)]
+    if metric == 'haversine':
+        #unit vectors, the chord between two of them grows with the great-circle distance
+        xs, ys, zs = array('d'), array('d'), array('d')
+        for latitude, longitude in points:
+            latitude, longitude = radians(latitude), radians(longitude)
+            xs.append(cos(latitude) * cos(longitude))
+            ys.append(cos(latitude) * sin(longitude))
+            zs.append(sin(latitude))
+        return [xs, ys, zs]
+    raise ValueError(f'Unknown metric {metric}.')
+
+def _cell_size(extents:list, cells:int) -> float:
+    """Side of cells dividing the bounding box into about cells cells, thin sides get one cell."""
+    active = [extent for extent in extents if extent > 0]
+    while active:
+        size = (prod(active) / cells) ** (1 / len(active))
+        thick = [extent for extent in active if extent >= size]
+        if len(thick) == len(active):
+            return size
+        active = thick
+    return 1.0
+
+def _block_nearest(columns:list, members:list, block:list, k:int) -> list:
+    """Returns (ids of k nearest, distance to the k-th) of every member among ids of block."""
+    numpy = graph_module.numpy
+    if numpy is None:
+        found = []
+        for i in members:
+            nearest = nsmallest(k, ((sum((column[i] - column[j])**2 for column in columns), j)
+                                    for j in block if j != i))
+            found.append(([j for _, j in nearest], sqrt(nearest[-1][0])))
+        return found
+    numpy_columns = [numpy.frombuffer(column, dtype=numpy.float64) for column in columns]
+    block = numpy.array(block, dtype=numpy.intp)
+    found = []
+    for start in range(0, len(members), BLOCK_ROWS):
+        rows = numpy.array(members[start:start+BLOCK_ROWS], dtype=numpy.intp)
+        squared = sum((column[rows][:, None] - column[block][None, :])**2 for column in numpy_columns)
+        squared[rows[:, None] == block[None, :]] = MISSING_EDGE
+        nearest = numpy.argpartition(squared, k-1, axis=1)[:, :k]
+        distances = numpy.take_along_axis(squared, nearest, axis=1)
+        order = numpy.argsort(distances, axis=1)
+        nearest = numpy.take_along_axis(nearest, order, axis=1)
+        distances = numpy.sqrt(numpy.take_along_axis(distances, order, axis=1)[:, -1])
+        found.extend(zip(block[nearest].tolist(), distances.tolist()))
+    return found
+
+def nearest_points(columns:list, k:int) -> list:
+    """
+    Returns ids of the k nearest points of every point (all other
+    points if there are fewer), closest first, by Euclidean distance
+    in columns.
+
+    Points are put into cells of a grid holding about k points each.
+    Points of a cell look for their nearest among cells up to radius
+    cells away; if the k-th nearest found is farther than radius cells,
+    a closer point could be outside, so the radius doubles.
+    """
+    n = len(columns[0])
+    k = min(k, n-1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+    lows = [min(column) for column in columns]
+    extents = [max(column) - low for column, low in zip(columns, lows)]
+    size = _cell_size(extents, max(1, n // k))
+    shape = [int(extent / size) + 1 for extent in extents]
+    cells = defaultdict(list)
+    for i, key in enumerate(zip(*[[min(int((x - low) / size), side-1) for x in column]
+                                  for column, low, side in zip(columns, lows, shape)])):
+        cells[key].append(i)
+    nearest = [None] * n
+    for key, members in cells.items():
+        radius = 1
+        while True:
+            ranges = [range(max(0, c - radius), min(side, c + radius + 1)) for c, side in zip(key, shape)]
+            covers_all = all(len(cells_range) == side for cells_range, side in zip(ranges, shape))
+            block = [j for other in product(*ranges) for j in cells.get(other, ())]
+            if len(block) > k:
+                found = _block_nearest(columns, members, block, k)
+                if covers_all or max(distance for _, distance in found) <= radius * size:
+                    for i, (ids, _) in zip(members, found):
+                        nearest[i] = ids
+                    break
+            radius *= 2
+    return nearest
+
+def _distance(metric:str, squared:float) -> float:
+    """Distance of points squared apart in columns of _embed."""
+    if metric == 'euclidean':
+        return sqrt(squared)
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(squared) / 2))
+
+def _distances_numpy(metric:str, squared):
+    numpy = graph_module.numpy
+    if metric == 'euclidean':
+        return numpy.sqrt(squared)
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.minimum(1.0, numpy.sqrt(squared) / 2))
+
+class PointGraph(CSRGraph):
+    """
+    Complete undirected graph of points, weighted by distances.
+
+    Every pair of different points is an edge whose weight is computed
+    from the coordinates when needed. Only candidate edges, between
+    every point and its nearest points (see from_points), are stored in
+    the arrays of CSRGraph: connected_to and nearest_neighbours, so
+    also random walks, construction heuristics and local search, follow
+    only those, while the cost of any path is known. The graph is its
+    own metric closure.
+
+    ...
+
+    Attributes
+    ----------
+    _columns: list
+        array('d') of every coordinate of the points: x and y, or
+        the unit vectors of points on the Earth
+    _metric: str
+        one of METRICS
+    """
+
+    def __init__(self, labels, columns:list, metric:str, offsets, targets, weights):
+        super().__init__(labels, offsets, targets, weights, directed=False)
+        if metric not in METRICS:
+            raise ValueError(f'Unknown metric {metric}.')
+        self._columns = columns
+        self._metric = metric
+
+    def __reduce_ex__(self, protocol):
+        return PointGraph, (self._labels, self._columns, self._metric, self._offsets, self._targets, self._weights)
+
+    def save_binary(self, path:str) -> None:
+        """Not supported: binary files hold weights, a PointGraph is rebuilt from its points."""
+        raise TypeError('PointGraph has no binary file, it is rebuilt from its points with from_points '
+                        '(or pickled).')
+
+    def graph_hash(self) -> str:
+        digest = sha256(repr((self._labels, self._metric, 'points')).encode())
+        for column in self._columns:
+            digest.update(memoryview(column).cast('B'))
+        return digest.hexdigest()
+
+    def _weight_ids(self, i:int, j:int) -> float:
+        if i == j:
+            return MISSING_EDGE
+        return _distance(self._metric, sum((column[i] - column[j])**2 for column in self._columns))
+
+    def _squared_numpy(self, sources, targets):
+        numpy = graph_module.numpy
+        return sum((column[sources] - column[targets])**2
+                   for column in (numpy.frombuffer(column, dtype=numpy.float64) for column in self._columns))
+
+    def _path_weights_numpy(self, ids):
+        weights = _distances_numpy(self._metric, self._squared_numpy(ids[:-1], ids[1:]))
+        weights[ids[:-1] == ids[1:]] = MISSING_EDGE
+        return weights
+
+    def _weight_matrix(self):
+        numpy = graph_module.numpy
+        n = len(self._labels)
+        sources, targets = numpy.repeat(numpy.arange(n), n), numpy.tile(numpy.arange(n), n)
+        weights = _distances_numpy(self._metric, self._squared_numpy(sources, targets))
+        weights[sources == targets] = MISSING_EDGE
+        return weights.reshape(n, n)
+
+    def metric_closure(self, cache_dir=None, method:str='dijkstra') -> ClosureGraph:
+        """
+        Returns the graph as a dense ClosureGraph: distances already are
+        the cheapest paths, so every edge is a path of its own. Neither
+        cache_dir nor method are needed.
+        """
+        n = len(self._labels)
+        distances = array('d', [self._weight_ids(i, j) for i in range(n) for j in range(n)])
+        predecessors = array('i', [i if i != j else -1 for i in range(n) for j in range(n)])
+        return ClosureGraph(self._labels, distances, predecessors, directed=False)
+
+def from_points(points, k:int=8, metric:str='euclidean', labels=None) -> PointGraph:
+    """
+    Builds a PointGraph of points: (x, y) pairs for the 'euclidean'
+    metric, (latitude, longitude) in degrees for 'haversine'. Each
+    point gets candidate edges to its k nearest points and to every
+    point it is one of the k nearest of. Labels are 0 to n-1 unless
+    given.
+    """
+    points = list(points)
+    columns = _embed(points, metric)
+    n = len(points)
+    if labels is None:
+        labels = range(n)
+    nearest = nearest_points(columns, k) if n else []
+    rows = [set(ids) for ids in nearest]
+    for i, ids in enumerate(nearest):
+        for j in ids:
+            rows[j].add(i)
+    offsets, targets, weights = array('q', [0]), array('i'), array('d')
+    for i, row in enumerate(rows):
+        for j in sorted(row):
+            targets.append(j)
+            weights.append(_distance(metric, sum((column[i] - column[j])**2 for column in columns)))
+        offsets.append(len(targets))
+    return PointGraph(labels, columns, metric, offsets, targets, weights)
@@ -0,0 +1,156 @@
+from graph import Graph
+from genetic_TSP import Genetic_TSP, Population_TSP
+from concurrent.futures import ProcessPoolExecutor
+import random
+
+#graph of the problem, sent to every worker process once by _init_worker
+_worker_graph = None
+
+def _init_worker(graph) -> None:
+    global _worker_graph
+    _worker_graph = graph
+
+def _evolve_island(population:Population_TSP|None, settings:dict, seed:int, generations:int) -> tuple:
+    """
+    Runs generations of one island inside a worker process.
+
+    Starts from population, or from a fresh one if population is None.
+    Returns the population sorted by fitness and the best individual
+    found during the generations as a Population_TSP of one (empty if
+    there's none): next_generation keeps no elites, so the best one
+    may be missing from the last population.
+    """
+    #every task has its own seed, so results don't depend on which worker ran it
+    test_tube = Genetic_TSP(_worker_graph, seed=seed, **settings)
+    if population is None:
+        test_tube.populate()
+    else:
+        test_tube.load_population(population)
+    for _ in range(generations):
+        test_tube.next_generation()
+    test_tube.choose_best()
+    best = [test_tube._best_ind] if test_tube._best_ind is not None else []
+    return test_tube.compact(), Population_TSP.from_individuals(best, _worker_graph)
+
+
+class Island_TSP:
+    """
+    Island model on top of Genetic_TSP.
+
+    Several independent populations (islands) evolve in parallel in
+    a process pool. Every migration_interval generations the best
+    migration_size individuals of each island replace the worst ones
+    of the next island (ring topology). The graph is sent to each
+    worker process once, when the pool starts; populations travel
+    between processes in their compact form, Population_TSP.
+
+    ...
+
+    Attributes
+    ----------
+    _islands: list
+        Population_TSP of every island, None before the first generation
+    _island_bests: list
+        Population_TSP of the best individual every island found in
+        the last epoch, see _evolve_island
+    _generation: int
+        number of generations every island went through
+    _best_ind: Individual_TSP
+        best individual found on any island
+    _seeds: random.Random
+        source of per-task seeds, the whole run is reproducible
+        when seed is given
+
+    Methods
+    -------
+    evolve(generations)
+        Runs given number of generations on every island, with
+        migrations in between.
+    close()
+        Shuts the process pool down.
+    """
+
+    def __init__(self, graph: Graph, islands:int=4, population_size:int=100, starting_position=None,
+                 cyclical=False, migration_interval:int=10, migration_size:int=5, seed=None, max_workers=None):
+        if islands < 1:
+            raise ValueError('There has to be at least one island.')
+        self._problem_map = graph
+        self._settings = {'population_size': population_size,
+                          'starting_position': starting_position,
+                          'cyclical': cyclical}
+        self._migration_interval = migration_interval
+        self._migration_size = migration_size
+        self._islands = [None] * islands
+        self._island_bests = []
+        self._generation = 0
+        self._best_ind = None
+        self._seeds = random.Random(seed)
+        self._max_workers = max_workers
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers,
+                                                 initializer=_init_worker,
+                                                 initargs=(self._problem_map,))
+        return self._executor
+
+    def migrate(self) -> None:
+        """Best individuals of each island replace the worst ones of the next island."""
+        k = self._migration_size
+        if k <= 0 or len(self._islands) < 2:
+            return
+        emigrants = [population[:k] for population in self._islands]
+        for i, population in enumerate(self._islands):
+            keep = max(0, len(population) - len(emigrants[i-1]))
+            self._islands[i] = population[:keep] + emigrants[i-1]
+
+    def evolve(self, generations:int) -> None:
+        while generations > 0:
+            epoch = min(generations, self._migration_interval)
+            seeds = [self._seeds.getrandbits(64) for _ in self._islands]
+            futures = [self._pool().submit(_evolve_island, population, self._settings, seed, epoch)
+                       for population, seed in zip(self._islands, seeds)]
+            results = [future.result() for future in futures]
+            self._islands = [population for population, _ in results]
+            self._island_bests = [best for _, best in results]
+            self._generation += epoch
+            generations -= epoch
+            self.choose_best()
+            self.migrate()
+
+    def choose_best(self) -> None:
+        for best in self._island_bests:
+            if len(best) and (self._best_ind is None or best.scores[0] < self._best_ind.score):
+                self._best_ind = best.to_individuals(self._problem_map, self._settings['starting_position'],
+                                                     self._settings['cyclical'])[0]
+
+if __name__ == "__main__":
+    from time import time
+    adj_dict = {}
+    for key in range(0,20):
+        adj_dict[key] = {}
+        for target in range(0,20):
+            if key+1 == target or (target==0 and key==19):
+                adj_dict[key][target] = 1
+            elif key != target:
+                adj_dict[key][target] = random.randint(2,50)
+    start = time()
+    with Island_TSP(Graph(graph=adj_dict), islands=8, population_size=200, starting_position=0,
+                    cyclical=True, seed=1) as islands:
+        while islands._generation < 200 and (islands._best_ind is None or islands._best_ind.score > 20):
+            islands.evolve(10)
+            print(f'generation={islands._generation} score={islands._best_ind.score}')
+    print(islands._best_ind.genome)
+    print(f'It took {time()-start:.02f} seconds')
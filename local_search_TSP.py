@@ -0,0 +1,147 @@
+"""
+2-opt and Or-opt local search for the memetic stage of Genetic_TSP.
+
+Moves are looked for only between a vertex and its nearest neighbours
+(candidate lists from Graph.nearest_neighbours), and only if the new
+edge is cheaper than the edge it replaces. Vertices whose
+surroundings didn't change since they last failed to improve are
+skipped (don't-look bits), so a pass over a genome is close to linear.
+"""
+from collections import defaultdict, deque
+from time import perf_counter
+
+#improvements smaller than this are treated as float noise
+EPSILON = 1e-9
+
+class Local_Search:
+    """
+    Improves genomes of a Genetic_TSP in place with 2-opt and Or-opt.
+
+    Only genes the solver's mutations may change are moved, so the
+    starting position and the closing gene of cyclical paths stay.
+    Work is limited per generation by max_moves evaluated moves and
+    time_budget seconds, whichever runs out first.
+
+    ...
+
+    Attributes
+    ----------
+    improving_moves: int
+        moves applied since the last start_generation
+    evaluated_moves: int
+        moves evaluated since the last start_generation
+    """
+
+    def __init__(self, solver, neighbour_count:int=8, max_moves:int|None=10000,
+                 time_budget:float|None=None, max_segment:int=3):
+        self._solver = solver
+        self._neighbour_count = neighbour_count
+        self._neighbours = solver._problem_map.nearest_neighbours(neighbour_count)
+        self._max_moves = max_moves
+        self._time_budget = time_budget
+        #longest segment moved by Or-opt
+        self._max_segment = max_segment
+        self._deadline = None
+        self.improving_moves = 0
+        self.evaluated_moves = 0
+
+    def update_neighbours(self, sources) -> None:
+        """Rebuilds candidate lists of sources, after their edges changed."""
+        graph = self._solver._problem_map
+        for source in sources:
+            targets = sorted(graph.connected_to(source), key=lambda target: graph.edge_weight(source, target))
+            self._neighbours[source] = targets[:self._neighbour_count]
+
+    def start_generation(self) -> None:
+        """Resets counters and budget."""
+        self.improving_moves = 0
+        self.evaluated_moves = 0
+        self._deadline = None if self._time_budget is None else perf_counter() + self._time_budget
+
+    def _exhausted(self) -> bool:
+        if self._max_moves is not None and self.evaluated_moves >= self._max_moves:
+            return True
+        return self._deadline is not None and perf_counter() >= self._deadline
+
+    def improve(self, individual) -> bool:
+        """
+        Applies improving moves to individual until none is left or
+        the budget runs out, updating its score. Returns True if
+        anything improved.
+        """
+        genome = individual.genome
+        solver = self._solver
+        first, last = solver._mutable_range(genome)
+        positions = _positions(genome)
+        active = deque(genome[max(0, first-1):last])
+        waiting = set(active)
+        improved = False
+        while active and not self._exhausted():
+            vertex = active.popleft()
+            waiting.discard(vertex)
+            move = self._find_move(genome, vertex, positions, first, last)
+            if move is None:
+                continue
+            delta, (removed, added), apply = move
+            apply()
+            individual.score += delta
+            self.improving_moves += 1
+            improved = True
+            positions = _positions(genome)
+            for edge in removed + added:
+                for touched in edge:
+                    if touched not in waiting:
+                        waiting.add(touched)
+                        active.append(touched)
+        return improved
+
+    def _find_move(self, genome:list, vertex, positions:dict, first:int, last:int):
+        """First improving 2-opt or Or-opt move creating an edge from vertex to its neighbour."""
+        solver = self._solver
+        weight = solver._problem_map.edge_weight
+        for i in positions[vertex]:
+            if i + 1 >= len(genome):
+                continue
+            current = weight(vertex, genome[i+1])
+            for candidate in self._neighbours.get(vertex, ()):
+                if weight(vertex, candidate) >= current:
+                    break
+                for j in positions[candidate]:
+                    for move in self._moves(genome, i, j, first, last):
+                        if self._exhausted():
+                            return None
+                        self.evaluated_moves += 1
+                        edges, apply = move
+                        delta = solver._delta(*edges)
+                        if delta < -EPSILON:
+                            return delta, edges, apply
+        return None
+
+    def _moves(self, genome:list, i:int, j:int, first:int, last:int):
+        """
+        Moves adding edge between genome[i] and genome[j]: 2-opt reversing
+        the genes between them and Or-opt moving a segment ending at i
+        in front of j. Yields lists of edges removed and added, and
+        a function applying the move.
+        """
+        solver = self._solver
+        if i + 1 < j and first <= i + 1 and j + 1 <= last:
+            yield solver._reverse_edges(genome, i+1, j+1), lambda: solver.reverse_slice(genome, i+1, j+1)
+        elif j + 1 < i and first <= j + 1 and i + 1 <= last:
+            yield solver._reverse_edges(genome, j+1, i+1), lambda: solver.reverse_slice(genome, j+1, i+1)
+        for length in range(1, self._max_segment+1):
+            start, end = i - length + 1, i + 1
+            if start < first or end > last or start <= j < end:
+                break
+            #position of genome[j] once the segment is cut out
+            pos3 = j if j < start else j - length
+            if pos3 == start or not first <= pos3 <= last - length:
+                continue
+            yield (solver._move_edges(genome, start, end, pos3),
+                   lambda start=start, end=end, pos3=pos3: solver.move_slice(genome, start, end, pos3))
+
+def _positions(genome:list) -> dict:
+    positions = defaultdict(list)
+    for i, gene in enumerate(genome):
+        positions[gene].append(i)
+    return positions
@@ -0,0 +1,117 @@
+"""
+Random numbers of a Genetic_TSP run.
+
+Random_TSP is a random.Random whose Mersenne Twister output is taken
+in blocks: one getrandbits call fills BLOCK_SIZE 32-bit words, which
+draw then hands out one by one from a C-level iterator. A draw is
+a single C call instead of the few Python calls behind random.randint,
+and randint, choice and random are one short Python call each.
+
+Every solver owns one, so runs are reproducible from their seed and
+solvers running on several threads don't share a generator. The words
+only depend on the seed, not on NumPy or the byte order of the machine.
+"""
+from array import array
+from collections import deque
+from itertools import chain, islice, repeat
+from operator import length_hint, mul
+import random
+import sys
+
+#32-bit words drawn from the Mersenne Twister at once
+BLOCK_SIZE = 4096
+WORD_BITS = 32
+#scales a word to [0, 1)
+WORD_SCALE = 2.0 ** -WORD_BITS
+
+class Random_TSP(random.Random):
+    """
+    random.Random drawing its numbers in blocks, see the module docstring.
+
+    draw() returns a random 32-bit integer, the cheapest way to get
+    one; randint(a, b) and choice(seq) are a draw modulo the size of
+    the range, random() a draw scaled to [0, 1). Modulo bias of ranges
+    up to a million values is below 2**-12 of the probability of any
+    of them, floats have 32 random bits. Everything else inherited
+    from random.Random (shuffle, sample, choices, ...) is exactly
+    uniform, it draws through getrandbits.
+
+    getstate() is the state of the Mersenne Twister before the current
+    block and the number of words drawn from it, so a generator
+    restored by setstate continues exactly where it was.
+
+    ...
+
+    Attributes
+    ----------
+    draw: callable
+        returns the next random 32-bit integer
+    _block: iterator
+        words of the current block not drawn yet, None before the first draw
+    _block_state: tuple
+        state of the Mersenne Twister before the current block was drawn
+    """
+
+    def seed(self, a=None, version:int=2) -> None:
+        super().seed(a, version)
+        self._start()
+
+    def _start(self) -> None:
+        """Starts drawing blocks at the current state of the Mersenne Twister."""
+        self._block = None
+        self._block_state = None
+        self._stream = chain.from_iterable(self._blocks())
+        self.draw = self._stream.__next__
+        #C-level like draw, shadows the method below
+        self.random = map(mul, self._stream, repeat(WORD_SCALE)).__next__
+
+    def _blocks(self):
+        while True:
+            self._block_state = super().getstate()
+            words = array('I', super().getrandbits(WORD_BITS * BLOCK_SIZE).to_bytes(4 * BLOCK_SIZE, 'little'))
+            if sys.byteorder == 'big':
+                words.byteswap()
+            self._block = iter(words.tolist())
+            yield self._block
+
+    def getstate(self) -> tuple:
+        if self._block is None:
+            return super().getstate(), 0
+        return self._block_state, BLOCK_SIZE - length_hint(self._block)
+
+    def setstate(self, state:tuple) -> None:
+        random_state, drawn = state
+        super().setstate(random_state)
+        self._start()
+        deque(islice(self._stream, drawn), maxlen=0)
+
+    def getrandbits(self, k:int) -> int:
+        if k <= WORD_BITS:
+            return self.draw() >> (WORD_BITS - k)
+        words = -(-k // WORD_BITS)
+        bits = 0
+        for _ in range(words):
+            bits = bits << WORD_BITS | self.draw()
+        return bits >> (words * WORD_BITS - k)
+
+    def random(self) -> float:
+        return self.draw() * WORD_SCALE
+
+    def _randbelow(self, n:int) -> int:
+        #exact, words out of the range are drawn again
+        if n > 1 << WORD_BITS:
+            return super()._randbelow(n)
+        shift = WORD_BITS - (n - 1).bit_length()
+        value = self.draw() >> shift
+        while value >= n:
+            value = self.draw() >> shift
+        return value
+
+    def randint(self, a:int, b:int) -> int:
+        return a + self.draw() % (b - a + 1)
+
+    def choice(self, seq):
+        try:
+            return seq[self.draw() % len(seq)]
+        except ZeroDivisionError:
+            raise IndexError('Cannot choose from an empty sequence') from None
@@ -0,0 +1,92 @@
+"""
+Opt-in instrumentation of Genetic_TSP.
+
+A Telemetry passed to Genetic_TSP collects counters (candidates,
+rejections by reason, evaluations, cache hits...) and time spent in
+phases of the algorithm. Every generation closes a Telemetry_Record
+with what was collected since the previous record. Without telemetry
+Genetic_TSP only pays for an `is not None` check at each site.
+"""
+from collections import defaultdict, namedtuple
+from time import perf_counter
+
+#reasons a candidate individual is rejected, counted as 'rejected.<reason>'
+NOT_TRAVERSABLE = 'not_traversable'
+MISSING_VERTEX = 'missing_vertex'
+WRONG_START = 'wrong_start'
+NOT_CYCLICAL = 'not_cyclical'
+#nothing in the genome can be changed
+IMMUTABLE = 'immutable'
+
+#counters and timers (seconds per phase) collected during a generation
+Telemetry_Record = namedtuple('Telemetry_Record', ['generation', 'counters', 'timers'])
+
+class _Timer:
+    __slots__ = ('_timers', '_name', '_start')
+
+    def __init__(self, timers:dict, name:str):
+        self._timers = timers
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._timers[self._name] += perf_counter() - self._start
+
+class Telemetry:
+    """
+    Counters and phase timers of a Genetic_TSP run.
+
+    ...
+
+    Attributes
+    ----------
+    records: list
+        Telemetry_Record of every generation, unless keep_records is False
+    _sink: callable
+        called with every new Telemetry_Record, e.g. to export it
+    """
+
+    def __init__(self, sink=None, keep_records:bool=True):
+        self._sink = sink
+        self._keep_records = keep_records
+        self.records = []
+        self._counters = defaultdict(int)
+        self._timers = defaultdict(float)
+
+    def count(self, name:str, amount:int=1) -> None:
+        self._counters[name] += amount
+
+    def reject(self, reason:str) -> None:
+        self._counters['rejected.' + reason] += 1
+
+    def timer(self, name:str) -> _Timer:
+        """Context manager adding time spent inside to the timer name."""
+        return _Timer(self._timers, name)
+
+    def record(self, generation:int) -> Telemetry_Record:
+        """Closes a record of everything collected since the previous one."""
+        record = Telemetry_Record(generation, dict(self._counters), dict(self._timers))
+        self._counters.clear()
+        self._timers.clear()
+        if self._keep_records:
+            self.records.append(record)
+        if self._sink is not None:
+            self._sink(record)
+        return record
+
+    def totals(self) -> Telemetry_Record:
+        """Sums of all kept records, generation is the number of records."""
+        counters, timers = defaultdict(int), defaultdict(float)
+        for record in self.records:
+            for name, value in record.counters.items():
+                counters[name] += value
+            for name, value in record.timers.items():
+                timers[name] += value
+        return Telemetry_Record(len(self.records), dict(counters), dict(timers))
+
+    def export(self) -> list:
+        """Kept records as plain dictionaries, e.g. for json.dumps."""
+        return [record._asdict() for record in self.records]
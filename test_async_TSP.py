@@ -0,0 +1,95 @@
+import unittest
+import asyncio
+from time import perf_counter
+from random import randint, seed
+from graph import Graph
+from async_TSP import Async_TSP
+
+class TestAsyncTSP(unittest.TestCase):
+    def setUp(self):
+        seed(3)
+        adj_dict = {}
+        for source in range(30):
+            adj_dict[source] = {target: randint(1,50) for target in range(30) if target != source}
+        self.graph = Graph(graph=adj_dict)
+        #B cannot be left, there is no cycle
+        self.dead_end = Graph(graph={'A':{'B':1}, 'B':{}})
+
+    def tearDown(self):
+        self.graph = None
+        self.dead_end = None
+
+    def test_solve_iter(self):
+        async def solve(solver):
+            improvements = [improvement async for improvement in solver.solve_iter(self.graph, 0, True,
+                                                                                   generations=30)]
+            return improvements, await solver.solve(self.dead_end, 'A', True, generations=3)
+        with Async_TSP(population_size=30, slice_time=0.01, populate_mix={'random_walk': 1}) as solver:
+            improvements, nothing = asyncio.run(solve(solver))
+        self.assertIsNone(nothing)
+        self.assertGreater(len(improvements), 1)
+        for previous, improvement in zip(improvements, improvements[1:]):
+            self.assertLess(improvement.score, previous.score)
+            self.assertGreaterEqual(improvement.generation, previous.generation)
+        for improvement in improvements:
+            self.assertEqual(improvement.score, self.graph.calculate_cost(improvement.path))
+            self.assertEqual(set(improvement.path), set(range(30)))
+            self.assertEqual((improvement.path[0], improvement.path[-1]), (0, 0))
+        self.assertLessEqual(improvements[-1].generation, 30)
+        with self.assertRaises(ValueError):
+            asyncio.run(Async_TSP().solve(self.graph))
+
+    def test_concurrent_deadlines(self):
+        #solves take turns on one thread, each stops at its own deadline
+        async def solve(solver):
+            return await asyncio.gather(*(solver.solve(self.graph, 0, True, time_budget=budget)
+                                          for budget in (0.2, 0.4, 0.4)))
+        with Async_TSP(population_size=30, slice_time=0.01) as solver:
+            start = perf_counter()
+            results = asyncio.run(solve(solver))
+            elapsed = perf_counter() - start
+        self.assertLess(elapsed, 0.8)
+        self.assertLess(results[0].elapsed, 0.3)
+        for result in results:
+            self.assertLess(result.elapsed, 0.5)
+            self.assertEqual(result.score, self.graph.calculate_cost(result.path))
+
+    def test_seed(self):
+        async def solve(solver):
+            return await asyncio.gather(*(solver.solve(self.graph, 0, True, generations=5) for _ in range(2)))
+        runs = []
+        for _ in range(2):
+            with Async_TSP(population_size=20, slice_time=0.001, populate_mix={'random_walk': 1}, seed=3) as solver:
+                runs.append([result.path for result in asyncio.run(solve(solver))])
+        self.assertEqual(runs[0], runs[1])
+
+    def test_cancel(self):
+        async def solve(solver):
+            #no criterion is ever met but the impossible target
+            endless = asyncio.create_task(solver.solve(self.graph, 0, True, target_score=0))
+            await asyncio.sleep(0.1)
+            endless.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await endless
+            #the pool is free again once the cancelled slice ends
+            start = perf_counter()
+            result = await solver.solve(self.graph, 0, True, generations=3)
+            return result, perf_counter() - start
+        with Async_TSP(population_size=30, slice_time=0.01) as solver:
+            result, elapsed = asyncio.run(solve(solver))
+        self.assertEqual(result.score, self.graph.calculate_cost(result.path))
+        self.assertLess(elapsed, 1.0)
+
+    def test_leave_iteration(self):
+        async def solve(solver):
+            async for improvement in solver.solve_iter(self.graph, 0, True, target_score=0):
+                break
+            return improvement, solver._slots._value
+        #slices of a single generation, the first one reports generation 0
+        with Async_TSP(population_size=30, slice_time=0) as solver:
+            improvement, slots = asyncio.run(solve(solver))
+        self.assertEqual(improvement.generation, 0)
+        self.assertEqual(slots, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import random
+from graph import Graph, MISSING_EDGE
+from batch_TSP import Batch_TSP, Routing_Instance, _solve_chunk
+from exact_TSP import held_karp
+
+class TestBatchTSP(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'C':1, 'D':2, 'E':1},
+                                  'B':{'C':1, 'A':2, 'D':1, 'E':1},
+                                  'C':{'D':1, 'B':2, 'A':1, 'E':1},
+                                  'D':{'A':1, 'C':2, 'B':1, 'E':1},
+                                  'E':{'A':1, 'B':1, 'C':1, 'D':5}})
+        #B cannot be left, there is no cycle
+        self.dead_end = Graph(graph={'A':{'B':1}, 'B':{}})
+
+    def tearDown(self):
+        self.graph = None
+        self.dead_end = None
+
+    def test_solve_chunk(self):
+        instances = [Routing_Instance(key, self.graph.freeze(), starting_position='A') for key in range(3)]
+        instances.append(Routing_Instance('dead end', self.dead_end.freeze(), starting_position='A'))
+        criteria = {'time_budget': None, 'generations': 4, 'stagnation': None, 'target_score': None}
+        results = _solve_chunk(instances, {'population_size': 10}, {'random_walk': 1}, criteria, seed=1)
+        self.assertEqual(sorted(map(str, (result.key for result in results))), ['0', '1', '2', 'dead end'])
+        for result in results:
+            if result.key == 'dead end':
+                self.assertIsNone(result.path)
+                self.assertEqual(result.score, MISSING_EDGE)
+                continue
+            self.assertEqual(result.generations, 4)
+            self.assertEqual(result.path[0], 'A')
+            self.assertEqual(result.path[-1], 'A')
+            self.assertEqual(set(result.path), {'A','B','C','D','E'})
+            self.assertEqual(result.score, self.graph.calculate_cost(result.path))
+
+    def test_time_budget(self):
+        #generations on 60 vertices take long enough for budgets to matter
+        rng = random.Random(4)
+        def instance(key, time_budget=None):
+            adj_dict = {source: {target: rng.randint(1, 50) for target in range(60) if target != source}
+                        for source in range(60)}
+            return Routing_Instance(key, Graph(graph=adj_dict).freeze(), starting_position=0, time_budget=time_budget)
+        instances = [instance(0, time_budget=0.1)] + [instance(key) for key in range(1, 8)]
+        criteria = {'time_budget': 0.3, 'generations': None, 'stagnation': None, 'target_score': None}
+        results = {result.key: result for result in _solve_chunk(instances, {'population_size': 50},
+                                                                   {'nearest_neighbour': 1}, criteria, seed=1)}
+        #budgets count from the start of the chunk, for every instance alike
+        for key in range(1, 8):
+            self.assertLess(results[key].elapsed, 0.4)
+            self.assertGreater(results[key].generations, 0)
+        generations = [results[key].generations for key in range(1, 8)]
+        self.assertLessEqual(max(generations) - min(generations), 2)
+        #the instance with the shorter budget finished first
+        self.assertLess(results[0].elapsed, results[1].elapsed)
+        self.assertLess(results[0].generations, results[1].generations)
+
+    def test_solve(self):
+        rng = random.Random(5)
+        instances = []
+        for key in range(10):
+            vertices = rng.randint(5, 12)
+            adj_dict = {source: {target: rng.randint(1, 9) for target in range(vertices) if target != source}
+                        for source in range(vertices)}
+            instances.append(Routing_Instance(key, Graph(graph=adj_dict), starting_position=0))
+        with Batch_TSP(max_workers=2, chunk_size=3, time_budget=1.0, stagnation=5, population_size=20,
+                       seed=2) as batch:
+            streamed = list(batch.solve_iter(instances))
+            results = batch.solve(instances)
+        self.assertEqual(sorted(result.key for result in streamed), list(range(10)))
+        self.assertEqual([result.key for result in results], list(range(10)))
+        for instance, result in zip(instances, results):
+            self.assertEqual(set(result.path), set(instance.graph.vertices_list))
+            self.assertEqual(result.score, instance.graph.calculate_cost(result.path))
+            #small enough to be solved exactly
+            self.assertEqual(result.generations, 0)
+            self.assertEqual(result.score, held_karp(instance.graph, 0, True).score)
+
+    def test_stopping_criteria(self):
+        with self.assertRaises(ValueError):
+            Batch_TSP(time_budget=None, stagnation=None)
+        with self.assertRaises(ValueError):
+            Batch_TSP(chunk_size=0)
+
+if __name__ == "__main__":
+    unittest.main()
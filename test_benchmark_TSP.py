@@ -0,0 +1,37 @@
+import unittest
+from random import seed
+from benchmark_TSP import euclidean_points, euclidean_graph, knn_graph, snake_tour, bench_instance, instances, regressions
+
+class TestBenchmarkTSP(unittest.TestCase):
+    def setUp(self):
+        seed(7)
+
+    def test_instances(self):
+        points = euclidean_points(300)
+        tour = snake_tour(points)
+        self.assertEqual(sorted(tour[:-1]), list(range(300)))
+        self.assertEqual(tour[0], tour[-1])
+        graph = knn_graph(points)
+        self.assertTrue(graph.is_path_traversable(tour))
+        self.assertLess(max(map(len, map(graph.connected_to, range(300)))), 300)
+        dense = euclidean_graph(points[:10])
+        self.assertAlmostEqual(dense.edge_weight(3, 4), dense.edge_weight(4, 3))
+
+    def test_bench_instance(self):
+        instance = [instance for instance in instances([50]) if instance['name'] == 'euclidean_50'][0]
+        result = bench_instance(instance, repeat=1, generations=2)
+        for metric in ('build_s', 'populate_s', 'calculate_costs_s', 'is_feasible_s', 'mutate_s',
+                       'next_generation_s', 'generations_per_s', 'evaluations_per_s', 'peak_memory_bytes'):
+            self.assertGreater(result[metric], 0)
+        self.assertEqual(result['vertices'], 50)
+
+    def test_regressions(self):
+        baseline = {'a': {'mutate_s': 0.1, 'generations_per_s': 10, 'peak_memory_bytes': 1000, 'tiny_s': 0.0001}}
+        results = {'a': {'mutate_s': 0.2, 'generations_per_s': 1, 'peak_memory_bytes': 1100, 'tiny_s': 0.0004},
+                   'b': {'mutate_s': 1.0}}
+        self.assertEqual(regressions(results, baseline, 0.25), [('a', 'mutate_s', 0.1, 0.2)])
+        self.assertEqual(regressions(results, baseline, 0.05), [('a', 'mutate_s', 0.1, 0.2),
+                                                                ('a', 'peak_memory_bytes', 1000, 1100)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from cache_TSP import Fitness_Cache
+
+class TestFitnessCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = Fitness_Cache(maxsize=2)
+
+    def tearDown(self):
+        self.cache = None
+
+    def test_key(self):
+        self.assertEqual(Fitness_Cache.key([0,1,2]), Fitness_Cache.key((0,1,2)))
+        self.assertNotEqual(Fitness_Cache.key([0,1,2]), Fitness_Cache.key([0,2,1]))
+
+    def test_score_and_feasibility(self):
+        key = self.cache.key(['A','B'])
+        self.assertIsNone(self.cache.score(key))
+        self.cache.store_score(key, 3)
+        self.assertEqual(self.cache.score(key), 3)
+        #feasibility of the same genome is still unknown
+        self.assertIsNone(self.cache.feasible(key))
+        self.cache.store_feasible(key, False)
+        self.assertIs(self.cache.feasible(key), False)
+        self.assertEqual(self.cache.score(key), 3)
+        self.assertEqual(self.cache.stats(), {'hits': 3, 'misses': 2, 'evictions': 0, 'size': 1})
+
+    def test_eviction(self):
+        self.cache.store_score(1, 1.0)
+        self.cache.store_score(2, 2.0)
+        #1 becomes the most recently used, 2 is evicted
+        self.assertEqual(self.cache.score(1), 1.0)
+        self.cache.store_score(3, 3.0)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertIsNone(self.cache.score(2))
+        self.assertEqual(self.cache.score(1), 1.0)
+        self.assertEqual(self.cache.score(3), 3.0)
+        stats = self.cache.stats()
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(), dict(stats, size=0))
+        self.assertIsNone(self.cache.score(1))
+        with self.assertRaises(ValueError):
+            Fitness_Cache(0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import random
+import tempfile
+from graph import Graph
+from genetic_TSP import Genetic_TSP
+from checkpoint_TSP import read_checkpoint, HAS_DRAWN
+
+class TestCheckpointTSP(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'C':1, 'D':2, 'E':1},
+                                  'B':{'C':1, 'A':2, 'D':1, 'E':1},
+                                  'C':{'D':1, 'B':2, 'A':1, 'E':1},
+                                  'D':{'A':1, 'C':2, 'B':1, 'E':1},
+                                  'E':{'A':1, 'B':1, 'C':1, 'D':5}})
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'run.checkpoint')
+
+    def tearDown(self):
+        self.graph = None
+        self.directory.cleanup()
+
+    def solver(self, **settings):
+        return Genetic_TSP(self.graph, population_size=20, starting_position='A', cyclical=True,
+                           crossover_rate=0.3, **settings)
+
+    def evolve(self, test_tube, generations):
+        for _ in range(generations):
+            test_tube.next_generation()
+            test_tube.choose_best()
+
+    def test_resume_is_exact(self):
+        self.check_resume()
+
+    def test_resume_adaptive(self):
+        #learned operator weights, their statistics and restarts carry over
+        self.check_resume(adaptive=True, diversity_target=0.5, restart_stagnation=2)
+
+    def check_resume(self, **settings):
+        random.seed(3)
+        test_tube = self.solver(**settings)
+        test_tube.populate()
+        test_tube.choose_best()
+        self.evolve(test_tube, 4)
+        test_tube.save_checkpoint(self.path)
+        self.evolve(test_tube, 4)
+
+        random.seed(99)
+        resumed = self.solver(**settings)
+        resumed.load_checkpoint(self.path)
+        self.assertEqual(resumed._generation, 4)
+        self.evolve(resumed, 4)
+        self.assertEqual(resumed._generation, 8)
+        self.assertEqual(resumed.compact(), test_tube.compact())
+        self.assertEqual(resumed._best_ind.genome, test_tube._best_ind.genome)
+        self.assertEqual(resumed._best_ind.score, test_tube._best_ind.score)
+        if test_tube._control is not None:
+            self.assertEqual(resumed._control.getstate(), test_tube._control.getstate())
+
+    def test_background_checkpoints(self):
+        random.seed(5)
+        test_tube = self.solver(checkpoint_path=self.path, checkpoint_interval=0.0)
+        test_tube.populate()
+        self.evolve(test_tube, 3)
+        test_tube._checkpointer.wait()
+        checkpoint = read_checkpoint(self.path)
+        self.assertEqual(checkpoint.generation, 3)
+        self.assertEqual(checkpoint.best.scores[0], test_tube._best_ind.score)
+        #taken at the end of the generation, before it was ranked
+        resumed = self.solver()
+        resumed.load_checkpoint(self.path)
+        resumed.choose_best()
+        self.assertEqual(resumed.compact(), test_tube.compact())
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_invalid_checkpoints(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a checkpoint at all, just some bytes of text')
+        with self.assertRaises(ValueError):
+            self.solver().load_checkpoint(self.path)
+        test_tube = self.solver()
+        test_tube.populate()
+        test_tube.save_checkpoint(self.path)
+        smaller = Genetic_TSP(Graph(graph={'A':{'B':1}, 'B':{'A':1}}))
+        with self.assertRaises(ValueError):
+            smaller.load_checkpoint(self.path)
+        #only the current version is read
+        with open(self.path, 'r+b') as file:
+            file.seek(4)
+            file.write(bytes([2]))
+        with self.assertRaisesRegex(ValueError, 'Unsupported'):
+            read_checkpoint(self.path)
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 8)
+        with self.assertRaises(ValueError):
+            read_checkpoint(self.path)
+
+    def test_without_drawn_words(self):
+        #files written before Random_TSP end with the population
+        test_tube = self.solver()
+        test_tube.populate()
+        test_tube.save_checkpoint(self.path)
+        with open(self.path, 'rb') as file:
+            data = bytearray(file.read())
+        data[5] &= ~HAS_DRAWN
+        with open(self.path, 'wb') as file:
+            file.write(data[:-8])
+        checkpoint = read_checkpoint(self.path)
+        self.assertEqual(checkpoint.random_state[1], 0)
+        resumed = self.solver()
+        resumed.load_checkpoint(self.path)
+        self.assertEqual(resumed.compact(), test_tube.compact())
+
+if __name__ == "__main__":
+    unittest.main()
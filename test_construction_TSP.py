@@ -0,0 +1,98 @@
+import unittest
+import os
+import random
+import subprocess
+import sys
+from graph import Graph
+import construction_TSP
+from construction_TSP import repair, nearest_neighbour, greedy_edge, random_insertion
+
+class TestConstructionTSP(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'D':2, 'E':1},
+                                  'B':{'C':1, 'A':2},
+                                  'C':{'D':1, 'B':2},
+                                  'D':{'A':1, 'C':2},
+                                  'E':{'A':1}})
+        self.vertices = set(self.graph.vertices_list)
+
+    def tearDown(self):
+        self.graph = None
+
+    def test_repair(self):
+        self.assertEqual(repair(self.graph, ['E','A','C']), ['E','A','B','C'])
+        self.assertEqual(repair(self.graph, ['A','C'], cyclical=True), ['A','B','C','D','A'])
+        self.assertEqual(repair(self.graph, ['A']), ['A'])
+        self.assertIsNone(repair(self.graph, []))
+        unreachable = Graph(graph={'A':{'B':1}, 'B':{}})
+        self.assertIsNone(repair(unreachable, ['B','A']))
+
+    def check_heuristic(self, heuristic):
+        for graph in (self.graph, self.graph.freeze()):
+            for starting_position in (None, 'A', 'E', 'C'):
+                for cyclical in (False, True):
+                    for _ in range(10):
+                        genome = heuristic(graph, starting_position, cyclical)
+                        self.assertTrue(graph.is_path_traversable(genome))
+                        self.assertEqual(set(genome), self.vertices)
+                        if starting_position is not None:
+                            self.assertEqual(genome[0], starting_position)
+                        if cyclical:
+                            self.assertEqual(genome[0], genome[-1])
+
+    def test_nearest_neighbour(self):
+        self.check_heuristic(nearest_neighbour)
+        self.assertEqual(nearest_neighbour(self.graph, 'E', randomness=0), ['E','A','B','C','D'])
+
+    def test_hash_seed(self):
+        #leaves of a star lead back to its hub only, every leaf is a dead end
+        #and all unvisited leaves tie; string hashes vary between processes
+        script = ("from graph import Graph\n"
+                  "from construction_TSP import STRATEGIES\n"
+                  "leaves = [f'v{i}' for i in range(10)]\n"
+                  "graph = Graph(graph=dict({'H': dict.fromkeys(leaves, 1)}, **{leaf: {'H': 1} for leaf in leaves}))\n"
+                  "print(STRATEGIES['nearest_neighbour'](graph, 'H', randomness=0))\n")
+        outputs = set()
+        for hash_seed in ('0', '1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+            outputs.add(subprocess.run([sys.executable, '-c', script], env=env, capture_output=True,
+                                       text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout)
+        expected = ['H'] + [vertex for i in range(10) for vertex in (f'v{i}', 'H')][:-1]
+        self.assertEqual(outputs, {f'{expected}\n'})
+
+    def test_greedy_edge(self):
+        self.check_heuristic(greedy_edge)
+
+    def test_random_insertion(self):
+        self.check_heuristic(random_insertion)
+        #points on a line, every vertex goes in between its neighbours: next
+        #to one of its two candidates or, with none of them inserted yet,
+        #found by trying every place
+        line = Graph(graph={i: {j: abs(i - j) for j in range(30) if j != i} for i in range(30)})
+        candidates = line.nearest_neighbours(2)
+        for seed in range(5):
+            self.assertEqual(random_insertion(line, 0, rng=random.Random(seed), candidates=candidates),
+                             list(range(30)))
+
+    def test_prepare(self):
+        #shared arguments make the same genomes as computing them every call
+        for graph in (self.graph, self.graph.freeze()):
+            for name, heuristic in construction_TSP.STRATEGIES.items():
+                shared = construction_TSP.prepare(name, graph)
+                for cyclical in (False, True):
+                    self.assertEqual(heuristic(graph, 'A', cyclical, rng=random.Random(2), **shared),
+                                     heuristic(graph, 'A', cyclical, rng=random.Random(2)))
+        edges = construction_TSP.sorted_edges(self.graph)
+        self.assertEqual(len(edges), 10)
+        self.assertEqual([weight for weight, _, _ in edges], sorted(weight for weight, _, _ in edges))
+        #without noise edges come in their order
+        self.assertEqual(list(construction_TSP._noisy_order(edges, 0, random)),
+                         [(source, target) for _, source, target in edges])
+
+    def test_unreachable(self):
+        unreachable = Graph(graph={'A':{'B':1}, 'B':{}, 'C':{'A':1}})
+        for heuristic in construction_TSP.STRATEGIES.values():
+            self.assertIsNone(heuristic(unreachable, 'A'))
+
+if __name__ == "__main__":
+    unittest.main()
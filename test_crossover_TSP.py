@@ -0,0 +1,45 @@
+import unittest
+from collections import Counter
+from random import shuffle, seed
+from crossover_TSP import order_crossover, partially_mapped_crossover, edge_recombination
+
+class TestCrossoverTSP(unittest.TestCase):
+    def setUp(self):
+        seed(11)
+        self.parent1 = list(range(10))
+        self.parent2 = list(range(10))
+        shuffle(self.parent2)
+
+    def tearDown(self):
+        self.parent1 = None
+        self.parent2 = None
+
+    def check_permutation(self, operator):
+        for _ in range(100):
+            child = operator(self.parent1, self.parent2)
+            self.assertEqual(sorted(child), self.parent1)
+        self.assertEqual(operator([1], [1]), [1])
+        self.assertEqual(operator([], []), [])
+
+    def test_order_crossover(self):
+        self.check_permutation(order_crossover)
+        #multiset of genes is kept when genes repeat
+        parent1 = ['A','B','A','C','D','A']
+        parent2 = ['A','A','D','C','A','B']
+        for _ in range(100):
+            child = order_crossover(parent1, parent2)
+            self.assertEqual(Counter(child), Counter(parent1))
+
+    def test_partially_mapped_crossover(self):
+        self.check_permutation(partially_mapped_crossover)
+
+    def test_edge_recombination(self):
+        self.check_permutation(edge_recombination)
+        for _ in range(100):
+            child = edge_recombination(self.parent1, self.parent2)
+            self.assertEqual(child[0], self.parent1[0])
+        #identical parents give the same path back
+        self.assertEqual(edge_recombination(self.parent1, self.parent1), self.parent1)
+
+if __name__ == "__main__":
+    unittest.main()
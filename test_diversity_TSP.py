@@ -0,0 +1,107 @@
+import unittest
+from random import randint, seed
+from graph import Graph
+from genetic_TSP import Individual_TSP as Ind, Genetic_TSP
+from diversity_TSP import Population_Diversity, Adaptive_Control, SWAP, REVERSE, MIN_SURVIVORS
+
+class TestPopulationDiversity(unittest.TestCase):
+    def setUp(self):
+        seed(4)
+        self.adj_dict = {}
+        for key in range(12):
+            self.adj_dict[key] = {target: randint(1,50) for target in range(12) if target != key}
+
+    def tearDown(self):
+        self.adj_dict = None
+
+    def test_counts(self):
+        diversity = Population_Diversity(range(6))
+        diversity.rebuild([Ind([0,1,2,3,4,5]) for _ in range(4)])
+        self.assertEqual(diversity.distinct(), 1)
+        self.assertEqual(diversity.edge_diversity(), 0.0)
+        self.assertEqual(diversity.edges[(0,1)], 4)
+        #no edge shared
+        diversity.rebuild([Ind([0,1,2]), Ind([3,4,5]), Ind([2,0,4]), Ind([5,3,1])])
+        self.assertEqual(diversity.distinct(), 4)
+        self.assertAlmostEqual(diversity.edge_diversity(), 1.0)
+        population = [Ind([0,1,2,3,0]), Ind([0,3,2,1,0]), Ind([1,2,3,0,1])]
+        diversity.rebuild(population)
+        #a rotation of a cycle is the same genome, the reversal isn't in directed graphs
+        self.assertEqual(diversity.distinct(), 2)
+        diversity.discard(population[2:], population[:2])
+        self.assertEqual(diversity.edges[(0,1)], 1)
+        undirected = Population_Diversity(range(4), directed=False)
+        undirected.rebuild([Ind(ind.genome) for ind in population])
+        self.assertEqual(undirected.distinct(), 1)
+        self.assertAlmostEqual(undirected.edge_diversity(), 0.0)
+
+    def test_inherit(self):
+        for directed in (True, False):
+            parent = Ind([0,1,2,3,4,5,0])
+            child = Ind([0,1,4,3,2,5,0])
+            other = Ind([0,2,1,3,4,5,0])
+            diversity = Population_Diversity(range(6), directed)
+            population = []
+            diversity.start(population)
+            removed, added = [(1,2), (4,5)], [(1,4), (2,5)]
+            if directed:
+                removed, added = removed + [(2,3), (3,4)], added + [(4,3), (3,2)]
+            population.append(child)
+            diversity.inherit(parent, child, removed, added)
+            population.append(other)
+            diversity.add(other)
+            diversity.finish()
+            counted = (dict(diversity.edges), diversity.genomes.copy(), child.fingerprint)
+            child.fingerprint = None
+            diversity.rebuild(population)
+            self.assertEqual({edge: uses for edge, uses in counted[0].items() if uses}, dict(diversity.edges))
+            self.assertEqual(counted[1:], (diversity.genomes, child.fingerprint))
+
+    def test_generations(self):
+        #counts kept while breeding are those of the population counted anew
+        for directed in (True, False):
+            graph = Graph(graph=self.adj_dict, directed=directed)
+            test_tube = Genetic_TSP(graph, population_size=40, starting_position=0, cyclical=True, adaptive=True,
+                                    crossover_rate=0.2, local_search=2, fitness_cache=100)
+            for stats in test_tube.iter_generations(generations=10):
+                counted = test_tube._diversity
+                diversity = Population_Diversity(graph.vertices_list, directed)
+                diversity.rebuild([Ind(ind.genome) for ind in test_tube._population])
+                self.assertEqual(+counted.edges, +diversity.edges)
+                self.assertEqual(counted.genomes, diversity.genomes)
+                self.assertAlmostEqual(stats.edge_diversity, diversity.edge_diversity())
+                self.assertEqual(stats.diversity, diversity.distinct() / len(test_tube._population))
+
+class TestAdaptiveControl(unittest.TestCase):
+    def test_weights(self):
+        control = Adaptive_Control(diversity_target=0.1)
+        for _ in range(5):
+            control._uses = [10, 10, 10, 10, 10]
+            control._successes = [0, 0, 1, 8, 0]
+            control.update(0.5, 10.0)
+        self.assertEqual(max(range(5), key=control.weights.__getitem__), REVERSE)
+        self.assertAlmostEqual(sum(control.weights), 1.0)
+        self.assertEqual(control.survivor_fraction, MIN_SURVIVORS)
+        #collapsed population, operators are drawn more alike and more survive
+        reverse, swap = control.weights[REVERSE], control.weights[SWAP]
+        control.update(0.0, 10.0)
+        self.assertLess(control.weights[REVERSE] - control.weights[SWAP], reverse - swap)
+        self.assertGreater(control.survivor_fraction, MIN_SURVIVORS)
+
+    def test_restart(self):
+        control = Adaptive_Control(diversity_target=0.1, restart_stagnation=3)
+        for score in (5.0, 4.0, 4.0, 4.0):
+            control.update(0.05, score)
+            self.assertFalse(control.restart_due)
+        control.update(0.5, 4.0)
+        self.assertFalse(control.restart_due)
+        control.update(0.05, 4.0)
+        self.assertTrue(control.restart_due)
+        control.restarted()
+        #the new population is worse, but it's only compared with itself
+        control.update(0.05, 9.0)
+        self.assertFalse(control.restart_due)
+        self.assertFalse(Adaptive_Control().restart_due)
+
+if __name__ == "__main__":
+    unittest.main()
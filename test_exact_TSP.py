@@ -0,0 +1,100 @@
+import unittest
+import random
+from itertools import permutations
+from unittest import mock
+import graph as graph_module
+import exact_TSP
+from graph import Graph, MISSING_EDGE
+from exact_TSP import held_karp, branch_and_bound, solve_TSP
+
+def brute_force(graph, starting_position, cyclical):
+    """Cheapest score over every order of visits on the metric closure."""
+    closure = graph.metric_closure()
+    vertices = closure.vertices_list
+    best = MISSING_EDGE
+    for order in permutations(vertices):
+        if starting_position is not None and order[0] != starting_position:
+            continue
+        path = list(order) + [order[0]] if cyclical else list(order)
+        best = min(best, closure.calculate_cost_ids(closure.encode(path)))
+    return best
+
+def random_graph(rng, n, density):
+    adj_dict = {source: {target: rng.randint(1, 20) for target in range(n)
+                         if target != source and rng.random() < density}
+                for source in range(n)}
+    return Graph(graph=adj_dict)
+
+class TestExactTSP(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(4)
+
+    def check(self, solver, graph, starting_position, cyclical):
+        solution = solver(graph, starting_position, cyclical)
+        expected = brute_force(graph, starting_position, cyclical)
+        self.assertEqual(solution.score, expected)
+        if expected == MISSING_EDGE:
+            self.assertIsNone(solution.path)
+            return
+        self.assertTrue(solution.optimal)
+        path = solution.path
+        #the path is made of edges of the graph and visits every vertex
+        self.assertEqual(graph.calculate_cost(path), expected)
+        self.assertEqual(set(path), set(graph.vertices_list))
+        if starting_position is not None:
+            self.assertEqual(path[0], starting_position)
+        if cyclical:
+            self.assertEqual(path[0], path[-1])
+
+    def test_against_brute_force(self):
+        for _ in range(12):
+            graph = random_graph(self.rng, self.rng.randint(2, 7), self.rng.choice([0.3, 0.6, 1.0]))
+            for starting_position in (None, 0):
+                for cyclical in (False, True):
+                    self.check(held_karp, graph, starting_position, cyclical)
+                    self.check(branch_and_bound, graph, starting_position, cyclical)
+                    with mock.patch.object(graph_module, 'numpy', None):
+                        self.check(held_karp, graph, starting_position, cyclical)
+
+    def test_single_vertex(self):
+        graph = Graph(graph={'A': {}})
+        for solver in (held_karp, branch_and_bound):
+            self.assertEqual(solver(graph, 'A', True), (['A'], 0.0, True))
+
+    def test_branch_and_bound_time_budget(self):
+        graph = random_graph(self.rng, 12, 1.0)
+        solution = branch_and_bound(graph, 0, True, time_budget=0.0)
+        self.assertFalse(solution.optimal)
+        #the first path is found before the budget is checked
+        self.assertEqual(graph.calculate_cost(solution.path), solution.score)
+        self.assertGreaterEqual(solution.score, held_karp(graph, 0, True).score)
+
+    def test_solve_TSP(self):
+        graph = random_graph(self.rng, 8, 0.5)
+        exact = held_karp(graph, 0, True)
+        self.assertEqual(solve_TSP(graph, 0, True), exact)
+        with mock.patch.object(exact_TSP, 'HELD_KARP_MAX_VERTICES_NUMPY', 4), \
+             mock.patch.object(exact_TSP, 'HELD_KARP_MAX_VERTICES', 4):
+            self.assertEqual(solve_TSP(graph, 0, True).score, exact.score)
+            with mock.patch.object(exact_TSP, 'BRANCH_AND_BOUND_MAX_VERTICES', 4):
+                solution = solve_TSP(graph, 0, True, generations=5, population_size=20)
+                self.assertFalse(solution.optimal)
+                self.assertGreaterEqual(solution.score, exact.score)
+                self.assertEqual(graph.calculate_cost(solution.path), solution.score)
+                with self.assertRaises(ValueError):
+                    solve_TSP(graph, 0, True, stagnation=None)
+            #branch_and_bound out of time without a time_budget, Genetic_TSP takes over
+            with mock.patch.object(exact_TSP, 'BRANCH_AND_BOUND_TIME_BUDGET', 0.0), \
+                 mock.patch.object(exact_TSP, 'Genetic_TSP', wraps=exact_TSP.Genetic_TSP) as genetic:
+                solution = solve_TSP(graph, 0, True, generations=5, population_size=20)
+                self.assertEqual(genetic.call_count, 1)
+                self.assertFalse(solution.optimal)
+                self.assertGreaterEqual(solution.score, exact.score)
+                self.assertEqual(graph.calculate_cost(solution.path), solution.score)
+                #with a time_budget branch_and_bound has all of it
+                solution = solve_TSP(graph, 0, True, time_budget=0.0)
+                self.assertEqual(genetic.call_count, 1)
+                self.assertEqual(graph.calculate_cost(solution.path), solution.score)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,9 @@
 import unittest
-from genetic_TSP import Individual_TSP as Ind
+from random import randint, seed
+from genetic_TSP import Individual_TSP as Ind, Genetic_TSP, Population_TSP
+import pickle
+from graph import Graph
+from telemetry_TSP import Telemetry
 
 class TestGeneticTSP(unittest.TestCase):
     def setUp(self):
@@ -44,5 +48,477 @@ class TestGeneticTSP(unittest.TestCase):
         ind = Ind(self.cyclical_genome, starting_position=2, cyclical=True)
         self.assertEqual(ind.genome, [2,0,1,2,3,0,2])
 
+    def test_Individual_slots(self):
+        ind = Ind(self.genome)
+        with self.assertRaises(AttributeError):
+            ind.age = 1
+
+
+class TestGeneticTSPCrossbreed(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(directed=False)
+        for source in range(6):
+            for target in range(source+1, 6):
+                self.graph.add_edge(source, target, source + target)
+
+    def tearDown(self):
+        self.graph = None
+
+    def scored(self, genome, starting_position=None, cyclical=False):
+        ind = Ind(genome, starting_position, cyclical)
+        ind.score = self.graph.calculate_cost(ind.genome)
+        return ind
+
+    def test_crossbreed(self):
+        for crossover in ('ox', 'pmx', 'erx'):
+            for starting_position, cyclical in ((None, False), (0, False), (None, True), (0, True)):
+                test_tube = Genetic_TSP(self.graph, starting_position=starting_position, cyclical=cyclical,
+                                        crossover=crossover)
+                parent1 = self.scored([0,1,2,3,4,5], starting_position, cyclical)
+                parent2 = self.scored([0,5,3,1,4,2], starting_position, cyclical)
+                for _ in range(50):
+                    child = test_tube.crossbreed([parent1, parent2])
+                    self.assertTrue(test_tube.is_feasible(child))
+                    self.assertEqual(child.score, self.graph.calculate_cost(child.genome))
+                    self.assertEqual(len(child.genome), len(parent1.genome))
+
+    def test_crossbreed_rotates_cyclical_parent(self):
+        test_tube = Genetic_TSP(self.graph, cyclical=True)
+        parent1 = self.scored([0,1,2,3,4,5,0])
+        parent2 = self.scored([3,1,4,0,2,5,3])
+        child = test_tube.crossbreed([parent1, parent2])
+        self.assertEqual(child.genome[0], 0)
+        self.assertEqual(child.genome[-1], 0)
+        self.assertEqual(sorted(child.genome[:-1]), [0,1,2,3,4,5])
+
+    def test_crossbreed_rejects(self):
+        test_tube = Genetic_TSP(self.graph)
+        child = test_tube.crossbreed([self.scored([0,1,2,3,4,5]), self.scored([0,1,2,3,4,5,4])])
+        self.assertIsNone(child)
+        self.assertEqual(test_tube._rejected_candidates, 1)
+        sparse = Graph(graph={'A':{'B':1}, 'B':{'C':1}, 'C':{}})
+        test_tube = Genetic_TSP(sparse, crossover='pmx')
+        parent = Ind(['A','B','C'])
+        for _ in range(20):
+            child = test_tube.crossbreed([parent, Ind(['C','B','A'])])
+            self.assertTrue(child is None or child.genome == ['A','B','C'])
+        with self.assertRaises(ValueError):
+            Genetic_TSP(sparse, crossover='eax')
+
+    def test_next_generation_with_crossover(self):
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True,
+                                crossover_rate=0.5, crossover='erx')
+        test_tube.populate({'random_insertion': 1})
+        for _ in range(5):
+            test_tube.next_generation()
+        self.assertEqual(len(test_tube._population), 30)
+        for ind in test_tube._population:
+            self.assertTrue(test_tube.is_feasible(ind))
+
+    def test_tournament(self):
+        test_tube = Genetic_TSP(self.graph, tournament_size=50)
+        population = [self.scored([0,1,2,3,4,5]), self.scored([5,4,3,2,1,0])]
+        self.assertIs(test_tube.tournament(population), population[0])
+
+
+class TestPopulationTSP(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'C':4}, 'B':{'C':2, 'A':1}, 'C':{'A':3}})
+        self.individuals = [Ind(['A','B','C','A']), Ind(['B','C']), Ind(['C','A','B','A','C'])]
+        for ind in self.individuals:
+            ind.score = self.graph.calculate_cost(ind.genome)
+
+    def tearDown(self):
+        self.graph = None
+        self.individuals = None
+
+    def test_round_trip(self):
+        population = Population_TSP.from_individuals(self.individuals, self.graph)
+        self.assertEqual(len(population), 3)
+        self.assertEqual(list(population.ids), [0,1,2,0, 1,2, 2,0,1,0,2])
+        self.assertEqual(list(population.offsets), [0,4,6,11])
+        self.assertEqual(list(population.genome_ids(1)), [1,2])
+        individuals = population.to_individuals(self.graph)
+        self.assertEqual([ind.genome for ind in individuals], [ind.genome for ind in self.individuals])
+        self.assertEqual([ind.score for ind in individuals], [ind.score for ind in self.individuals])
+        self.assertEqual(pickle.loads(pickle.dumps(population)), population)
+
+    def test_slice_and_add(self):
+        population = Population_TSP.from_individuals(self.individuals, self.graph)
+        head, tail = population[:1], population[1:]
+        self.assertEqual(len(head), 1)
+        self.assertEqual(list(tail.offsets), [0,2,7])
+        self.assertEqual(head + tail, population)
+        self.assertEqual(len(population[5:]), 0)
+        self.assertEqual(population[:0] + population, population)
+
+    def test_genetic_TSP_compact(self):
+        test_tube = Genetic_TSP(self.graph, population_size=3)
+        test_tube._population = self.individuals
+        population = test_tube.compact()
+        test_tube.load_population(population)
+        self.assertEqual([ind.genome for ind in test_tube._population], [ind.genome for ind in self.individuals])
+
+
+class TestGeneticTSPFrozenGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'D':2, 'E':1},
+                                  'B':{'C':1, 'A':2},
+                                  'C':{'D':1, 'B':2},
+                                  'D':{'A':1, 'C':2},
+                                  'E':{'A':1}})
+
+    def tearDown(self):
+        self.graph = None
+
+    def test_evolution_on_frozen_graph(self):
+        for frozen in (self.graph.freeze(), self.graph.freeze(sparse=True)):
+            test_tube = Genetic_TSP(frozen, population_size=20, starting_position='E', cyclical=False)
+            test_tube.populate()
+            self.assertTrue(test_tube._population)
+            for ind in test_tube._population:
+                self.assertTrue(test_tube.is_feasible(ind))
+            test_tube.next_generation()
+            test_tube.choose_best()
+            self.assertEqual(test_tube._best_ind.score, self.graph.calculate_cost(test_tube._best_ind.genome))
+
+    def test_populate_mix(self):
+        mix = {'random_walk': 1, 'nearest_neighbour': 1, 'greedy_edge': 1, 'random_insertion': 1}
+        for starting_position, cyclical in ((None, False), ('E', False), ('A', True)):
+            test_tube = Genetic_TSP(self.graph, population_size=40, starting_position=starting_position, cyclical=cyclical)
+            test_tube.populate(mix)
+            self.assertEqual(len(test_tube._population), 40)
+            for ind in test_tube._population:
+                self.assertTrue(test_tube.is_feasible(ind))
+        with self.assertRaises(KeyError):
+            test_tube.populate({'unknown': 1})
+
+    def test_evolution_on_metric_closure(self):
+        closure = self.graph.metric_closure()
+        test_tube = Genetic_TSP(closure, population_size=20, starting_position='E', cyclical=True)
+        test_tube.populate({'nearest_neighbour': 1, 'random_insertion': 1})
+        test_tube.next_generation()
+        test_tube.choose_best()
+        path = test_tube.best_path()
+        self.assertEqual(path[0], 'E')
+        self.assertEqual(path[-1], 'E')
+        self.assertEqual(set(path), set(self.graph.vertices_list))
+        self.assertEqual(self.graph.calculate_cost(path), test_tube._best_ind.score)
+
+    def test_calculate_fitness(self):
+        for problem_map in (self.graph, self.graph.freeze()):
+            test_tube = Genetic_TSP(problem_map, population_size=2)
+            test_tube._population = [Ind(['E','A','B','C','D']), Ind(['E','B'])]
+            test_tube.calculate_fitness()
+            self.assertEqual([ind.score for ind in test_tube._population], [4, float('+inf')])
+
+
+class TestGeneticTSPDeltaCost(unittest.TestCase):
+    def setUp(self):
+        seed(5)
+        self.directed = Graph()
+        self.undirected = Graph(directed=False)
+        for source in range(6):
+            for target in range(6):
+                if source != target:
+                    self.directed.add_edge(source, target, randint(1,20))
+                    if source < target:
+                        self.undirected.add_edge(source, target, randint(1,20))
+
+    def tearDown(self):
+        self.directed = None
+        self.undirected = None
+
+    def random_genome(self, length=12):
+        genome = [randint(0,5)]
+        while len(genome) < length:
+            gene = randint(0,5)
+            if gene != genome[-1]:
+                genome.append(gene)
+        return genome
+
+    def check_operator(self, operator, draw_args):
+        for graph in (self.directed, self.undirected, self.directed.freeze()):
+            test_tube = Genetic_TSP(graph)
+            for _ in range(200):
+                genome = self.random_genome()
+                cost = graph.calculate_cost(genome)
+                delta = getattr(test_tube, operator)(genome, *draw_args(genome))
+                if graph.is_path_traversable(genome):
+                    self.assertAlmostEqual(cost + delta, graph.calculate_cost(genome))
+                else:
+                    self.assertEqual(delta, float('+inf'))
+
+    def test_delete_gene(self):
+        self.check_operator('delete_gene', lambda genome: (randint(0,len(genome)-1),))
+
+    def test_insert_gene(self):
+        self.check_operator('insert_gene', lambda genome: (randint(0,len(genome)), randint(0,5)))
+
+    def test_swap_genes(self):
+        self.check_operator('swap_genes', lambda genome: sorted([randint(0,len(genome)-1), randint(0,len(genome)-1)]))
+
+    def test_reverse_slice(self):
+        self.check_operator('reverse_slice', lambda genome: sorted([randint(0,len(genome)), randint(0,len(genome))]))
+        test_tube = Genetic_TSP(self.directed)
+        genome = [0,1,2,3,4]
+        test_tube.reverse_slice(genome, 0, 3)
+        self.assertEqual(genome, [2,1,0,3,4])
+
+    def test_move_slice(self):
+        def draw_args(genome):
+            pos1, pos2 = sorted([randint(0,len(genome)-1), randint(0,len(genome)-1)])
+            return pos1, pos2, randint(0, len(genome)-(pos2-pos1)-1)
+        self.check_operator('move_slice', draw_args)
+        test_tube = Genetic_TSP(self.directed)
+        genome = [0,1,2,3,4,5]
+        test_tube.move_slice(genome, 1, 3, 2)
+        self.assertEqual(genome, [0,3,1,2,4,5])
+
+    def test_mutate_score(self):
+        test_tube = Genetic_TSP(self.directed)
+        parent = Ind(self.random_genome())
+        parent.score = self.directed.calculate_cost(parent.genome)
+        for _ in range(200):
+            child = test_tube.mutate(parent)
+            if child is not None:
+                self.assertAlmostEqual(child.score, self.directed.calculate_cost(child.genome))
+
+    def test_mutate_feasible_children(self):
+        graph = Graph(graph={'A':{'B':1, 'D':2, 'E':1},
+                             'B':{'C':1, 'A':2},
+                             'C':{'D':1, 'B':2},
+                             'D':{'A':1, 'C':2},
+                             'E':{'A':1}})
+        for starting_position, cyclical in ((None, False), ('E', False), (None, True), ('A', True)):
+            test_tube = Genetic_TSP(graph, starting_position=starting_position, cyclical=cyclical)
+            genome = ['A','E','A','B','C','D','A'] if starting_position == 'A' or cyclical else ['E','A','B','C','D']
+            parent = Ind(genome, starting_position, cyclical)
+            parent.score = graph.calculate_cost(parent.genome)
+            self.assertTrue(test_tube.is_feasible(parent))
+            rejected = 0
+            for _ in range(300):
+                child = test_tube.mutate(parent)
+                if child is None:
+                    rejected += 1
+                    continue
+                self.assertTrue(test_tube.is_feasible(child))
+                self.assertEqual(child.score, graph.calculate_cost(child.genome))
+                self.assertEqual(parent.genome, genome)
+            self.assertEqual(test_tube._rejected_candidates, rejected)
+
+    def test_mutate_visit_counts(self):
+        #children carry counts updated by their moves, equal to a recount
+        graph = Graph(graph={'A':{'B':1, 'D':2, 'E':1},
+                             'B':{'C':1, 'A':2},
+                             'C':{'D':1, 'B':2},
+                             'D':{'A':1, 'C':2},
+                             'E':{'A':1}})
+        test_tube = Genetic_TSP(graph, cyclical=True)
+        parent = Ind(['A','E','A','B','C','D','A'], None, True)
+        parent.score = graph.calculate_cost(parent.genome)
+        counts, missing = test_tube._visits(parent)
+        self.assertEqual(list(counts), [parent.genome.count(v) for v in test_tube._vertices])
+        self.assertEqual(missing, 0)
+        for _ in range(300):
+            child = test_tube.mutate(parent)
+            if child is None:
+                continue
+            counts, missing = child.visits
+            self.assertEqual(list(counts), [child.genome.count(v) for v in test_tube._vertices])
+            self.assertEqual(missing, 0)
+            parent = child
+        self.assertEqual(list(test_tube._visits(Ind(['A','B','A'], None, True))[0]), [2, 1, 0, 0, 0])
+        self.assertEqual(test_tube._visits(Ind(['A','B','A'], None, True))[1], 3)
+
+    def test_random_walk_coverage(self):
+        #a ring with chords, walks stop as soon as every vertex is visited
+        graph = Graph(graph={i: {i % 8 + 1: 1, (i+2) % 8 + 1: 2} for i in range(1, 9)})
+        test_tube = Genetic_TSP(graph, starting_position=1)
+        for _ in range(50):
+            genome = test_tube._random_walk()
+            self.assertEqual(set(genome), set(range(1, 9)))
+            self.assertNotIn(genome[-1], genome[:-1])
+            self.assertTrue(test_tube.is_feasible(Ind(genome, 1)))
+        self.assertEqual(test_tube._infeasibility(Ind([1,2,3,4,5,6,7], 1)), 'missing_vertex')
+        #walks stuck in a dead end or too long are cut off
+        graph = Graph(graph={1: {2: 1}, 2: {1: 1}, 3: {1: 1}})
+        self.assertEqual(len(Genetic_TSP(graph, starting_position=1)._random_walk()), 30)
+        self.assertEqual(Genetic_TSP(Graph(graph={1: {2: 1}, 2: {}}), starting_position=1)._random_walk(), [1, 2])
+
+    def test_next_generation_small_population(self):
+        test_tube = Genetic_TSP(self.directed, population_size=5, starting_position=0, cyclical=True)
+        test_tube.populate()
+        test_tube.next_generation()
+        self.assertEqual(len(test_tube._population), 10)
+        for ind in test_tube._population:
+            self.assertTrue(test_tube.is_feasible(ind))
+
+
+class TestGeneticTSPSolve(unittest.TestCase):
+    def setUp(self):
+        seed(3)
+        adj_dict = {}
+        for key in range(10):
+            adj_dict[key] = {target: 1 if (key+1) % 10 == target else randint(2,50)
+                             for target in range(10) if target != key}
+        self.graph = Graph(graph=adj_dict)
+
+    def tearDown(self):
+        self.graph = None
+
+    def test_iter_generations(self):
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True)
+        history = list(test_tube.iter_generations(generations=5))
+        self.assertEqual([stats.generation for stats in history], [0,1,2,3,4,5])
+        for stats in history:
+            self.assertLessEqual(stats.best, stats.mean)
+            self.assertTrue(0 < stats.diversity <= 1)
+        #best score never gets worse and is the score of _best_ind
+        self.assertEqual([stats.best for stats in history], sorted((stats.best for stats in history), reverse=True))
+        self.assertEqual(history[-1].best, test_tube._best_ind.score)
+        self.assertEqual(test_tube._best_ind.score, self.graph.calculate_cost(test_tube._best_ind.genome))
+        self.assertEqual([stats.elapsed for stats in history], sorted(stats.elapsed for stats in history))
+
+    def test_ranked_once(self):
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True)
+        test_tube.populate()
+        test_tube.choose_best()
+        population = test_tube._population
+        test_tube._population.reverse()
+        #already ranked population isn't sorted again
+        test_tube.choose_best()
+        self.assertIs(test_tube._population, population)
+        self.assertGreaterEqual(population[0].score, population[-1].score)
+        test_tube._population = list(population)
+        test_tube.choose_best()
+        self.assertLessEqual(test_tube._population[0].score, test_tube._population[-1].score)
+
+    def test_fitness_cache(self):
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True,
+                                crossover_rate=0.5, fitness_cache=1000)
+        test_tube.populate()
+        genome = test_tube._population[0].genome
+        test_tube._population += [Ind(list(genome)), Ind(list(genome))]
+        test_tube.choose_best()
+        #duplicates are dropped, remaining individuals are unique
+        genomes = [tuple(ind.genome) for ind in test_tube._population]
+        self.assertEqual(len(genomes), len(set(genomes)))
+        for stats in test_tube.iter_generations(generations=5):
+            for ind in test_tube._population:
+                self.assertEqual(ind.score, self.graph.calculate_cost(ind.genome))
+        cache = test_tube._fitness_cache
+        self.assertGreater(cache.misses, 0)
+        self.assertLessEqual(len(cache), 1000)
+        #cached feasibility gives the same answer
+        ind = test_tube._population[0]
+        self.assertTrue(test_tube.is_feasible(ind))
+        self.assertTrue(test_tube.is_feasible(ind))
+        self.assertFalse(test_tube.is_feasible(Ind([1,0,1])))
+        self.assertFalse(test_tube.is_feasible(Ind([1,0,1])))
+        self.assertIsNone(Genetic_TSP(self.graph)._fitness_cache)
+
+    def test_telemetry(self):
+        telemetry = Telemetry()
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True,
+                                crossover_rate=0.3, fitness_cache=1000, local_search=2, telemetry=telemetry)
+        for stats in test_tube.iter_generations(generations=3):
+            pass
+        self.assertEqual([record.generation for record in telemetry.records], [0,1,2,3])
+        populated = telemetry.records[0]
+        self.assertEqual(populated.counters['children'], 30)
+        self.assertIn('populate', populated.timers)
+        for record in telemetry.records[1:]:
+            rejected = sum(value for name, value in record.counters.items() if name.startswith('rejected.'))
+            self.assertEqual(record.counters['candidates'], record.counters['children'] + rejected)
+            for phase in ('evaluate', 'sort', 'breed', 'local_search'):
+                self.assertIn(phase, record.timers)
+            self.assertIn('cache_hits', record.counters)
+            self.assertIn('local_search_moves', record.counters)
+        #no telemetry, nothing recorded
+        self.assertIsNone(Genetic_TSP(self.graph)._telemetry)
+
+    def test_adaptive(self):
+        telemetry = Telemetry()
+        #diversity is always below target, stagnating populations start over
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True, adaptive=True,
+                                diversity_target=1.0, restart_stagnation=2, telemetry=telemetry)
+        history = list(test_tube.iter_generations(generations=20))
+        self.assertEqual([stats.best for stats in history], sorted((stats.best for stats in history), reverse=True))
+        self.assertEqual(test_tube._best_ind.score, self.graph.calculate_cost(test_tube._best_ind.genome))
+        for stats in history:
+            self.assertTrue(0 <= stats.edge_diversity <= 1)
+        self.assertGreater(telemetry.totals().counters['restarts'], 0)
+        for record in telemetry.records[1:]:
+            rejected = sum(value for name, value in record.counters.items() if name.startswith('rejected.'))
+            self.assertEqual(record.counters['candidates'], record.counters['children'] + rejected)
+        for ind in test_tube._population:
+            self.assertTrue(test_tube.is_feasible(ind))
+        self.assertIsNone(next(Genetic_TSP(self.graph).iter_generations()).edge_diversity)
+
+    def test_graph_changes(self):
+        telemetry = Telemetry()
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True,
+                                local_search=2, telemetry=telemetry)
+        test_tube.populate()
+        test_tube.choose_best()
+        genome = test_tube._best_ind.genome
+        edge = (genome[0], genome[1])
+        def uses_edge(ind):
+            return edge in zip(ind.genome, ind.genome[1:])
+        users = sum(map(uses_edge, test_tube._population))
+        self.graph.add_edge(*edge, 1000)
+        test_tube.choose_best()
+        #only individuals using the changed edge were scored again
+        self.assertEqual(telemetry._counters['rescored'], users)
+        for ind in test_tube._population + [test_tube._best_ind]:
+            self.assertEqual(ind.score, self.graph.calculate_cost(ind.genome))
+        self.assertLessEqual(test_tube._population[0].score, test_tube._population[-1].score)
+        self.graph.remove_edge(*edge)
+        test_tube.choose_best()
+        self.assertEqual(len(test_tube._population), 30 - users)
+        self.assertFalse(any(map(uses_edge, test_tube._population)))
+        self.assertFalse(uses_edge(test_tube._best_ind))
+        for stats in test_tube.iter_generations(generations=3):
+            for ind in test_tube._population:
+                self.assertEqual(ind.score, self.graph.calculate_cost(ind.genome))
+        self.graph.add_edge('new vertex', 0)
+        with self.assertRaises(ValueError):
+            test_tube.choose_best()
+
+    def test_graph_changes_cache_telemetry(self):
+        telemetry = Telemetry()
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True,
+                                fitness_cache=1000, telemetry=telemetry)
+        test_tube.populate()
+        for stats in test_tube.iter_generations(generations=3):
+            pass
+        genome = test_tube._best_ind.genome
+        self.graph.remove_edge(genome[0], genome[1])
+        for stats in test_tube.iter_generations(generations=3):
+            pass
+        #clearing the cache on a graph change keeps the totals reported so far
+        records = telemetry.records
+        for name in ('cache_hits', 'cache_misses'):
+            self.assertTrue(all(record.counters.get(name, 0) >= 0 for record in records))
+        cache = test_tube._fitness_cache
+        self.assertEqual(sum(record.counters.get('cache_hits', 0) for record in records), cache.hits)
+        self.assertEqual(sum(record.counters.get('cache_misses', 0) for record in records), cache.misses)
+
+    def test_stopping_criteria(self):
+        test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True)
+        best = test_tube.solve(target_score=float('+inf'))
+        self.assertEqual(test_tube._generation, 0)
+        self.assertIs(best, test_tube._best_ind)
+        test_tube.solve(time_budget=0)
+        self.assertEqual(test_tube._generation, 0)
+        history = list(test_tube.iter_generations(stagnation=3, generations=1000))
+        self.assertTrue(all(stats.best == history[-1].best for stats in history[-4:]))
+        calls = []
+        test_tube.solve(generations=10, callback=lambda stats: calls.append(stats) or len(calls) == 3)
+        self.assertEqual(len(calls), 3)
+        with self.assertRaises(ValueError):
+            test_tube.solve()
+
 if __name__ == "__main__":
     unittest.main()
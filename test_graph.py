@@ -1,5 +1,11 @@
 import unittest
-from graph import Graph
+import os
+import tempfile
+import pickle
+from unittest import mock
+import graph as graph_module
+from graph import Graph, FrozenGraph, ClosureGraph, CSRGraph, MISSING_EDGE, shortest_paths, shortest_path, \
+                  nearest_path
 
 class TestGraph(unittest.TestCase):
     def setUp(self):
@@ -76,6 +82,12 @@ class TestGraph(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.undirected_graph.calculate_cost(['A','C'])
 
+    def test_calculate_costs(self):
+        self.graph.add_edge('A','B',5)
+        self.graph.add_edge('B','C',10)
+        costs = self.graph.calculate_costs([['A','B','C'], ['A','C'], ['B']])
+        self.assertEqual(list(costs), [15, MISSING_EDGE, 0])
+
     def test_is_path_traversable(self):
         self.graph.add_edge('A','B',5)
         self.graph.add_edge('B','C',10)
@@ -137,6 +149,295 @@ class TestGraph(unittest.TestCase):
         graph = Graph(d)
         self.assertEqual(graph.vertices_count, 3)
         self.assertEqual(graph.vertices_list, ['A','B','C'])
-        
+
+    def test_shortest_paths(self):
+        graph = Graph(graph={'A':{'B':1, 'C':5}, 'B':{'C':1}, 'C':{'A':1}, 'D':{}})
+        for problem_map in (graph, graph.freeze()):
+            distances, predecessors = shortest_paths(problem_map, 'A')
+            self.assertEqual(distances, {'A':0, 'B':1, 'C':2})
+            self.assertEqual(predecessors, {'A':None, 'B':'A', 'C':'B'})
+            self.assertEqual(shortest_path(problem_map, 'A', 'C'), ['A','B','C'])
+            self.assertEqual(shortest_path(problem_map, 'C', 'C'), ['C'])
+            self.assertIsNone(shortest_path(problem_map, 'A', 'D'))
+            #C is nearer along the path through B
+            self.assertEqual(nearest_path(problem_map, 'A', {'A','C','D'}), ['A','B','C'])
+            self.assertEqual(nearest_path(problem_map, 'A', {'B','C'}), ['A','B'])
+            self.assertIsNone(nearest_path(problem_map, 'A', {'A','D'}))
+
+    def test_change_log(self):
+        graph = Graph(graph={'A':{'B':1}, 'B':{'A':1}})
+        self.assertEqual(graph.version, 0)
+        self.assertEqual(graph.changes_since(0), {})
+        graph.add_edge('A', 'C', 2)
+        graph.add_edge('A', 'B', 4)
+        graph.remove_edge('A', 'B')
+        self.assertEqual(graph.version, 3)
+        #weights before the changes
+        self.assertEqual(graph.changes_since(0), {('A','C'): MISSING_EDGE, ('A','B'): 1})
+        self.assertEqual(graph.changes_since(2), {('A','B'): 4})
+        self.assertEqual(graph.edge_weight('A', 'B'), MISSING_EDGE)
+        with self.assertRaises(KeyError):
+            graph.remove_edge('A', 'B')
+        self.undirected_graph.add_edge('A', 'B', 3)
+        self.undirected_graph.remove_edge('B', 'A')
+        self.assertEqual(self.undirected_graph.connected_to('A'), [])
+        self.assertEqual(self.undirected_graph.changes_since(1), {('A','B'): 3, ('B','A'): 3})
+        #an undirected graph built with one direction only is left untouched
+        one_way = Graph(graph={'A':{'B':1}}, directed=False)
+        with self.assertRaises(KeyError):
+            one_way.remove_edge('A', 'B')
+        self.assertEqual((one_way.version, one_way.edge_weight('A', 'B')), (0, 1))
+        self.assertEqual(one_way.changes_since(0), {})
+        #changes older than the log cannot be listed
+        with mock.patch('graph.CHANGE_LOG_SIZE', 2):
+            graph = Graph()
+        for weight in range(3):
+            graph.add_edge('A', 'B', weight)
+        self.assertIsNone(graph.changes_since(0))
+        self.assertEqual(graph.changes_since(1), {('A','B'): 0})
+
+    def test_nearest_neighbours(self):
+        graph = Graph(graph={'A':{'B':3, 'C':1, 'D':2}, 'B':{'A':1}})
+        for problem_map in (graph, graph.freeze()):
+            self.assertEqual(problem_map.nearest_neighbours(2), {'A':['C','D'], 'B':['A'], 'C':[], 'D':[]})
+            self.assertEqual(problem_map.nearest_neighbours(0)['A'], [])
+
+
+class TestFrozenGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':2, 'C':3}, 'B':{'C':4, 'A':1}})
+        self.frozen = self.graph.freeze()
+
+    def tearDown(self):
+        self.graph = None
+        self.frozen = None
+
+    def test_freeze(self):
+        self.assertIsInstance(self.frozen, FrozenGraph)
+        self.assertIs(self.frozen.freeze(), self.frozen)
+        self.assertEqual(self.frozen.vertices_list, ['A','B','C'])
+        self.assertEqual(self.frozen.vertices_count, 3)
+        self.assertEqual(len(self.frozen._weights), 9)
+        self.assertEqual(self.frozen._weights[0*3 + 1], 2)
+        self.assertEqual(self.frozen._weights[2*3 + 0], MISSING_EDGE)
+        #builder changes don't leak into frozen copy
+        self.graph.add_edge('C','A',7)
+        self.assertFalse(self.frozen.is_path_traversable(['C','A']))
+
+    def test_encode_decode(self):
+        ids = self.frozen.encode(['B','C','A'])
+        self.assertEqual(list(ids), [1,2,0])
+        self.assertEqual(self.frozen.decode(ids), ['B','C','A'])
+
+    def test_calculate_cost(self):
+        self.assertEqual(self.frozen.calculate_cost(['A','B','C']), 6)
+        self.assertEqual(self.frozen.calculate_cost(['B','A','B','A']), 4)
+        self.assertEqual(self.frozen.calculate_cost(['A']), 0)
+        with self.assertRaises(KeyError):
+            self.frozen.calculate_cost(['C','A'])
+        with self.assertRaises(KeyError):
+            self.frozen.calculate_cost(['A','Z'])
+        self.assertEqual(self.frozen.calculate_cost_ids([0,1,2]), 6)
+        self.assertEqual(self.frozen.calculate_cost_ids([2,0]), MISSING_EDGE)
+
+    def test_calculate_costs(self):
+        paths = [[], ['A','B','C'], ['A'], ['C','A'], [], ['B','A','B'], ['C']]
+        expected = [0, 6, 0, MISSING_EDGE, 0, 3, 0]
+        self.assertEqual(list(self.frozen.calculate_costs(paths)), expected)
+        self.assertEqual(list(self.frozen.calculate_costs([])), [])
+        #pure Python fallback gives the same results
+        with mock.patch.object(graph_module, 'numpy', None):
+            self.assertEqual(list(self.frozen.calculate_costs(paths)), expected)
+            self.assertEqual(list(self.frozen.calculate_costs([])), [])
+
+    def test_is_path_traversable(self):
+        self.assertTrue(self.frozen.is_path_traversable(['A','B','C']))
+        self.assertTrue(self.frozen.is_path_traversable(['C']))
+        self.assertFalse(self.frozen.is_path_traversable(['Z']))
+        self.assertFalse(self.frozen.is_path_traversable(['A','C','B']))
+        with self.assertRaises(ValueError):
+            self.frozen.is_path_traversable([])
+
+    def test_connected_to(self):
+        self.assertEqual(self.frozen.connected_to('A'), ['B','C'])
+        self.assertEqual(self.frozen.connected_to('C'), [])
+        #returned list is a copy
+        self.frozen.connected_to('A').append('Z')
+        self.assertEqual(self.frozen.connected_to('A'), ['B','C'])
+
+
+    def test_binary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.tspg')
+            self.graph.save_binary(path)
+            opened = FrozenGraph.open_binary(path)
+            self.assertIsInstance(opened._weights, memoryview)
+            self.assertEqual(opened.vertices_list, ['A','B','C'])
+            self.assertEqual(list(opened._weights), list(self.frozen._weights))
+            self.assertEqual(opened.graph_hash(), self.frozen.graph_hash())
+            self.assertEqual(opened.calculate_cost(['A','B','C']), 6)
+            self.assertEqual(list(opened.calculate_costs([['A','B','C'], ['C','A']])), [6, MISSING_EDGE])
+            #only the path is pickled, the copy maps the same file
+            pickled = pickle.dumps(opened)
+            self.assertLess(len(pickled), len(pickle.dumps(self.frozen)))
+            copy = pickle.loads(pickled)
+            self.assertEqual(copy._path, opened._path)
+            self.assertEqual(copy.calculate_cost(['B','A']), 1)
+            #integer labels survive the round trip
+            Graph(graph={1:{2:0.5}}, directed=False).save_binary(path)
+            opened = FrozenGraph.open_binary(path)
+            self.assertEqual(opened.vertices_list, [1,2])
+            self.assertFalse(opened._directed)
+            with open(path, 'wb') as file:
+                file.write(b'not a graph' * 4)
+            with self.assertRaises(ValueError):
+                FrozenGraph.open_binary(path)
+
+    def test_binary_labels(self):
+        #tuples would come back from JSON as lists, nothing is written
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.tspg')
+            for sparse in (False, True):
+                graph = Graph(graph={(0,0):{(0,1):1}, (0,1):{(0,0):1}}).freeze(sparse=sparse)
+                with self.assertRaisesRegex(TypeError, r'\(0, 0\) of type tuple'):
+                    graph.save_binary(path)
+                self.assertFalse(os.path.exists(path))
+            Graph(graph={'A':{1:1}, 1:{None:2}, None:{0.5:1}, 0.5:{'A':1}}).save_binary(path)
+            self.assertEqual(FrozenGraph.open_binary(path).vertices_list, ['A', 1, None, 0.5])
+
+
+class TestCSRGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'C':3, 'B':2}, 'B':{'C':4, 'A':1}})
+        self.csr = self.graph.freeze(sparse=True)
+
+    def tearDown(self):
+        self.graph = None
+        self.csr = None
+
+    def test_freeze(self):
+        self.assertIsInstance(self.csr, CSRGraph)
+        self.assertEqual(list(self.csr._offsets), [0,2,4,4])
+        self.assertEqual(list(self.csr._targets), [1,2,0,2])
+        self.assertEqual(list(self.csr._weights), [2,3,1,4])
+        self.assertIsInstance(self.graph.freeze(), FrozenGraph)
+        self.assertNotIsInstance(self.graph.freeze(), CSRGraph)
+        #large sparse graphs get CSR by default
+        ring = Graph(graph={i: {(i+1) % 1000: 1} for i in range(1000)})
+        self.assertIsInstance(ring.freeze(), CSRGraph)
+        #integer labels equal to ids are returned without translation
+        self.assertEqual(list(ring.freeze().connected_to(5)), [6])
+        self.assertIsInstance(ring.freeze().connected_to(5), memoryview)
+        self.assertNotIsInstance(ring.freeze(sparse=False), CSRGraph)
+
+    def test_queries(self):
+        dense = self.graph.freeze(sparse=False)
+        for source in 'ABC':
+            self.assertEqual(list(self.csr.connected_to(source)), dense.connected_to(source))
+            for target in 'ABCZ':
+                self.assertEqual(self.csr.edge_weight(source, target), dense.edge_weight(source, target))
+        self.assertEqual(len(self.csr.connected_to('A')), 2)
+        self.assertEqual(self.csr.connected_to('A')[1], 'C')
+        self.assertIn('B', self.csr.connected_to('A'))
+        self.assertEqual(self.csr.calculate_cost(['A','B','C']), 6)
+        with self.assertRaises(KeyError):
+            self.csr.calculate_cost(['C','A'])
+        self.assertTrue(self.csr.is_path_traversable(['B','A','C']))
+        self.assertFalse(self.csr.is_path_traversable(['A','C','B']))
+        self.assertEqual(self.csr.nearest_neighbours(1), {'A':['B'], 'B':['A'], 'C':[]})
+
+    def test_calculate_costs(self):
+        paths = [[], ['A','B','C'], ['A'], ['C','A'], ['B','A','B'], ['A','C','B']]
+        expected = [0, 6, 0, MISSING_EDGE, 3, MISSING_EDGE]
+        self.assertEqual(list(self.csr.calculate_costs(paths)), expected)
+        with mock.patch.object(graph_module, 'numpy', None):
+            self.assertEqual(list(self.csr.calculate_costs(paths)), expected)
+        empty = Graph(graph={'A':{}, 'B':{}}).freeze(sparse=True)
+        self.assertEqual(list(empty.calculate_costs([['A','B'], ['A']])), [MISSING_EDGE, 0])
+
+    def test_metric_closure(self):
+        expected = self.graph.freeze(sparse=False).metric_closure()
+        for method in ('dijkstra', 'floyd_warshall'):
+            closure = self.csr.metric_closure(method=method)
+            self.assertEqual(list(closure._weights), list(expected._weights))
+            self.assertEqual(closure.expand_path(['C']), ['C'])
+
+    def test_binary_and_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.csr))
+        self.assertIsInstance(copy, CSRGraph)
+        self.assertEqual(copy.edge_weight('B','C'), 4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.tspg')
+            self.csr.save_binary(path)
+            opened = FrozenGraph.open_binary(path)
+            self.assertIsInstance(opened, CSRGraph)
+            self.assertIsInstance(opened._weights, memoryview)
+            self.assertEqual(opened.graph_hash(), self.csr.graph_hash())
+            self.assertEqual(list(opened.connected_to('B')), ['A','C'])
+            self.assertEqual(pickle.loads(pickle.dumps(opened)).calculate_cost(['B','A','C']), 4)
+
+
+class TestClosureGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'C':5}, 'B':{'C':1}, 'C':{'A':1}, 'D':{'A':3}})
+
+    def tearDown(self):
+        self.graph = None
+
+    def methods(self):
+        return ['dijkstra'] + (['floyd_warshall'] if graph_module.numpy is not None else [])
+
+    def test_metric_closure(self):
+        for method in self.methods():
+            closure = self.graph.metric_closure(method=method)
+            self.assertIsInstance(closure, ClosureGraph)
+            self.assertEqual(closure.vertices_list, ['A','B','C','D'])
+            self.assertEqual(closure.edge_weight('A','C'), 2)
+            self.assertEqual(closure.edge_weight('D','C'), 5)
+            self.assertEqual(closure.edge_weight('A','D'), MISSING_EDGE)
+            self.assertEqual(closure.edge_weight('A','A'), MISSING_EDGE)
+            self.assertEqual(closure.connected_to('A'), ['B','C'])
+
+    def test_expand_path(self):
+        for method in self.methods():
+            closure = self.graph.metric_closure(method=method)
+            path = closure.expand_path(['D','C','B'])
+            self.assertEqual(path, ['D','A','B','C','A','B'])
+            self.assertEqual(self.graph.calculate_cost(path), closure.calculate_cost(['D','C','B']))
+            self.assertEqual(closure.expand_path(['A']), ['A'])
+            with self.assertRaises(KeyError):
+                closure.expand_path(['A','D'])
+        self.assertEqual(self.graph.expand_path(['A','B']), ['A','B'])
+
+    def test_floyd_warshall_requires_numpy(self):
+        with mock.patch.object(graph_module, 'numpy', None):
+            with self.assertRaises(ImportError):
+                self.graph.metric_closure(method='floyd_warshall')
+        with self.assertRaises(ValueError):
+            self.graph.metric_closure(method='bellman_ford')
+
+    def test_cache(self):
+        frozen = self.graph.freeze()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            closure = frozen.metric_closure(cache_dir)
+            path = os.path.join(cache_dir, f'{frozen.graph_hash()}.closure')
+            self.assertTrue(os.path.exists(path))
+            with mock.patch.object(FrozenGraph, '_closure_dijkstra', side_effect=AssertionError):
+                cached = frozen.metric_closure(cache_dir)
+            self.assertEqual(cached._weights, closure._weights)
+            self.assertEqual(cached._predecessors, closure._predecessors)
+            self.assertEqual(os.listdir(cache_dir), [os.path.basename(path)])
+            #a truncated entry is built again and replaced
+            with open(path, 'r+b') as file:
+                file.truncate(10)
+            with self.assertRaises(ValueError):
+                ClosureGraph.load(path, frozen.vertices_list)
+            rebuilt = frozen.metric_closure(cache_dir)
+            self.assertEqual(rebuilt._weights, closure._weights)
+            self.assertEqual(ClosureGraph.load(path, frozen.vertices_list)._predecessors, closure._predecessors)
+            #a different graph gets a different entry
+            self.graph.add_edge('A','D',1)
+            self.assertNotEqual(self.graph.freeze().graph_hash(), frozen.graph_hash())
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import os
+import tempfile
+from graph import MISSING_EDGE
+from graph_io import read_tsplib, read_edge_list
+
+EUC_2D = """NAME : square
+COMMENT : four corners of a 3 by 4 rectangle
+TYPE : TSP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : EUC_2D
+NODE_COORD_SECTION
+1 0 0
+2 3 0
+3 3 4
+4 0 4
+EOF
+"""
+
+UPPER_ROW = """NAME: explicit
+TYPE: TSP
+DIMENSION: 3
+EDGE_WEIGHT_TYPE: EXPLICIT
+EDGE_WEIGHT_FORMAT: UPPER_ROW
+EDGE_WEIGHT_SECTION
+ 1 2
+ 3
+EOF
+"""
+
+ATSP = """NAME: asymmetric
+TYPE: ATSP
+DIMENSION: 3
+EDGE_WEIGHT_TYPE: EXPLICIT
+EDGE_WEIGHT_FORMAT: FULL_MATRIX
+EDGE_WEIGHT_SECTION
+9999 1 2
+3 9999 4
+5 6 9999
+EOF
+"""
+
+class TestGraphIO(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_tsplib_coordinates(self):
+        graph = read_tsplib(self.write('square.tsp', EUC_2D))
+        self.assertEqual(graph.vertices_list, [1,2,3,4])
+        self.assertFalse(graph._directed)
+        self.assertEqual(graph.edge_weight(1, 3), 5)
+        self.assertEqual(graph.edge_weight(3, 1), 5)
+        self.assertEqual(graph.edge_weight(1, 1), MISSING_EDGE)
+        self.assertEqual(graph.calculate_cost([1,2,3,4,1]), 14)
+
+    def test_tsplib_explicit(self):
+        graph = read_tsplib(self.write('explicit.tsp', UPPER_ROW))
+        self.assertEqual(graph.edge_weight(1, 2), 1)
+        self.assertEqual(graph.edge_weight(3, 1), 2)
+        self.assertEqual(graph.edge_weight(2, 3), 3)
+        graph = read_tsplib(self.write('asymmetric.atsp', ATSP))
+        self.assertTrue(graph._directed)
+        self.assertEqual(graph.edge_weight(1, 2), 1)
+        self.assertEqual(graph.edge_weight(2, 1), 3)
+        self.assertEqual(graph.edge_weight(2, 2), MISSING_EDGE)
+        with self.assertRaises(ValueError):
+            read_tsplib(self.write('unsupported.tsp', EUC_2D.replace('EUC_2D', 'XRAY1')))
+
+    def test_edge_list(self):
+        path = self.write('edges.csv', 'source,target,weight\nA,B,2\nB,C,3.5\nC,A\n')
+        graph = read_edge_list(path)
+        self.assertEqual(sorted(graph.vertices_list), ['A','B','C'])
+        self.assertEqual(graph.calculate_cost(['A','B','C','A']), 6.5)
+        self.assertEqual(graph.edge_weight('B','A'), MISSING_EDGE)
+        graph = read_edge_list(self.write('edges.tsv', '1\t2\t4\n'), directed=False, label=int, delimiter='\t')
+        self.assertEqual(graph.edge_weight(2, 1), 4)
+        with self.assertRaises(ValueError):
+            read_edge_list(self.write('broken.csv', 'A,B,1\nA,C,x\n'))
+
+if __name__ == "__main__":
+    unittest.main()
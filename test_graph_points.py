@@ -0,0 +1,78 @@
+import unittest
+import pickle
+import random
+from math import dist
+from unittest import mock
+import graph as graph_module
+from graph import MISSING_EDGE
+from graph_points import from_points, nearest_points, _embed
+from genetic_TSP import Genetic_TSP
+from exact_TSP import held_karp
+
+class TestGraphPoints(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(2)
+        #a dense cluster and a few far away points, cells of the grid are uneven
+        self.points = [(rng.random(), rng.random()) for _ in range(150)]
+        self.points += [(rng.uniform(50, 60), rng.uniform(-5, 5)) for _ in range(5)]
+
+    def test_nearest_points(self):
+        columns = _embed(self.points, 'euclidean')
+        for numpy in (graph_module.numpy, None):
+            with mock.patch.object(graph_module, 'numpy', numpy):
+                nearest = nearest_points(columns, 6)
+            for i, point in enumerate(self.points):
+                expected = sorted(range(len(self.points)), key=lambda j: dist(point, self.points[j]))[1:7]
+                self.assertEqual([dist(point, self.points[j]) for j in nearest[i]],
+                                 [dist(point, self.points[j]) for j in expected])
+        self.assertEqual(nearest_points(_embed([(0, 0), (1, 1)], 'euclidean'), 5), [[1], [0]])
+        self.assertEqual(nearest_points(_embed([(3, 3)] * 3, 'euclidean'), 1), [[1], [0], [0]])
+
+    def test_euclidean(self):
+        graph = from_points(self.points, k=4)
+        self.assertEqual(graph.vertices_count, len(self.points))
+        self.assertEqual(graph.edge_weight(0, 1), dist(self.points[0], self.points[1]))
+        self.assertEqual(graph.edge_weight(3, 3), MISSING_EDGE)
+        #candidates are symmetric and hold the nearest points
+        for i in range(len(self.points)):
+            for j in graph.connected_to(i):
+                self.assertIn(i, graph.connected_to(j))
+            self.assertEqual(len(graph.nearest_neighbours(4)[i]), 4)
+        #every path is traversable, costs are computed the same with and without NumPy
+        path = list(range(len(self.points))) + [0]
+        random.Random(1).shuffle(path)
+        cost = sum(dist(self.points[a], self.points[b]) for a, b in zip(path, path[1:]))
+        self.assertAlmostEqual(graph.calculate_cost(path), cost)
+        self.assertAlmostEqual(graph.calculate_costs([path])[0], cost)
+        with mock.patch.object(graph_module, 'numpy', None):
+            self.assertAlmostEqual(graph.calculate_costs([path])[0], cost)
+        self.assertFalse(graph.is_path_traversable([0, 0]))
+        copy = pickle.loads(pickle.dumps(graph))
+        self.assertEqual(copy.edge_weight(5, 150), graph.edge_weight(5, 150))
+        self.assertEqual(copy.graph_hash(), graph.graph_hash())
+        with self.assertRaises(TypeError):
+            graph.save_binary('points.tspg')
+
+    def test_haversine(self):
+        graph = from_points([(0, 0), (0, 1), (51.5074, -0.1278), (48.8566, 2.3522)], metric='haversine',
+                            labels=['a', 'b', 'London', 'Paris'])
+        self.assertAlmostEqual(graph.edge_weight('a', 'b'), 111.195, places=3)
+        self.assertAlmostEqual(graph.edge_weight('London', 'Paris'), 343.5, delta=0.5)
+        self.assertAlmostEqual(graph.calculate_costs([['a', 'b', 'a']])[0], 2 * graph.edge_weight('a', 'b'))
+        with self.assertRaises(ValueError):
+            from_points([(0, 0)], metric='manhattan')
+
+    def test_solvers(self):
+        graph = from_points(self.points[:9], k=3)
+        closure = graph.metric_closure()
+        self.assertEqual(closure.edge_weight(0, 8), graph.edge_weight(0, 8))
+        solution = held_karp(graph, 0, True)
+        self.assertEqual(sorted(solution.path[:-1]), list(range(9)))
+        test_tube = Genetic_TSP(graph, population_size=20, starting_position=0, cyclical=True)
+        test_tube.solve(generations=5)
+        best = test_tube._best_ind
+        self.assertGreaterEqual(best.score, solution.score - 1e-9)
+        self.assertAlmostEqual(best.score, graph.calculate_cost(best.genome))
+
+if __name__ == "__main__":
+    unittest.main()
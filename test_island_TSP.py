@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+from graph import Graph
+import island_TSP
+from island_TSP import Island_TSP
+from genetic_TSP import Genetic_TSP, Individual_TSP, Population_TSP
+
+class TestIslandTSP(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph(graph={'A':{'B':1, 'C':1, 'D':2, 'E':1},
+                                  'B':{'C':1, 'A':2, 'D':1, 'E':1},
+                                  'C':{'D':1, 'B':2, 'A':1, 'E':1},
+                                  'D':{'A':1, 'C':2, 'B':1, 'E':1},
+                                  'E':{'A':1, 'B':1, 'C':1, 'D':5}})
+
+    def tearDown(self):
+        self.graph = None
+
+    def run_islands(self, seed):
+        with Island_TSP(self.graph, islands=3, population_size=20, starting_position='A',
+                        cyclical=True, migration_interval=2, migration_size=2,
+                        seed=seed, max_workers=2) as islands:
+            islands.evolve(5)
+        return islands
+
+    def test_evolve(self):
+        islands = self.run_islands(seed=7)
+        self.assertEqual(islands._generation, 5)
+        self.assertEqual(len(islands._islands), 3)
+        best = islands._best_ind
+        self.assertEqual(best.genome[0], 'A')
+        self.assertEqual(best.genome[-1], 'A')
+        self.assertEqual(set(best.genome), {'A','B','C','D','E'})
+        self.assertEqual(best.score, self.graph.calculate_cost(best.genome))
+        for population in islands._islands:
+            self.assertEqual(len(population), 20)
+            self.assertGreaterEqual(min(population.scores), best.score)
+
+    def test_reproducible_from_seed(self):
+        first = self.run_islands(seed=3)
+        second = self.run_islands(seed=3)
+        self.assertEqual(first._islands, second._islands)
+        self.assertEqual(first._best_ind.genome, second._best_ind.genome)
+
+    def test_epoch_best_kept(self):
+        #every generation ends with a single tour, worse than the ones populate made
+        worst = ['A','E','D','C','B','A']
+        next_generation = Genetic_TSP.next_generation
+        def worsen(test_tube):
+            next_generation(test_tube)
+            test_tube._population = [Individual_TSP(list(worst), 'A', True)]
+        island_TSP._init_worker(self.graph)
+        self.addCleanup(island_TSP._init_worker, None)
+        settings = {'population_size': 20, 'starting_position': 'A', 'cyclical': True}
+        with mock.patch.object(Genetic_TSP, 'next_generation', worsen):
+            population, best = island_TSP._evolve_island(None, settings, 1, 3)
+        self.assertEqual(population.scores[0], self.graph.calculate_cost(worst))
+        self.assertLess(best.scores[0], population.scores[0])
+        genome = best.to_individuals(self.graph)[0].genome
+        self.assertEqual(best.scores[0], self.graph.calculate_cost(genome))
+        islands = Island_TSP(self.graph, islands=1)
+        islands._islands, islands._island_bests = [population], [best]
+        islands.choose_best()
+        self.assertEqual(islands._best_ind.score, best.scores[0])
+
+    def test_migrate(self):
+        islands = Island_TSP(self.graph, islands=2, migration_size=1)
+        def population(genomes, scores):
+            individuals = [Individual_TSP(genome) for genome in genomes]
+            for individual, score in zip(individuals, scores):
+                individual.score = score
+            return Population_TSP.from_individuals(individuals, self.graph)
+        islands._islands = [population([['A','B'], ['A','C']], [1, 2]), population([['B','A'], ['C','A']], [3, 4])]
+        islands.migrate()
+        self.assertEqual(islands._islands[0], population([['A','B'], ['B','A']], [1, 3]))
+        self.assertEqual(islands._islands[1], population([['B','A'], ['A','B']], [3, 1]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from random import randint, shuffle, seed
+from graph import Graph
+from genetic_TSP import Genetic_TSP, Individual_TSP
+from local_search_TSP import Local_Search
+
+class TestLocalSearch(unittest.TestCase):
+    def setUp(self):
+        seed(5)
+        #cheap ring 0-1-...-11-0 among expensive random edges
+        adj_dict = {}
+        for key in range(12):
+            adj_dict[key] = {}
+            for target in range(12):
+                if (key+1) % 12 == target or (target+1) % 12 == key:
+                    adj_dict[key][target] = 1
+                elif key != target:
+                    adj_dict[key][target] = randint(5,50)
+        self.graph = Graph(graph=adj_dict)
+
+    def tearDown(self):
+        self.graph = None
+
+    def random_individual(self, test_tube, first=0, cyclical=True):
+        rest = [vertex for vertex in range(12) if vertex != first]
+        shuffle(rest)
+        genome = [first] + rest + ([first] if cyclical else [])
+        return self.individual(genome)
+
+    def individual(self, genome):
+        ind = Individual_TSP(genome)
+        ind.score = self.graph.calculate_cost(genome)
+        return ind
+
+    def test_improve(self):
+        for starting_position, cyclical in ((0, True), (None, True), (3, False), (None, False)):
+            test_tube = Genetic_TSP(self.graph, starting_position=starting_position, cyclical=cyclical)
+            local_search = Local_Search(test_tube, max_moves=None)
+            for _ in range(20):
+                local_search.start_generation()
+                ind = self.random_individual(test_tube, 3 if starting_position == 3 else 0, cyclical)
+                old_genome, old_score = list(ind.genome), ind.score
+                self.assertTrue(local_search.improve(ind))
+                self.assertLess(ind.score, old_score)
+                self.assertAlmostEqual(ind.score, self.graph.calculate_cost(ind.genome))
+                self.assertEqual(sorted(ind.genome), sorted(old_genome))
+                if starting_position is not None or cyclical:
+                    self.assertEqual(ind.genome[0], old_genome[0])
+                if cyclical:
+                    self.assertEqual(ind.genome[-1], ind.genome[0])
+                self.assertGreater(local_search.improving_moves, 0)
+                self.assertGreaterEqual(local_search.evaluated_moves, local_search.improving_moves)
+
+    def test_local_optimum(self):
+        test_tube = Genetic_TSP(self.graph, starting_position=0, cyclical=True)
+        local_search = Local_Search(test_tube)
+        local_search.start_generation()
+        ind = self.individual(list(range(12)) + [0])
+        self.assertFalse(local_search.improve(ind))
+        self.assertEqual(ind.genome, list(range(12)) + [0])
+        self.assertEqual(local_search.improving_moves, 0)
+
+    def test_budget(self):
+        test_tube = Genetic_TSP(self.graph, starting_position=0, cyclical=True)
+        local_search = Local_Search(test_tube, max_moves=5)
+        local_search.start_generation()
+        for _ in range(5):
+            local_search.improve(self.random_individual(test_tube))
+        self.assertLessEqual(local_search.evaluated_moves, 5)
+        local_search.start_generation()
+        self.assertEqual(local_search.evaluated_moves, 0)
+        local_search = Local_Search(test_tube, max_moves=None, time_budget=0)
+        local_search.start_generation()
+        self.assertFalse(local_search.improve(self.random_individual(test_tube)))
+
+    def test_memetic_evolution(self):
+        scores = []
+        for elite in (0, 3):
+            seed(2)
+            test_tube = Genetic_TSP(self.graph, population_size=30, starting_position=0, cyclical=True,
+                                    local_search=elite)
+            test_tube.populate()
+            for _ in range(5):
+                test_tube.next_generation()
+            test_tube.choose_best()
+            self.assertEqual(test_tube._best_ind.score, self.graph.calculate_cost(test_tube._best_ind.genome))
+            scores.append(test_tube._best_ind.score)
+        self.assertLess(scores[1], scores[0])
+        self.assertIsNone(Genetic_TSP(self.graph)._local_search)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import pickle
+import random
+import threading
+from graph import Graph
+from genetic_TSP import Genetic_TSP
+from random_TSP import Random_TSP, BLOCK_SIZE
+
+class TestRandomTSP(unittest.TestCase):
+    def test_reproducible(self):
+        self.assertEqual([Random_TSP(5).draw() for _ in range(3)], [Random_TSP(5).draw() for _ in range(3)])
+        rng = Random_TSP(5)
+        words = [rng.draw() for _ in range(BLOCK_SIZE + 10)]
+        self.assertNotEqual(words[:10], words[BLOCK_SIZE:])
+        self.assertTrue(all(0 <= word < 2**32 for word in words))
+        rng.seed(5)
+        self.assertEqual(rng.draw(), words[0])
+
+    def test_state(self):
+        #before the first draw, inside a block and at its very end
+        for drawn in (0, 100, BLOCK_SIZE):
+            rng = Random_TSP(8)
+            for _ in range(drawn):
+                rng.draw()
+            state = rng.getstate()
+            expected = [rng.randint(0, 9) for _ in range(BLOCK_SIZE + 5)]
+            copy = Random_TSP()
+            copy.setstate(state)
+            self.assertEqual([copy.randint(0, 9) for _ in range(BLOCK_SIZE + 5)], expected)
+            rng.setstate(state)
+            self.assertEqual(pickle.loads(pickle.dumps(rng)).random(), rng.random())
+
+    def test_distributions(self):
+        rng = Random_TSP(1)
+        counts = [0] * 10
+        for _ in range(50000):
+            counts[rng.randint(0, 9)] += 1
+        self.assertLess(max(counts) - min(counts), 500)
+        floats = [rng.random() for _ in range(10000)]
+        self.assertTrue(all(0 <= value < 1 for value in floats))
+        self.assertAlmostEqual(sum(floats) / len(floats), 0.5, delta=0.02)
+        self.assertIn(rng.choice('abc'), 'abc')
+        with self.assertRaises(IndexError):
+            rng.choice([])
+        #inherited methods draw through _randbelow and getrandbits
+        genes = list(range(20))
+        rng.shuffle(genes)
+        self.assertEqual(sorted(genes), list(range(20)))
+        self.assertEqual(len(set(rng.sample(range(7), 7))), 7)
+        self.assertEqual(rng.choices('ab', [0, 1], k=3), ['b', 'b', 'b'])
+        self.assertLess(rng.getrandbits(70), 2**70)
+        self.assertLess(rng.randrange(2**40), 2**40)
+
+    def test_solver_seed(self):
+        random.seed(1)
+        adj_dict = {source: {target: random.randint(1,50) for target in range(12) if target != source}
+                    for source in range(12)}
+        graph = Graph(graph=adj_dict)
+        def run(seed):
+            test_tube = Genetic_TSP(graph, population_size=20, starting_position=0, cyclical=True,
+                                    crossover_rate=0.3, seed=seed)
+            test_tube.populate({'random_walk': 1, 'greedy_edge': 1, 'random_insertion': 1})
+            test_tube.solve(generations=10)
+            return test_tube.compact()
+        #the global random module doesn't matter, nor do other threads
+        expected = run(4)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(run(4))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        random.random()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [expected, expected])
+        self.assertNotEqual(run(5), expected)
+        rng = Random_TSP(4)
+        self.assertEqual(run(rng), expected)
+        #without a seed, runs follow the random module
+        random.seed(2)
+        first = run(None)
+        random.seed(2)
+        self.assertEqual(run(None), first)
+
+if __name__ == "__main__":
+    unittest.main()
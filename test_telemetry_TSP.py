@@ -0,0 +1,43 @@
+import unittest
+import json
+from telemetry_TSP import Telemetry, Telemetry_Record, NOT_TRAVERSABLE
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.sunk = []
+        self.telemetry = Telemetry(sink=self.sunk.append)
+
+    def tearDown(self):
+        self.telemetry = None
+
+    def test_record(self):
+        self.telemetry.count('candidates', 3)
+        self.telemetry.count('candidates')
+        self.telemetry.reject(NOT_TRAVERSABLE)
+        with self.telemetry.timer('breed'):
+            pass
+        record = self.telemetry.record(1)
+        self.assertIsInstance(record, Telemetry_Record)
+        self.assertEqual(record.generation, 1)
+        self.assertEqual(record.counters, {'candidates': 4, 'rejected.not_traversable': 1})
+        self.assertGreaterEqual(record.timers['breed'], 0)
+        self.assertEqual(self.sunk, [record])
+        #every record starts from zero
+        self.telemetry.count('candidates')
+        record = self.telemetry.record(2)
+        self.assertEqual(record.counters, {'candidates': 1})
+        self.assertEqual(record.timers, {})
+        totals = self.telemetry.totals()
+        self.assertEqual(totals.generation, 2)
+        self.assertEqual(totals.counters['candidates'], 5)
+        exported = json.loads(json.dumps(self.telemetry.export()))
+        self.assertEqual(exported[1], {'generation': 2, 'counters': {'candidates': 1}, 'timers': {}})
+
+    def test_keep_records(self):
+        telemetry = Telemetry(sink=self.sunk.append, keep_records=False)
+        telemetry.record(1)
+        self.assertEqual(telemetry.records, [])
+        self.assertEqual(len(self.sunk), 1)
+
+if __name__ == "__main__":
+    unittest.main()